@@ -0,0 +1,35 @@
+"""Usage write-behind ledger columns
+
+Revision ID: 3f9a1c7d2b40
+Revises: 64d1d0c8ec2d
+Create Date: 2026-10-17 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2b40'
+down_revision: Union[str, Sequence[str], None] = '64d1d0c8ec2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis_requests', sa.Column('usage_window_start', sa.Date(), nullable=True))
+    op.add_column('analysis_requests', sa.Column('counted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_analysis_req_uncounted', 'analysis_requests', ['created_at'], unique=False,
+        postgresql_where=sa.text('counted_at IS NULL AND usage_window_start IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analysis_req_uncounted', table_name='analysis_requests')
+    op.drop_column('analysis_requests', 'counted_at')
+    op.drop_column('analysis_requests', 'usage_window_start')
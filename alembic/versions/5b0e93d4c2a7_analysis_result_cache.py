@@ -0,0 +1,30 @@
+"""Analysis result cache keys
+
+Revision ID: 5b0e93d4c2a7
+Revises: c4d27e8f1a95
+Create Date: 2026-10-17 12:31:19.754032
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e93d4c2a7'
+down_revision: Union[str, Sequence[str], None] = 'c4d27e8f1a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analyses', sa.Column('prompt_version', sa.String(length=40), nullable=True))
+    op.create_index('ix_documents_sha256', 'documents', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_sha256', table_name='documents')
+    op.drop_column('analyses', 'prompt_version')
@@ -0,0 +1,28 @@
+"""Subscription last applied provider event
+
+Revision ID: 7d2f94b1c6e3
+Revises: 9c3b71e5a4f0
+Create Date: 2026-10-17 19:02:47.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2f94b1c6e3'
+down_revision: Union[str, Sequence[str], None] = '9c3b71e5a4f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('subscriptions', sa.Column('last_event_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('subscriptions', 'last_event_at')
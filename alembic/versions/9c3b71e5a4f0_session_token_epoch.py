@@ -0,0 +1,28 @@
+"""Session token epoch
+
+Revision ID: 9c3b71e5a4f0
+Revises: f52a8d1c3e67
+Create Date: 2026-10-17 17:21:09.530114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3b71e5a4f0'
+down_revision: Union[str, Sequence[str], None] = 'f52a8d1c3e67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('auth_sessions', sa.Column('token_epoch', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('auth_sessions', 'token_epoch')
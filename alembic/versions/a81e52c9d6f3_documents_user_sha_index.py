@@ -0,0 +1,28 @@
+"""Documents (user_id, sha256) index for upload dedup
+
+Revision ID: a81e52c9d6f3
+Revises: 3f9a1c7d2b40
+Create Date: 2026-10-17 11:03:47.918254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81e52c9d6f3'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_documents_user_sha', 'documents', ['user_id', 'sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_user_sha', table_name='documents')
@@ -0,0 +1,44 @@
+"""Analysis job queue columns
+
+Revision ID: c4d27e8f1a95
+Revises: a81e52c9d6f3
+Create Date: 2026-10-17 11:48:05.263910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d27e8f1a95'
+down_revision: Union[str, Sequence[str], None] = 'a81e52c9d6f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis_requests', sa.Column('document_id', sa.UUID(), nullable=True))
+    op.add_column('analysis_requests', sa.Column('model', sa.String(length=80), nullable=True))
+    op.add_column('analysis_requests', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('analysis_requests', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key(
+        'analysis_requests_document_id_fkey', 'analysis_requests', 'documents',
+        ['document_id'], ['id'], ondelete='CASCADE',
+    )
+    op.create_index(
+        'ix_analysis_req_queue', 'analysis_requests', ['created_at'], unique=False,
+        postgresql_where=sa.text("status IN ('pending','running')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analysis_req_queue', table_name='analysis_requests')
+    op.drop_constraint('analysis_requests_document_id_fkey', 'analysis_requests', type_='foreignkey')
+    op.drop_column('analysis_requests', 'claimed_at')
+    op.drop_column('analysis_requests', 'attempts')
+    op.drop_column('analysis_requests', 'model')
+    op.drop_column('analysis_requests', 'document_id')
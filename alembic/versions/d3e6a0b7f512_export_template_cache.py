@@ -0,0 +1,30 @@
+"""Export cache key (analysis_id, format, template_version)
+
+Revision ID: d3e6a0b7f512
+Revises: 5b0e93d4c2a7
+Create Date: 2026-10-17 13:02:41.386215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3e6a0b7f512'
+down_revision: Union[str, Sequence[str], None] = '5b0e93d4c2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('exports', sa.Column('template_version', sa.String(length=20), server_default='v1', nullable=False))
+    op.create_unique_constraint('uq_export_analysis_format_tpl', 'exports', ['analysis_id', 'format', 'template_version'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_export_analysis_format_tpl', 'exports', type_='unique')
+    op.drop_column('exports', 'template_version')
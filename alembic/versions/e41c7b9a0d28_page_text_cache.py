@@ -0,0 +1,38 @@
+"""Per-page extraction cache
+
+Revision ID: e41c7b9a0d28
+Revises: d3e6a0b7f512
+Create Date: 2026-10-17 13:48:12.604391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41c7b9a0d28'
+down_revision: Union[str, Sequence[str], None] = 'd3e6a0b7f512'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('page_texts',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('doc_sha256', sa.String(length=64), nullable=False),
+    sa.Column('page_no', sa.Integer(), nullable=False),
+    sa.Column('extractor', sa.String(length=40), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('ocr', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('doc_sha256', 'page_no', 'extractor', name='uq_page_text')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('page_texts')
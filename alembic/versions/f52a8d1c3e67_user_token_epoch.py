@@ -0,0 +1,35 @@
+"""User token revocation epoch
+
+Revision ID: f52a8d1c3e67
+Revises: e41c7b9a0d28
+Create Date: 2026-10-17 15:06:44.218530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f52a8d1c3e67'
+down_revision: Union[str, Sequence[str], None] = 'e41c7b9a0d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_epoch', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('tokens_revoked_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_users_tokens_revoked_at', 'users', ['tokens_revoked_at'], unique=False,
+        postgresql_where=sa.text('tokens_revoked_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_tokens_revoked_at', table_name='users')
+    op.drop_column('users', 'tokens_revoked_at')
+    op.drop_column('users', 'token_epoch')
@@ -1,30 +1,155 @@
-import os, jwt
+import hashlib, os, time, uuid
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.api.core.keyring import KeyRing, keyring
+from app.api.core.revocation import revocation_epochs
 from app.db_async import get_db
 from app.domain.models.models import User
+from app.utils.ttl_cache import TTLCache
 
-JWT_PUBLIC = os.getenv("JWT_PRIVATE", "dev-secret")  # si usas HS256, misma clave; si RS256, usa pública
-JWT_ALG = os.getenv("JWT_ALG", "HS256")
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL_S", "30"))
+# Si está activo, las rutas que solo necesitan id/role/plan confían en el JWT sin ir a la BD
+AUTH_CLAIMS_ONLY = os.getenv("AUTH_CLAIMS_ONLY", "false").lower() in ("1", "true", "yes")
+# Caché de claims ya verificados por digest del token (se saltea la verificación de firma)
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 auth_scheme = HTTPBearer()
 
-async def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(auth_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Copia inmutable de un User, segura para compartir entre requests."""
+    id: uuid.UUID
+    email: str
+    name: str | None
+    avatar_url: str | None
+    role: str
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(id=user.id, email=user.email, name=user.name, avatar_url=user.avatar_url, role=user.role)
+
+@dataclass(frozen=True, slots=True)
+class TokenClaims:
+    id: uuid.UUID
+    role: str
+
+# Caché por worker de usuarios autenticados, por `sub`
+user_cache: TTLCache[str, UserSnapshot] = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_S)
+
+def invalidate_user(user_id) -> None:
+    user_cache.invalidate(str(user_id))
+
+class VerifiedClaimsCache:
+    """
+    LRU de claims ya verificados, por sha256 del token, vigentes hasta su `exp`.
+    Un mismo access token se presenta cientos de veces en sus ACCESS_TTL_MIN
+    minutos: solo la primera paga la verificación de firma.
+    """
+
+    def __init__(self, maxsize: int, enabled: bool = True, keys: KeyRing | None = None):
+        self.enabled = enabled
+        self._keys = keys or keyring
+        self._cache: TTLCache[bytes, dict] = TTLCache(maxsize=maxsize, ttl=0)
+        self.verifications = 0
+        self.verify_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def _verify(self, token: str) -> dict:
+        started = time.perf_counter()
+        payload = self._keys.decode(token)
+        self.verifications += 1
+        self.verify_seconds += time.perf_counter() - started
+        return payload
+
+    def decode(self, token: str) -> dict:
+        if not self.enabled:
+            return self._verify(token)
+        started = time.perf_counter()
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self._cache.get(key)
+        if payload is not None:
+            avg = self.verify_seconds / self.verifications if self.verifications else 0.0
+            self.saved_seconds += max(0.0, avg - (time.perf_counter() - started))
+            return dict(payload)  # copia: el dict cacheado se comparte entre requests
+        payload = self._verify(token)
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            self._cache.set(key, dict(payload), ttl=ttl)
+        return payload
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict[str, float | int | bool]:
+        return {
+            "enabled": self.enabled,
+            **self._cache.stats(),
+            "verifications": self.verifications,
+            "verify_ms_avg": round(self.verify_seconds / self.verifications * 1000, 4) if self.verifications else 0.0,
+            "saved_ms_total": round(self.saved_seconds * 1000, 2),
+        }
+
+claims_cache = VerifiedClaimsCache(maxsize=TOKEN_CACHE_SIZE, enabled=TOKEN_CACHE_ENABLED)
+
+async def get_token_payload(creds: HTTPAuthorizationCredentials = Depends(auth_scheme)) -> dict:
     token = creds.credentials
     try:
-        payload = jwt.decode(token, JWT_PUBLIC, algorithms=[JWT_ALG])
+        payload = claims_cache.decode(token)
         user_id = payload.get("sub")
         if not user_id:
             raise ValueError("no sub")
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    # logout-all: lookup en memoria, sin ir a la BD
+    if revocation_epochs.is_revoked(str(user_id), payload.get("ep", 0)):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return payload
 
+async def _load_user(db: AsyncSession, user_id: str) -> User:
     q = await db.execute(select(User).where(User.id == user_id))
     user = q.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
+
+async def _get_user_snapshot(db: AsyncSession, user_id: str) -> UserSnapshot:
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        snapshot = UserSnapshot.from_user(await _load_user(db, user_id))
+        user_cache.set(user_id, snapshot)
+    return snapshot
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db),
+) -> UserSnapshot:
+    return await _get_user_snapshot(db, payload["sub"])
+
+async def get_current_user_for_update(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """User ORM adjunto a la sesión, para rutas que lo modifican (sin caché)."""
+    return await _load_user(db, payload["sub"])
+
+async def get_current_claims(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db),
+) -> TokenClaims:
+    """
+    Para rutas que solo necesitan id/role. En modo claims-only no toca la BD;
+    si no, valida que el usuario exista (vía caché). El plan no viaja en los
+    claims: cambia por webhooks durante la vida del token y se consulta en BD.
+    """
+    if AUTH_CLAIMS_ONLY:
+        try:
+            user_id = uuid.UUID(payload["sub"])
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        return TokenClaims(id=user_id, role=payload.get("role", "user"))
+    snapshot = await _get_user_snapshot(db, payload["sub"])
+    return TokenClaims(id=snapshot.id, role=snapshot.role)
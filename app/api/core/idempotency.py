@@ -0,0 +1,88 @@
+# app/api/core/idempotency.py
+from __future__ import annotations
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.core.authn import get_current_claims, TokenClaims
+from app.db_async import get_db
+from app.domain.models.models import AnalysisRequest
+from app.domain.repositories.analyses_repo import AnalysisRequestsRepo
+
+IN_FLIGHT = ("pending", "running")
+REPLAY_HEADER = "Idempotent-Replayed"
+
+@dataclass(slots=True)
+class IdempotencyGuard:
+    """
+    Resultado de la dependencia. Si `replay` viene seteado, la key ya se había
+    usado y la ruta debe devolver ese request en vez de repetir el trabajo.
+    Las rutas sin cuota reclaman la key con `claim`; las que cobran la reclaman
+    junto con el consumo (UsageRepo.try_consume).
+    """
+    user_id: uuid.UUID
+    key: str
+    replay: Optional[AnalysisRequest]
+    repo: AnalysisRequestsRepo
+
+    async def claim(self, **values) -> Optional[uuid.UUID]:
+        """Reclama la key (INSERT ... ON CONFLICT DO NOTHING RETURNING); None = otro la ganó."""
+        return await self.repo.claim_key(self.user_id, self.key, **values)
+
+class Idempotency:
+    """
+    Dependencia configurable por ruta para el header Idempotency-Key, sobre
+    analysis_requests (unique user_id + idempotency_key):
+
+    - sin header: `required` → 400; si no, se genera una key propia.
+    - key ya completada/fallida: replay del request guardado, sin volver a ejecutar nada.
+    - key en curso: espera hasta `wait_s` consultando cada `poll_interval_s`
+      (wait_s=0 devuelve el estado actual sin esperar).
+
+        analysis_idempotency = Idempotency(wait_s=5)
+
+        @router.post(...)
+        async def create(..., idem: IdempotencyGuard = Depends(analysis_idempotency)): ...
+    """
+
+    def __init__(self, *, required: bool = False, wait_s: float = 0.0, poll_interval_s: float = 0.25):
+        self.required = required
+        self.wait_s = wait_s
+        self.poll_interval_s = poll_interval_s
+
+    async def _wait(self, db: AsyncSession, repo: AnalysisRequestsRepo, req: AnalysisRequest) -> AnalysisRequest:
+        deadline = time.monotonic() + self.wait_s
+        # el rollback expira `req`: leer req.id después sería un lazy load (MissingGreenlet en async)
+        req_id = req.id
+        while req.status in IN_FLIGHT and time.monotonic() < deadline:
+            # cierra la transacción: no retener una conexión del pool mientras se espera
+            await db.rollback()
+            await asyncio.sleep(self.poll_interval_s)
+            fresh = await repo.get(req_id)
+            if fresh is None:
+                break
+            req = fresh
+        return req
+
+    async def __call__(
+        self,
+        response: Response,
+        idempotency_key: str | None = Header(None, max_length=80),
+        claims: TokenClaims = Depends(get_current_claims),
+        db: AsyncSession = Depends(get_db),
+    ) -> IdempotencyGuard:
+        repo = AnalysisRequestsRepo(db)
+        if not idempotency_key:
+            if self.required:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Idempotency-Key header required")
+            return IdempotencyGuard(claims.id, uuid.uuid4().hex, None, repo)
+
+        existing = await repo.get_by_key(claims.id, idempotency_key)
+        if existing is not None:
+            if self.wait_s > 0:
+                existing = await self._wait(db, repo, existing)
+            response.headers[REPLAY_HEADER] = "true"
+        return IdempotencyGuard(claims.id, idempotency_key, existing, repo)
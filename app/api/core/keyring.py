@@ -0,0 +1,114 @@
+# app/api/core/keyring.py
+"""
+Llaves JWT del servicio, parseadas una sola vez al importar.
+
+    JWT_ALG          HS256 | RS256 | ES256 | EdDSA ...
+    JWT_PRIVATE      secreto (HS*) o llave privada PEM (admite "\\n" escapados)
+    JWT_KID          kid de la llave vigente; por defecto, thumbprint RFC 7638 (o "default" en HS*)
+    JWT_VERIFY_KEYS  JSON con llaves anteriores aún aceptadas durante la rotación
+                     (kid obligatorio y distinto del vigente):
+                     [{"kid": "...", "alg": "RS256", "key": "<PEM pública o secreto>"}]
+"""
+from __future__ import annotations
+import base64
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+JWT_PRIVATE = os.getenv("JWT_PRIVATE", "dev-secret")
+JWT_ALG = os.getenv("JWT_ALG", "HS256")
+JWT_KID = os.getenv("JWT_KID", "")
+JWT_VERIFY_KEYS = os.getenv("JWT_VERIFY_KEYS", "")
+
+# miembros requeridos por kty para el thumbprint (RFC 7638)
+_THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y"), "OKP": ("crv", "kty", "x")}
+
+def _is_symmetric(alg: str) -> bool:
+    return alg.startswith("HS")
+
+def _material(raw: str) -> str:
+    return raw.replace("\\n", "\n")
+
+def _public_jwk(alg: str, public_key: Any, kid: str) -> dict:
+    jwk = get_default_algorithms()[alg].to_jwk(public_key, as_dict=True)
+    jwk.update(kid=kid, alg=alg, use="sig")
+    return jwk
+
+def jwk_thumbprint(jwk: dict) -> str:
+    members = {k: jwk[k] for k in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+@dataclass(frozen=True, slots=True)
+class VerifyKey:
+    kid: str
+    alg: str
+    key: Any                    # llave pública parseada, o bytes del secreto en HS*
+    jwk: dict | None = None     # JWK público (None en HS*: el secreto no se publica)
+
+    @classmethod
+    def parse(cls, alg: str, material: str, kid: str | None = None) -> "VerifyKey":
+        parsed = get_default_algorithms()[alg].prepare_key(_material(material))
+        if _is_symmetric(alg):
+            return cls(kid=kid or "default", alg=alg, key=parsed)
+        public = parsed.public_key() if hasattr(parsed, "public_key") else parsed
+        jwk = _public_jwk(alg, public, kid or "")
+        kid = kid or jwk_thumbprint(jwk)
+        jwk["kid"] = kid
+        return cls(kid=kid, alg=alg, key=public, jwk=jwk)
+
+@dataclass(frozen=True, slots=True)
+class SigningKey:
+    kid: str
+    alg: str
+    key: Any                    # llave privada parseada, o bytes del secreto en HS*
+
+class KeyRing:
+    """
+    Firma con la llave vigente (con `kid` en el header) y verifica con
+    cualquiera de las llaves aceptadas. Tokens sin kid (emitidos antes de la
+    rotación) se verifican con la llave vigente.
+    """
+
+    def __init__(self, signing: SigningKey, verify: list[VerifyKey]):
+        self.signing = signing
+        self._verify: dict[str, VerifyKey] = {}
+        for k in verify:
+            # un kid repetido pisaría en silencio a otra llave (p. ej. dos secretos HS con kid "default")
+            if k.kid in self._verify:
+                raise ValueError(f"Duplicate JWT key id: {k.kid}")
+            self._verify[k.kid] = k
+        if signing.kid not in self._verify:
+            raise ValueError("Signing key has no matching verification key")
+
+    @classmethod
+    def from_env(cls) -> "KeyRing":
+        current = VerifyKey.parse(JWT_ALG, JWT_PRIVATE, JWT_KID or None)
+        signing_key = get_default_algorithms()[JWT_ALG].prepare_key(_material(JWT_PRIVATE))
+        verify = [current]
+        for entry in json.loads(JWT_VERIFY_KEYS) if JWT_VERIFY_KEYS else []:
+            if not entry.get("kid"):
+                raise ValueError("JWT_VERIFY_KEYS entries require an explicit kid")
+            verify.append(VerifyKey.parse(entry["alg"], entry["key"], entry["kid"]))
+        return cls(SigningKey(kid=current.kid, alg=JWT_ALG, key=signing_key), verify)
+
+    def sign(self, payload: dict) -> str:
+        return jwt.encode(payload, self.signing.key, algorithm=self.signing.alg, headers={"kid": self.signing.kid})
+
+    def decode(self, token: str, **options) -> dict:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._verify.get(kid or self.signing.kid)
+        if key is None:
+            raise jwt.InvalidKeyError("Unknown kid")
+        # el algoritmo lo fija la llave, nunca el header del token
+        return jwt.decode(token, key.key, algorithms=[key.alg], **options)
+
+    def jwks(self) -> dict:
+        return {"keys": [k.jwk for k in self._verify.values() if k.jwk is not None]}
+
+
+keyring = KeyRing.from_env()
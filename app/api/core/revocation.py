@@ -0,0 +1,113 @@
+# app/api/core/revocation.py
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.api.core.security import ACCESS_TTL_MIN
+from app.domain.repositories.users_repo import UsersRepo
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_POLL_INTERVAL_S = float(os.getenv("REVOCATION_POLL_INTERVAL_S", "5"))
+
+class RevocationEpochs:
+    """
+    Épocas de revocación (users.token_epoch) en memoria del worker.
+
+    Un access token con "ep" menor a la época conocida de su usuario está
+    revocado. Solo importan los logout-all de la última ventana de vida de un
+    access token (ACCESS_TTL_MIN + leeway): los tokens anteriores ya expiraron.
+    Un poller relee cada `poll_interval_s` las revocaciones de esa ventana
+    (índice parcial sobre tokens_revoked_at; son pocas filas), así el chequeo
+    por request es un lookup en un dict y la revocación se propaga en segundos
+    a todos los workers. Releer la ventana completa, en vez de "desde la última
+    marca", no pierde commits tardíos ni depende de los relojes de otros workers.
+    """
+
+    def __init__(self, poll_interval_s: float, window_s: float):
+        self.poll_interval_s = poll_interval_s
+        self.window_s = window_s
+        self._epochs: dict[str, tuple[int, datetime]] = {}   # sub -> (época, revocado en)
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_refresh = 0.0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.rejected = 0
+
+    def is_revoked(self, sub: str, epoch: int) -> bool:
+        known = self._epochs.get(sub)
+        if known is not None and epoch < known[0]:
+            self.rejected += 1
+            return True
+        return False
+
+    def bump(self, user_id, epoch: int, revoked_at: datetime | None = None) -> None:
+        """Aplica una revocación local sin esperar al próximo poll."""
+        key = str(user_id)
+        revoked_at = revoked_at or datetime.now(tz=timezone.utc)
+        known = self._epochs.get(key)
+        if known is None or epoch > known[0]:
+            self._epochs[key] = (epoch, revoked_at)
+
+    def _prune(self, now: datetime) -> None:
+        cutoff = now - timedelta(seconds=self.window_s)
+        for key in [k for k, (_, at) in self._epochs.items() if at < cutoff]:
+            del self._epochs[key]
+
+    async def refresh(self) -> int:
+        if self._sessionmaker is None:
+            return 0
+        now = datetime.now(tz=timezone.utc)
+        async with self._sessionmaker() as db:
+            rows = await UsersRepo(db).revoked_epochs_since(now - timedelta(seconds=self.window_s))
+        for user_id, epoch, revoked_at in rows:
+            self.bump(user_id, epoch, revoked_at)
+        self._prune(now)
+        self.refreshes += 1
+        self._last_refresh = time.monotonic()
+        return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                self.refresh_errors += 1
+                logger.exception("Revocation epochs refresh failed")
+            await asyncio.sleep(self.poll_interval_s)
+
+    def start(self, sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+        if self._task is None:
+            self._sessionmaker = sessionmaker
+            self._task = asyncio.create_task(self._run(), name="revocation-epochs")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "users": len(self._epochs),
+            "age_s": round(time.monotonic() - self._last_refresh, 1) if self.refreshes else -1.0,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "rejected": self.rejected,
+        }
+
+
+# Una instancia por worker de uvicorn
+revocation_epochs = RevocationEpochs(
+    poll_interval_s=REVOCATION_POLL_INTERVAL_S,
+    window_s=ACCESS_TTL_MIN * 60 + 60,
+)
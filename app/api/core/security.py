@@ -1,35 +1,163 @@
+import asyncio
 import hashlib
-import os, time, uuid, bcrypt, jwt
+import hmac
+import os, secrets, time, uuid, bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable
+from app.api.core.keyring import JWT_PRIVATE, keyring
 
-JWT_PRIVATE = os.getenv("JWT_PRIVATE", "dev-secret")
-JWT_ALG = os.getenv("JWT_ALG", "HS256")
 ACCESS_TTL_MIN = int(os.getenv("ACCESS_TTL_MIN", "15"))
 REFRESH_TTL_DAYS = int(os.getenv("REFRESH_TTL_DAYS", "60"))
+HASH_MAX_WORKERS = int(os.getenv("HASH_MAX_WORKERS", "2"))
+
+# Esquemas de hash del refresh: se guardan como "<esquema>$<hash>".
+# Los hashes bcrypt antiguos no tienen prefijo (empiezan con "$2b$").
+SCHEME_HMAC = "hmac-sha256"
+SCHEME_BCRYPT = "bcrypt"
+REFRESH_HASH_SCHEME = os.getenv("REFRESH_HASH_SCHEME", SCHEME_HMAC)
+# Llave propia para el HMAC del refresh: JWT_PRIVATE puede ser una llave privada
+# PEM (RS256/EdDSA) y no debe reutilizarse. Solo en dev se cae a JWT_PRIVATE.
+_refresh_hmac_key = os.getenv("REFRESH_HMAC_KEY", "")
+if not _refresh_hmac_key and os.getenv("ENV", "dev") != "dev":
+    raise RuntimeError("REFRESH_HMAC_KEY is required outside dev")
+REFRESH_HMAC_KEY = (_refresh_hmac_key or JWT_PRIVATE).encode()
 
 def now_utc() -> datetime:
     return datetime.now(tz=timezone.utc)
 
-def make_access_token(sub: str, role: str = "user", plan: str = "free") -> tuple[str, int]:
+def make_access_token(sub: str, role: str = "user", plan: str = "free", epoch: int = 0) -> tuple[str, int]:
     exp = now_utc() + timedelta(minutes=ACCESS_TTL_MIN)
     jti = str(uuid.uuid4())
-    payload = {"sub": sub, "role": role, "plan": plan, "jti": jti, "exp": exp}
-    token = jwt.encode(payload, JWT_PRIVATE, algorithm=JWT_ALG)
+    # "ep": época de revocación del usuario (users.token_epoch) al emitir
+    payload = {"sub": sub, "role": role, "plan": plan, "jti": jti, "exp": exp, "ep": epoch}
+    token = keyring.sign(payload)
     return token, int(ACCESS_TTL_MIN * 60)
 
-def hash_refresh(raw_refresh: str) -> str:
+def _hmac_refresh(raw_refresh: str) -> str:
+    return hmac.new(REFRESH_HMAC_KEY, raw_refresh.encode(), hashlib.sha256).hexdigest()
+
+def _bcrypt_refresh(raw_refresh: str) -> str:
     digest = hashlib.sha256(raw_refresh.encode()).digest()
     return bcrypt.hashpw(digest, bcrypt.gensalt()).decode()
 
+def refresh_hash_scheme(hashed: str) -> str:
+    scheme, sep, _ = hashed.partition("$")
+    if sep and scheme in (SCHEME_HMAC, SCHEME_BCRYPT):
+        return scheme
+    return SCHEME_BCRYPT  # legado: bcrypt sin prefijo
+
+def hash_refresh(raw_refresh: str, scheme: str | None = None) -> str:
+    """
+    El refresh es aleatorio de alta entropía: un HMAC con clave del servidor
+    basta y cuesta microsegundos. bcrypt queda como esquema alternativo.
+    """
+    scheme = scheme or REFRESH_HASH_SCHEME
+    if scheme == SCHEME_HMAC:
+        return f"{SCHEME_HMAC}${_hmac_refresh(raw_refresh)}"
+    if scheme == SCHEME_BCRYPT:
+        return f"{SCHEME_BCRYPT}${_bcrypt_refresh(raw_refresh)}"
+    raise ValueError(f"Unknown refresh hash scheme: {scheme}")
+
 def verify_refresh(raw_refresh: str, hashed: str) -> bool:
     try:
+        scheme = refresh_hash_scheme(hashed)
+        if scheme == SCHEME_HMAC:
+            expected = hashed.split("$", 1)[1]
+            return hmac.compare_digest(_hmac_refresh(raw_refresh), expected)
+        if hashed.startswith(SCHEME_BCRYPT + "$"):
+            hashed = hashed.split("$", 1)[1]
         digest = hashlib.sha256(raw_refresh.encode()).digest()
         return bcrypt.checkpw(digest, hashed.encode())
     except Exception:
         return False
 
 def new_refresh_pair() -> tuple[str, str]:
-    raw = str(uuid.uuid4()) + "." + str(uuid.uuid4())
+    """Devuelve (raw, jti) con raw = "<jti>.<secreto>"."""
     jti = str(uuid.uuid4())
+    raw = jti + "." + secrets.token_urlsafe(32)
     return raw, jti
+
+def parse_refresh_jti(raw_refresh: str) -> str | None:
+    jti, sep, secret = raw_refresh.partition(".")
+    if not sep or not jti or not secret:
+        return None
+    return jti
+
+
+class RefreshHasher:
+    """
+    Ejecuta bcrypt fuera del event loop, en un pool de hilos acotado
+    (bcrypt libera el GIL, así que los hilos sí hashean en paralelo).
+    El semáforo limita la concurrencia y permite medir la cola de espera.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(1, max_workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._sem = asyncio.Semaphore(self.max_workers)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.busy_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="refresh-hash")
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+            self.in_flight -= 1
+            self.completed += 1
+            self._sem.release()
+
+    async def hash(self, raw_refresh: str) -> str:
+        # HMAC es barato: no vale la pena el salto al pool
+        if REFRESH_HASH_SCHEME == SCHEME_HMAC:
+            return hash_refresh(raw_refresh)
+        return await self._run(hash_refresh, raw_refresh)
+
+    async def verify(self, raw_refresh: str, hashed: str) -> bool:
+        if refresh_hash_scheme(hashed) == SCHEME_HMAC:
+            return verify_refresh(raw_refresh, hashed)
+        return await self._run(verify_refresh, raw_refresh, hashed)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "completed": self.completed,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Una instancia por worker de uvicorn
+refresh_hasher = RefreshHasher(HASH_MAX_WORKERS)
+
+async def hash_refresh_async(raw_refresh: str) -> str:
+    return await refresh_hasher.hash(raw_refresh)
+
+async def verify_refresh_async(raw_refresh: str, hashed: str) -> bool:
+    return await refresh_hasher.verify(raw_refresh, hashed)
@@ -0,0 +1,110 @@
+import uuid
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db_async import get_db
+from app.api.core.authn import get_current_claims, TokenClaims
+from app.api.core.idempotency import REPLAY_HEADER, Idempotency, IdempotencyGuard
+from app.domain.models.models import AnalysisRequest
+from app.domain.repositories.analyses_repo import AnalysesRepo, AnalysisRequestsRepo
+from app.domain.services.analysis_service import AnalysisService, DocumentNotFound, QuotaExceeded
+from app.domain.services.export_service import ExportService
+from app.schemas.analysis import AnalysisCreateIn, AnalysisOut, AnalysisRequestOut
+
+router = APIRouter()
+
+def _request_out(req: AnalysisRequest) -> AnalysisRequestOut:
+    return AnalysisRequestOut(
+        id=req.id,
+        status=req.status,
+        status_url=f"/analyses/requests/{req.id}",
+        document_id=req.document_id,
+        analysis_id=req.analysis_id,
+        error_message=req.error_message,
+        created_at=req.created_at,
+    )
+
+# Reintentos de la app móvil: un duplicado en curso espera al original antes de responder
+analysis_idempotency = Idempotency(wait_s=settings.ANALYSIS_IDEMPOTENCY_WAIT_S)
+
+@router.post("/analyses", response_model=AnalysisRequestOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis(
+    payload: AnalysisCreateIn,
+    response: Response,
+    idem: IdempotencyGuard = Depends(analysis_idempotency),
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Encola el análisis y responde 202 con la URL de estado (no bloquea al worker HTTP).
+    Con Idempotency-Key repetida devuelve el request original sin volver a encolar ni cobrar.
+    """
+    req = idem.replay
+    if req is None:
+        svc = AnalysisService(db)
+        try:
+            req, created = await svc.submit(claims.id, payload.document_id, idem.key)
+        except DocumentNotFound as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        except QuotaExceeded as e:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+        if not created:  # carrera: otro request reclamó la key entre la consulta y el insert
+            response.headers[REPLAY_HEADER] = "true"
+    if req.document_id != payload.document_id:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key already used for a different request",
+        )
+
+    out = _request_out(req)
+    response.headers["Location"] = out.status_url
+    return out
+
+@router.get("/analyses/requests/{request_id}", response_model=AnalysisRequestOut)
+async def get_analysis_request(
+    request_id: uuid.UUID,
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db),
+):
+    req = await AnalysisRequestsRepo(db).get_for_user(claims.id, request_id)
+    if not req:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis request not found")
+    return _request_out(req)
+
+@router.get("/analyses/{analysis_id}", response_model=AnalysisOut)
+async def get_analysis(
+    analysis_id: uuid.UUID,
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db),
+):
+    analysis = await AnalysesRepo(db).get_for_user(claims.id, analysis_id)
+    if not analysis:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found")
+    return analysis
+
+@router.get("/analyses/{analysis_id}/export")
+async def export_analysis(
+    analysis_id: uuid.UUID,
+    format: Literal["pdf", "docx"] = "pdf",
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Reporte del análisis en PDF o DOCX. Se renderiza una vez por versión de
+    plantilla y las descargas siguientes se sirven por streaming desde storage.
+    """
+    svc = ExportService(db)
+    found = await svc.get_or_render(claims.id, analysis_id, format)
+    if not found:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found")
+    storage_url, cached = found
+    return StreamingResponse(
+        svc.storage.read(storage_url),
+        media_type=svc.renderer(format).media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="analysis-{analysis_id}.{format}"',
+            "X-Export-Cache": "hit" if cached else "miss",
+        },
+    )
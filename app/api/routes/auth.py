@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.core.authn import TokenClaims, get_current_claims
 from app.db_async import get_db
 from app.schemas.auth import SocialLoginIn, TokenPairOut, RefreshIn
 from app.domain.services.auth_service import AuthService
@@ -41,4 +42,23 @@ async def logout(
     ip = request.client.host if request.client else None
     service = AuthService(db)
     await service.logout(refresh.refresh_token, user_agent=ua, ip=ip)
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@router.post("/logout-all")
+async def logout_all(
+    request: Request,
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cierra la sesión en todos los dispositivos: revoca todos los refresh e
+    invalida los access tokens ya emitidos (época de revocación).
+    """
+    ua = request.headers.get("user-agent", "unknown")
+    ip = request.client.host if request.client else None
+    service = AuthService(db)
+    try:
+        revoked = await service.logout_all(claims.id, user_agent=ua, ip=ip)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    return {"ok": True, "revoked_sessions": revoked}
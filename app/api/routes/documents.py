@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db_async import get_db
+from app.api.core.authn import get_current_claims, TokenClaims
+from app.domain.services.document_service import ALLOWED_MIME_TYPES, DocumentService, DocumentTooLarge
+from app.schemas.document import DocumentOut
+
+router = APIRouter()
+
+@router.post("/documents", response_model=DocumentOut, status_code=status.HTTP_201_CREATED)
+async def upload_document(
+    request: Request,
+    response: Response,
+    filename: str = Query(..., min_length=1, max_length=255),
+    x_content_sha256: str | None = Header(None),
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Sube el archivo como cuerpo crudo (Content-Type = tipo del documento).
+    Se procesa por chunks: nunca se bufferiza completo en memoria.
+    Si el cliente manda X-Content-SHA256 y ya existe, responde sin leer el cuerpo.
+    """
+    mime_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    if mime_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported document type")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.DOCUMENT_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Document too large")
+
+    svc = DocumentService(db)
+    if x_content_sha256:
+        existing = await svc.find_duplicate(claims.id, x_content_sha256)
+        if existing:
+            response.status_code = status.HTTP_200_OK
+            return DocumentOut.model_validate(existing).model_copy(update={"deduplicated": True})
+
+    try:
+        doc, deduplicated = await svc.upload(
+            claims.id,
+            filename=filename,
+            mime_type=mime_type,
+            chunks=request.stream(),
+            expected_sha256=x_content_sha256,
+        )
+    except DocumentTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if deduplicated:
+        response.status_code = status.HTTP_200_OK
+    return DocumentOut.model_validate(doc).model_copy(update={"deduplicated": deduplicated})
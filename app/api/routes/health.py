@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.db_async import db_healthcheck, get_pool_stats
+from app.api.core.authn import claims_cache, user_cache
+from app.api.core.revocation import revocation_epochs
+from app.api.core.security import refresh_hasher
+from app.domain.services.analysis_jobs import analysis_jobs
+from app.domain.services.audit_logger import audit_logger
+from app.domain.services.extraction import extraction_pipeline
+from app.domain.services.idp_verify import apple_keys, google_keys
+from app.domain.services.usage_buffer import usage_buffer
+from app.domain.services.webhook_processor import webhook_processor
+
+router = APIRouter()
+
+@router.get("/health/live")
+async def liveness():
+    return {"ok": True}
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness: la BD responde. Incluye las métricas del pool de conexiones.
+    """
+    db_ok = await db_healthcheck()
+    body = {"ok": db_ok, "db": db_ok, "pool": get_pool_stats()}
+    return JSONResponse(body, status_code=200 if db_ok else 503)
+
+@router.get("/health/metrics")
+async def metrics():
+    """Contadores en memoria de este worker."""
+    return {
+        "pool": get_pool_stats(),
+        "refresh_hasher": refresh_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "claims_cache": claims_cache.stats(),
+        "revocation_epochs": revocation_epochs.stats(),
+        "usage_buffer": usage_buffer.stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "webhooks": webhook_processor.stats(),
+        "audit": audit_logger.stats(),
+        "extraction": extraction_pipeline.stats(),
+        "jwks": {"google": google_keys.stats(), "apple": apple_keys.stats()},
+    }
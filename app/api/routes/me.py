@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db_async import get_db
-from app.api.core.authn import get_current_user
+from app.api.core.authn import (
+    get_current_user, get_current_user_for_update, get_current_claims,
+    invalidate_user, TokenClaims, UserSnapshot,
+)
 from app.domain.services.me_services import MeService
+from app.schemas.analysis import AnalysisPageOut
+from app.schemas.document import DocumentPageOut
 from app.schemas.me import MeLimitsOut, MeUsageWeekOut
 from app.schemas.user import UserOut, UserUpdateIn
 from app.domain.models.models import User
@@ -10,13 +15,13 @@ from app.domain.models.models import User
 router = APIRouter()
 
 @router.get("/me", response_model=UserOut)
-async def get_me(user: User = Depends(get_current_user)):
+async def get_me(user: UserSnapshot = Depends(get_current_user)):
     return user
 
 @router.patch("/me", response_model=UserOut)
 async def update_me(
     payload: UserUpdateIn,
-    user: User = Depends(get_current_user),
+    user: User = Depends(get_current_user_for_update),
     db: AsyncSession = Depends(get_db),
 ):
     if payload.name is not None:
@@ -24,21 +29,54 @@ async def update_me(
     if payload.avatar_url is not None:
         user.avatar_url = payload.avatar_url
     await db.commit()
+    invalidate_user(user.id)
     await db.refresh(user)
     return user
 
 @router.get("/me/limits", response_model=MeLimitsOut)
 async def me_limits(
-    user: User = Depends(get_current_user),
+    claims: TokenClaims = Depends(get_current_claims),
     db: AsyncSession = Depends(get_db),
 ):
     svc = MeService(db)
-    return await svc.get_limits(user.id)
+    try:
+        return await svc.get_limits(claims.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
 @router.get("/me/usage/week", response_model=MeUsageWeekOut)
 async def me_usage_week(
-    user: User = Depends(get_current_user),
+    claims: TokenClaims = Depends(get_current_claims),
     db: AsyncSession = Depends(get_db),
 ):
     svc = MeService(db)
-    return await svc.get_usage_week(user.id)
\ No newline at end of file
+    try:
+        return await svc.get_usage_week(claims.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+@router.get("/me/documents", response_model=DocumentPageOut)
+async def me_documents(
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = MeService(db)
+    try:
+        return await svc.list_documents(claims.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/me/analyses", response_model=AnalysisPageOut)
+async def me_analyses(
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    claims: TokenClaims = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = MeService(db)
+    try:
+        return await svc.list_analyses(claims.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
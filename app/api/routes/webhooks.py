@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db_async import get_db
+from app.domain.services.webhook_service import PROVIDERS, WebhookService
+
+router = APIRouter()
+
+@router.post("/webhooks/{provider}")
+async def receive_webhook(
+    provider: str,
+    request: Request,
+    stripe_signature: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Ack rápido: solo guarda el evento (idempotente por provider + event_id).
+    El procesamiento lo hace el webhook_processor en segundo plano.
+    """
+    if provider not in PROVIDERS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown provider")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.WEBHOOK_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Payload too large")
+    raw = await request.body()
+
+    try:
+        inserted = await WebhookService(db).ingest(provider, raw, stripe_signature)
+    except ValueError as e:  # incluye InvalidSignature
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"received": True, "duplicate": not inserted}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.api.core.keyring import keyring
+
+router = APIRouter()
+
+@router.get("/.well-known/jwks.json")
+async def jwks():
+    """
+    Llaves públicas para que otros servicios verifiquen los access tokens
+    localmente (por `kid`). En HS* no se publica nada: la lista queda vacía.
+    """
+    return JSONResponse(keyring.jwks(), headers={"Cache-Control": "public, max-age=300"})
@@ -24,11 +24,76 @@ class Settings(BaseSettings):
     ENV: str = "dev"
     DATABASE_URL: str
 
+    # Pool / engine (asyncpg)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_S: float = 30
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 0     # 0 = sin límite
+    DB_APPLICATION_NAME: str = "legal-api"
+
     JWT_PRIVATE: str
-    JWT_ALG: str = "HS256"
+    JWT_ALG: str = "HS256"                # HS256 | RS256 | ES256 | EdDSA (JWT_PRIVATE pasa a ser PEM privada)
+    JWT_KID: str = ""                     # vacío = thumbprint RFC 7638 de la llave ("default" en HS*)
+    JWT_VERIFY_KEYS: str = ""             # JSON [{"kid","alg","key"}]: llaves anteriores aceptadas en rotación
 
     ACCESS_TTL_MIN: int = 15
     REFRESH_TTL_DAYS: int = 60
+    REFRESH_HMAC_KEY: str = ""              # obligatoria fuera de dev (en dev se usa JWT_PRIVATE)
+    REVOCATION_POLL_INTERVAL_S: float = 5   # cada cuánto cada worker relee los logout-all recientes
+
+    # Login social: client ids separados por coma. Vacío = verificación MOCK en ENV=dev; fuera de dev se rechaza
+    GOOGLE_CLIENT_IDS: str = ""
+    APPLE_CLIENT_IDS: str = ""
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+    APPLE_JWKS_URL: str = "https://appleid.apple.com/auth/keys"
+
+    PLAN_CATALOG_TTL_S: int = 300
+
+    # Almacenamiento de documentos
+    STORAGE_BACKEND: str = "local"
+    STORAGE_LOCAL_ROOT: str = str(BASE_DIR / "var" / "storage")
+    DOCUMENT_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Cola de análisis
+    ANALYSIS_WORKERS: int = 2            # 0 = este proceso no ejecuta jobs
+    ANALYSIS_POLL_INTERVAL_MS: int = 1000
+    ANALYSIS_LEASE_TIMEOUT_S: int = 300
+    ANALYSIS_MAX_ATTEMPTS: int = 3
+    ANALYSIS_MODEL_BACKEND: str = "stub"
+    ANALYSIS_STUB_LATENCY_MS: int = 0
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_MAX_AGE_S: int = 30 * 24 * 3600
+    ANALYSIS_IDEMPOTENCY_WAIT_S: float = 5.0   # espera máx. de un duplicado en curso (0 = no esperar)
+
+    # Extracción de texto / OCR por página
+    EXTRACTION_ENABLED: bool = True
+    EXTRACTION_WORKERS: int = 2          # procesos; 0 = en un hilo del proceso web
+    EXTRACTION_OCR_LANG: str = "spa+eng"
+
+    # Webhooks de billing
+    STRIPE_WEBHOOK_SECRET: str = ""          # vacío = sin verificar firma en ENV=dev; fuera de dev se rechaza
+    WEBHOOK_MAX_BYTES: int = 1024 * 1024
+    WEBHOOK_PROCESSOR_ENABLED: bool = True
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_POLL_INTERVAL_MS: int = 2000
+
+    # Audit log asíncrono
+    AUDIT_ENABLED: bool = True
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500          # 6 parámetros por fila: muy por debajo del tope de asyncpg
+    AUDIT_FLUSH_INTERVAL_MS: int = 1000
+    AUDIT_QUEUE_POLICY: str = "drop"     # drop | block
+    AUDIT_BLOCK_TIMEOUT_MS: int = 50
+    AUDIT_DRAIN_TIMEOUT_S: float = 10.0
+
+    # Contadores de uso write-behind (opcional)
+    USAGE_WRITE_BEHIND: bool = False
+    USAGE_FLUSH_INTERVAL_MS: int = 500
+    USAGE_FLUSH_MAX_PENDING: int = 500
+    USAGE_RECOVERY_GRACE_S: int = 60
 
     class Config:
         # We already loaded from .env.dev with load_dotenv,
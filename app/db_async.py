@@ -1,21 +1,87 @@
 # app/db_async.py
-from sqlalchemy import text
+import time
+from sqlalchemy import event, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.domain.models.models import Base
 from app.core.config import settings
 
-print(settings.DATABASE_URL)
 DATABASE_URL = settings.DATABASE_URL
 
+class PoolStats:
+    """Métricas del pool de conexiones de este proceso."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0                # checkouts que tuvieron que esperar conexión
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pre_ping_failures = 0
+
+    def record_checkout(self, waited: float, timed_out: bool = False) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        # por debajo de 1 ms es una conexión libre del pool, no una espera
+        if waited >= 0.001:
+            self.waits += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+pool_stats = PoolStats()
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool que mide cuánto espera cada checkout."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_stats.record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_checkout(time.perf_counter() - started)
+        return conn
+
+def _connect_args() -> dict:
+    server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+    return {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": server_settings,
+    }
+
 # Engine global (una sola instancia por proceso)
 engine = create_async_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
+    poolclass=InstrumentedPool,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_S,
+    pool_recycle=settings.DB_POOL_RECYCLE_S,
+    connect_args=_connect_args(),
     future=True,
 )
 
+@event.listens_for(engine.sync_engine.pool, "connect")
+def _on_connect(dbapi_conn, conn_record):
+    pool_stats.connects += 1
+
+@event.listens_for(engine.sync_engine.pool, "invalidate")
+def _on_invalidate(dbapi_conn, conn_record, exception):
+    pool_stats.invalidations += 1
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _on_handle_error(ctx):
+    if ctx.is_pre_ping:
+        pool_stats.pre_ping_failures += 1
+
 # Session factory async
 SessionLocal = async_sessionmaker(
     bind=engine,
@@ -30,6 +96,24 @@ async def get_db() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
 
+def get_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": pool_stats.checkouts,
+        "waits": pool_stats.waits,
+        "wait_seconds_total": round(pool_stats.wait_seconds, 4),
+        "wait_seconds_max": round(pool_stats.max_wait_seconds, 4),
+        "timeouts": pool_stats.timeouts,
+        "connects": pool_stats.connects,
+        "invalidations": pool_stats.invalidations,
+        "pre_ping_failures": pool_stats.pre_ping_failures,
+    }
+
 # (Opcional) ping de salud
 async def db_healthcheck() -> bool:
     try:
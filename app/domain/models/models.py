@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 import uuid
 from sqlalchemy import (
     BigInteger, Boolean, CheckConstraint, Column, Date, DateTime, Enum, ForeignKey,
-    Index, Integer, Numeric, String, Text, UniqueConstraint
+    Index, Integer, Numeric, String, Text, UniqueConstraint, text
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB, INET
 from sqlalchemy.orm import declarative_base, relationship, Mapped, mapped_column
@@ -23,18 +23,27 @@ class SoftDeleteMixin:
 
 class User(Base, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "users"
+    __table_args__ = (
+        # el poller de épocas solo lee las revocaciones recientes
+        Index("ix_users_tokens_revoked_at", "tokens_revoked_at", postgresql_where=text("tokens_revoked_at IS NOT NULL")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email: Mapped[str] = mapped_column(String(320), unique=True, nullable=False)
     name: Mapped[str | None] = mapped_column(String(200))
     avatar_url: Mapped[str | None] = mapped_column(Text)
     role: Mapped[str] = mapped_column(String(30), default="user", nullable=False)
+    # Época de revocación: los access tokens llevan la vigente en el claim "ep";
+    # logout-all la incrementa y los tokens anteriores dejan de valer
+    token_epoch: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    tokens_revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     identities = relationship("UserIdentity", back_populates="user", cascade="all, delete-orphan")
     sessions = relationship("AuthSession", back_populates="user", cascade="all, delete-orphan")
     subscriptions = relationship("Subscription", back_populates="user")
-    documents = relationship("Document", back_populates="user")
-    analyses = relationship("Analysis", back_populates="user")
+    # Colecciones potencialmente grandes: nunca se cargan implícitamente (usar consultas paginadas)
+    documents = relationship("Document", back_populates="user", lazy="raise")
+    analyses = relationship("Analysis", back_populates="user", lazy="raise")
 
 class UserIdentity(Base, TimestampMixin):
     __tablename__ = "user_identities"
@@ -48,7 +57,7 @@ class UserIdentity(Base, TimestampMixin):
     provider: Mapped[str] = mapped_column(String(20), nullable=False)
     provider_user_id: Mapped[str] = mapped_column(String(255), nullable=False)
     email_verified: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    raw_profile: Mapped[dict | None] = mapped_column(JSONB)
+    raw_profile: Mapped[dict | None] = mapped_column(JSONB, deferred=True, deferred_raiseload=True)
 
     user = relationship("User", back_populates="identities")
 
@@ -68,6 +77,8 @@ class AuthSession(Base, TimestampMixin):
     user_agent: Mapped[str | None] = mapped_column(Text)
     ip: Mapped[str | None] = mapped_column(INET)
     revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # users.token_epoch al crear la cadena: si el usuario hizo logout-all después, no rota
+    token_epoch: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     user = relationship("User", back_populates="sessions")
 
@@ -109,6 +120,8 @@ class Subscription(Base, TimestampMixin):
     cancel_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     external_customer_id: Mapped[str | None] = mapped_column(String(120))
     external_subscription_id: Mapped[str | None] = mapped_column(String(120))
+    # `created` del último evento del proveedor aplicado: descarta entregas fuera de orden
+    last_event_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     user = relationship("User", back_populates="subscriptions")
     plan = relationship("Plan", back_populates="subscriptions")
@@ -156,6 +169,8 @@ class Document(Base, TimestampMixin, SoftDeleteMixin):
     __table_args__ = (
         Index("ix_documents_user", "user_id", "created_at"),
         Index("ix_documents_type", "doc_type"),
+        Index("ix_documents_user_sha", "user_id", "sha256"),
+        Index("ix_documents_sha256", "sha256"),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -172,6 +187,23 @@ class Document(Base, TimestampMixin, SoftDeleteMixin):
     user = relationship("User", back_populates="documents")
     analyses = relationship("Analysis", back_populates="document", cascade="all, delete-orphan")
 
+class PageText(Base, TimestampMixin):
+    """
+    Caché de extracción por página, por contenido: (sha256 del documento, página, extractor).
+    Re-subidas del mismo archivo y re-análisis reutilizan las páginas ya extraídas.
+    """
+    __tablename__ = "page_texts"
+    __table_args__ = (
+        UniqueConstraint("doc_sha256", "page_no", "extractor", name="uq_page_text"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    doc_sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    page_no: Mapped[int] = mapped_column(Integer, nullable=False)   # 1-based
+    extractor: Mapped[str] = mapped_column(String(40), nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False, deferred=True, deferred_raiseload=True)
+    ocr: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
 class Analysis(Base, TimestampMixin):
     __tablename__ = "analyses"
     __table_args__ = (
@@ -183,9 +215,11 @@ class Analysis(Base, TimestampMixin):
     document_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     model: Mapped[str] = mapped_column(String(80), nullable=False)
+    prompt_version: Mapped[str | None] = mapped_column(String(40))
     risk_score: Mapped[float | None] = mapped_column(Numeric(3, 1))
-    summary: Mapped[str | None] = mapped_column(Text)
-    result_json: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    # Columnas pesadas: diferidas; los repos que las necesitan hacen undefer explícito
+    summary: Mapped[str | None] = mapped_column(Text, deferred=True, deferred_raiseload=True)
+    result_json: Mapped[dict] = mapped_column(JSONB, nullable=False, deferred=True, deferred_raiseload=True)
     tokens_input: Mapped[int | None] = mapped_column(Integer)
     tokens_output: Mapped[int | None] = mapped_column(Integer)
     duration_ms: Mapped[int | None] = mapped_column(Integer)
@@ -207,8 +241,8 @@ class ClauseAnnotation(Base):
     clause_type: Mapped[str] = mapped_column(String(10), nullable=False)
     page: Mapped[int | None] = mapped_column(Integer)
     bbox: Mapped[dict | None] = mapped_column(JSONB)
-    text: Mapped[str | None] = mapped_column(Text)
-    explanation: Mapped[str | None] = mapped_column(Text)
+    text: Mapped[str | None] = mapped_column(Text, deferred=True, deferred_raiseload=True)
+    explanation: Mapped[str | None] = mapped_column(Text, deferred=True, deferred_raiseload=True)
     risk_weight: Mapped[float | None] = mapped_column(Numeric(4, 2))
 
     analysis = relationship("Analysis", back_populates="annotations")
@@ -218,11 +252,13 @@ class ExportedReport(Base, TimestampMixin):
     __table_args__ = (
         CheckConstraint("format IN ('pdf','docx')", name="ck_export_format"),
         Index("ix_export_analysis", "analysis_id"),
+        UniqueConstraint("analysis_id", "format", "template_version", name="uq_export_analysis_format_tpl"),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     analysis_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("analyses.id", ondelete="CASCADE"), nullable=False)
     format: Mapped[str] = mapped_column(String(10), nullable=False)
+    template_version: Mapped[str] = mapped_column(String(20), nullable=False, default="v1", server_default="v1")
     storage_url: Mapped[str | None] = mapped_column(Text)
 
     analysis = relationship("Analysis", back_populates="exports")
@@ -254,7 +290,7 @@ class WebhookEvent(Base, TimestampMixin):
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     provider: Mapped[str] = mapped_column(String(30), nullable=False)  # stripe, app_store, play_store
     event_id: Mapped[str] = mapped_column(String(120), nullable=False)
-    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, deferred=True, deferred_raiseload=True)
     received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="received")
@@ -267,11 +303,26 @@ class AnalysisRequest(Base, TimestampMixin):
     __table_args__ = (
         UniqueConstraint("user_id", "idempotency_key", name="uq_analysis_idem"),
         Index("ix_analysis_req_user", "user_id"),
+        Index(
+            "ix_analysis_req_uncounted", "created_at",
+            postgresql_where=text("counted_at IS NULL AND usage_window_start IS NOT NULL"),
+        ),
+        Index(
+            "ix_analysis_req_queue", "created_at",
+            postgresql_where=text("status IN ('pending','running')"),
+        ),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     idempotency_key: Mapped[str] = mapped_column(String(80), nullable=False)
-    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")  # pending/completed/failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")  # pending/running/completed/failed
+    document_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"))
+    model: Mapped[str | None] = mapped_column(String(80))
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))  # lease del worker
     analysis_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("analyses.id", ondelete="SET NULL"))
     error_message: Mapped[str | None] = mapped_column(Text)
+    # Contadores write-behind: ventana a la que suma y cuándo se volcó a user_usage_windows
+    usage_window_start: Mapped[date | None] = mapped_column(Date)
+    counted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
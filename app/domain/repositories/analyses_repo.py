@@ -0,0 +1,281 @@
+# app/domain/repositories/analyses_repo.py
+from __future__ import annotations
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Mapping, Optional, Sequence
+from sqlalchemy import and_, or_, select, update, insert, literal
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from app.domain.models.models import Analysis, AnalysisRequest, ClauseAnnotation, Document
+from app.utils.batching import insert_batches
+from app.utils.pagination import keyset_page
+
+class AnalysesRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_for_user(self, user_id, analysis_id) -> Optional[Analysis]:
+        """Análisis completo (incluye result_json y summary, diferidas por defecto)."""
+        q = await self.db.execute(
+            select(Analysis)
+            .options(undefer(Analysis.result_json), undefer(Analysis.summary))
+            .where(Analysis.id == analysis_id, Analysis.user_id == user_id)
+        )
+        return q.scalar_one_or_none()
+
+    async def list_page(self, user_id, *, cursor: Optional[str], limit: int, history_cap: Optional[int]):
+        """
+        Resúmenes del historial (sin result_json ni summary), más recientes primero.
+        history_cap se aplica en SQL: solo son visibles los `history_cap` más recientes.
+        """
+        cols = (
+            Analysis.id, Analysis.document_id, Analysis.model, Analysis.risk_score,
+            Analysis.duration_ms, Analysis.created_at,
+        )
+        base = select(*cols).where(Analysis.user_id == user_id)
+        if history_cap is not None:
+            visible = (
+                base.order_by(Analysis.created_at.desc(), Analysis.id.desc())
+                .limit(history_cap)
+                .subquery("visible")
+            )
+            q = keyset_page(select(visible), visible.c.created_at, visible.c.id, cursor, limit)
+        else:
+            q = keyset_page(base, Analysis.created_at, Analysis.id, cursor, limit)
+        res = await self.db.execute(q)
+        return res.all()
+
+    async def create(self, *, user_id, document_id, model: str, prompt_version: str | None, result_json: dict,
+                     risk_score: float | None, summary: str | None,
+                     tokens_input: int | None, tokens_output: int | None, duration_ms: int | None,
+                     annotations: list[dict]) -> Analysis:
+        analysis = Analysis(
+            user_id=user_id,
+            document_id=document_id,
+            model=model,
+            prompt_version=prompt_version,
+            risk_score=risk_score,
+            summary=summary,
+            result_json=result_json,
+            tokens_input=tokens_input,
+            tokens_output=tokens_output,
+            duration_ms=duration_ms,
+        )
+        self.db.add(analysis)
+        await self.db.flush()
+        await self.bulk_insert_annotations(analysis.id, annotations)
+        return analysis
+
+    async def bulk_insert_annotations(self, analysis_id, annotations: Sequence[Mapping]) -> int:
+        """
+        Inserta las anotaciones de un análisis con INSERT multi-fila (un statement
+        por lote), sin construir objetos ORM ni engordar el identity map.
+        """
+        ca = ClauseAnnotation.__table__
+        rows = [
+            {
+                "analysis_id": analysis_id,
+                "clause_type": a["clause_type"],
+                "page": a.get("page"),
+                "bbox": a.get("bbox"),
+                "text": a.get("text"),
+                "explanation": a.get("explanation"),
+                "risk_weight": a.get("risk_weight"),
+            }
+            for a in annotations
+        ]
+        for batch in insert_batches(rows):
+            await self.db.execute(insert(ca).values(batch))
+        return len(rows)
+
+    async def stream_annotations(self, analysis_id, batch: int = 500) -> AsyncIterator:
+        """
+        Anotaciones en orden de página, vía cursor del servidor (`batch` filas
+        por fetch): la memoria no crece con el número de anotaciones.
+        """
+        ca = ClauseAnnotation.__table__
+        res = await self.db.stream(
+            select(ca.c.clause_type, ca.c.page, ca.c.text, ca.c.explanation, ca.c.risk_weight)
+            .where(ca.c.analysis_id == analysis_id)
+            .order_by(ca.c.page.asc().nulls_last(), ca.c.id)
+            .execution_options(yield_per=batch)
+        )
+        async for row in res:
+            yield row
+
+    async def find_cached(self, *, sha256: str, model: str, prompt_version: str,
+                          max_age_s: float) -> Optional[Analysis]:
+        """
+        Caché de resultados por contenido: el análisis más reciente de cualquier
+        documento con el mismo sha256, modelo y versión de prompt.
+        """
+        since = datetime.now(tz=timezone.utc) - timedelta(seconds=max_age_s)
+        q = await self.db.execute(
+            select(Analysis)
+            .options(undefer(Analysis.result_json))
+            .join(Document, Document.id == Analysis.document_id)
+            .where(
+                Document.sha256 == sha256,
+                Analysis.model == model,
+                Analysis.prompt_version == prompt_version,
+                Analysis.created_at >= since,
+            )
+            .order_by(Analysis.created_at.desc())
+            .limit(1)
+        )
+        return q.scalar_one_or_none()
+
+    async def clone(self, source: Analysis, *, user_id, document_id, summary: Optional[str],
+                    duration_ms: int) -> Analysis:
+        """
+        Nuevo Analysis que reutiliza el resultado de `source`. Las anotaciones se
+        copian con un solo INSERT ... SELECT, sin pasar por el ORM.
+        `summary` lo arma el llamador para el documento destino: el de `source`
+        puede mencionar datos del documento de otro usuario.
+        """
+        analysis = Analysis(
+            user_id=user_id,
+            document_id=document_id,
+            model=source.model,
+            prompt_version=source.prompt_version,
+            risk_score=source.risk_score,
+            summary=summary,
+            result_json=source.result_json,
+            tokens_input=0,   # no hubo llamada al modelo
+            tokens_output=0,
+            duration_ms=duration_ms,
+        )
+        self.db.add(analysis)
+        await self.db.flush()
+
+        ca = ClauseAnnotation.__table__
+        await self.db.execute(
+            insert(ca).from_select(
+                ["analysis_id", "clause_type", "page", "bbox", "text", "explanation", "risk_weight"],
+                select(
+                    literal(analysis.id, UUID(as_uuid=True)),
+                    ca.c.clause_type, ca.c.page, ca.c.bbox, ca.c.text, ca.c.explanation, ca.c.risk_weight,
+                )
+                .where(ca.c.analysis_id == source.id)
+                .order_by(ca.c.id),
+            )
+        )
+        return analysis
+
+class AnalysisRequestsRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, request_id) -> Optional[AnalysisRequest]:
+        q = await self.db.execute(select(AnalysisRequest).where(AnalysisRequest.id == request_id))
+        return q.scalar_one_or_none()
+
+    async def get_for_user(self, user_id, request_id) -> Optional[AnalysisRequest]:
+        q = await self.db.execute(
+            select(AnalysisRequest).where(AnalysisRequest.id == request_id, AnalysisRequest.user_id == user_id)
+        )
+        return q.scalar_one_or_none()
+
+    async def get_by_key(self, user_id, idempotency_key: str) -> Optional[AnalysisRequest]:
+        q = await self.db.execute(
+            select(AnalysisRequest).where(
+                AnalysisRequest.user_id == user_id,
+                AnalysisRequest.idempotency_key == idempotency_key,
+            )
+        )
+        return q.scalar_one_or_none()
+
+    async def claim_key(self, user_id, idempotency_key: str, **values) -> Optional[uuid.UUID]:
+        """
+        Reclama la key con INSERT ... ON CONFLICT DO NOTHING RETURNING id.
+        Retorna el id del request nuevo, o None si la key ya estaba tomada.
+        """
+        ar = AnalysisRequest.__table__
+        res = await self.db.execute(
+            pg_insert(ar)
+            .values(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                idempotency_key=idempotency_key,
+                status="pending",
+                **values,
+            )
+            .on_conflict_do_nothing(index_elements=[ar.c.user_id, ar.c.idempotency_key])
+            .returning(ar.c.id)
+        )
+        return res.scalar_one_or_none()
+
+    async def claim_next(self, lease_timeout_s: float, max_attempts: int) -> Optional[AnalysisRequest]:
+        """
+        Toma el siguiente job con SELECT ... FOR UPDATE SKIP LOCKED y lo marca 'running'.
+        Los 'running' con lease vencido (worker caído) se vuelven a tomar mientras les
+        queden intentos; los que ya agotaron `max_attempts` se marcan 'failed'.
+        El llamador debe hacer commit enseguida: el lock no se mantiene durante el análisis.
+        """
+        now = datetime.now(tz=timezone.utc)
+        stale = now - timedelta(seconds=lease_timeout_s)
+        ar = AnalysisRequest
+        await self.db.execute(
+            update(ar)
+            .where(ar.status == "running", ar.claimed_at < stale, ar.attempts >= max_attempts)
+            .values(status="failed", error_message="Lease expired", claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        next_id = (
+            select(ar.id)
+            .where(
+                ar.document_id.is_not(None),
+                or_(
+                    ar.status == "pending",
+                    and_(ar.status == "running", ar.claimed_at < stale, ar.attempts < max_attempts),
+                ),
+            )
+            .order_by(ar.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        q = (
+            update(ar)
+            .where(ar.id == next_id)
+            .values(status="running", claimed_at=now, attempts=ar.attempts + 1)
+            .returning(ar)
+            .execution_options(synchronize_session=False)
+        )
+        res = await self.db.execute(q)
+        return res.scalar_one_or_none()
+
+    # complete/fail/renew van cercados por `claimed_at`: si el lease venció y otro
+    # worker retomó el job, el UPDATE no toca nada y devuelven False / None.
+
+    async def renew(self, request_id, claimed_at: datetime) -> Optional[datetime]:
+        ar = AnalysisRequest
+        res = await self.db.execute(
+            update(ar)
+            .where(ar.id == request_id, ar.status == "running", ar.claimed_at == claimed_at)
+            .values(claimed_at=datetime.now(tz=timezone.utc))
+            .returning(ar.claimed_at)
+            .execution_options(synchronize_session=False)
+        )
+        return res.scalar_one_or_none()
+
+    async def complete(self, request_id, claimed_at: datetime, analysis_id: uuid.UUID) -> bool:
+        ar = AnalysisRequest
+        res = await self.db.execute(
+            update(ar)
+            .where(ar.id == request_id, ar.status == "running", ar.claimed_at == claimed_at)
+            .values(status="completed", analysis_id=analysis_id, error_message=None)
+            .execution_options(synchronize_session=False)
+        )
+        return res.rowcount == 1
+
+    async def fail(self, request_id, claimed_at: datetime, error: str, retry: bool) -> bool:
+        ar = AnalysisRequest
+        res = await self.db.execute(
+            update(ar)
+            .where(ar.id == request_id, ar.status == "running", ar.claimed_at == claimed_at)
+            .values(status="pending" if retry else "failed", error_message=error[:2000], claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        return res.rowcount == 1
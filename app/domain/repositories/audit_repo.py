@@ -0,0 +1,16 @@
+# app/domain/repositories/audit_repo.py
+from typing import Mapping, Sequence
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.models.models import AuditLog
+
+class AuditRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def insert_many(self, rows: Sequence[Mapping]) -> int:
+        """Un solo INSERT multi-fila; claves: user_id, action, entity, entity_id, metadata, created_at."""
+        if not rows:
+            return 0
+        await self.db.execute(insert(AuditLog.__table__).values(list(rows)))
+        return len(rows)
@@ -0,0 +1,105 @@
+# app/domain/repositories/billing_repo.py
+from __future__ import annotations
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.models.models import Payment, Subscription
+
+class BillingRepo:
+    """Escrituras de suscripciones y pagos que llegan por webhooks de los proveedores."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_subscription(self, provider: str, external_subscription_id: str) -> Optional[Subscription]:
+        q = await self.db.execute(
+            select(Subscription)
+            .where(
+                Subscription.provider == provider,
+                Subscription.external_subscription_id == external_subscription_id,
+            )
+            .order_by(Subscription.created_at.desc())
+            .limit(1)
+        )
+        return q.scalar_one_or_none()
+
+    async def user_for_customer(self, provider: str, external_customer_id: str | None) -> Optional[uuid.UUID]:
+        if not external_customer_id:
+            return None
+        q = await self.db.execute(
+            select(Subscription.user_id)
+            .where(
+                Subscription.provider == provider,
+                Subscription.external_customer_id == external_customer_id,
+            )
+            .limit(1)
+        )
+        return q.scalar_one_or_none()
+
+    async def upsert_subscription(self, *, user_id, provider: str, external_subscription_id: str,
+                                  external_customer_id: str | None, plan_id: int, status: str,
+                                  current_period_start: datetime | None, current_period_end: datetime | None,
+                                  cancel_at: datetime | None, event_created_at: datetime | None) -> bool:
+        """
+        Retorna False si el evento es más viejo que el último aplicado a la suscripción
+        (Stripe puede entregar fuera de orden); en ese caso no se modifica nada.
+        """
+        sub = Subscription.__table__
+        changes = {
+            "plan_id": plan_id,
+            "status": status,
+            "external_customer_id": external_customer_id,
+            "current_period_start": current_period_start,
+            "current_period_end": current_period_end,
+            "cancel_at": cancel_at,
+            "last_event_at": event_created_at,
+        }
+        stmt = insert(sub).values(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            provider=provider,
+            external_subscription_id=external_subscription_id,
+            created_at=datetime.now(tz=timezone.utc),
+            **changes,
+        )
+        res = await self.db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_sub_user_provider_ext",
+                set_={k: stmt.excluded[k] for k in changes},
+                where=or_(sub.c.last_event_at.is_(None), sub.c.last_event_at <= stmt.excluded.last_event_at),
+            )
+            .returning(sub.c.id)
+        )
+        return res.first() is not None
+
+    async def upsert_payment(self, *, provider: str, provider_payment_id: str, user_id,
+                             subscription_id, amount_cents: int, currency: str, status: str) -> None:
+        pay = Payment.__table__
+        stmt = insert(pay).values(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            subscription_id=subscription_id,
+            amount_cents=amount_cents,
+            currency=currency,
+            provider=provider,
+            provider_payment_id=provider_payment_id,
+            status=status,
+            created_at=datetime.now(tz=timezone.utc),
+        )
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_provider_payment_id",
+                set_={"status": stmt.excluded.status, "amount_cents": stmt.excluded.amount_cents},
+            )
+        )
+
+    async def set_payment_status(self, provider_payment_id: str, status: str) -> None:
+        await self.db.execute(
+            update(Payment)
+            .where(Payment.provider_payment_id == provider_payment_id)
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
@@ -0,0 +1,77 @@
+# app/domain/repositories/documents_repo.py
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.models.models import Document
+from app.utils.pagination import keyset_page
+
+class DocumentsRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_for_user(self, user_id, document_id) -> Document | None:
+        q = await self.db.execute(
+            select(Document).where(
+                Document.id == document_id,
+                Document.user_id == user_id,
+                Document.deleted_at.is_(None),
+            )
+        )
+        return q.scalar_one_or_none()
+
+    async def get_by_user_sha256(self, user_id, sha256: str) -> Document | None:
+        q = await self.db.execute(
+            select(Document)
+            .where(
+                Document.user_id == user_id,
+                Document.sha256 == sha256,
+                Document.deleted_at.is_(None),
+            )
+            .order_by(Document.created_at.desc())
+            .limit(1)
+        )
+        return q.scalar_one_or_none()
+
+    async def create(self, *, user_id, filename: str, mime_type: str, size_bytes: int,
+                     sha256: str, storage_url: str) -> Document:
+        doc = Document(
+            user_id=user_id,
+            filename=filename,
+            mime_type=mime_type,
+            size_bytes=size_bytes,
+            sha256=sha256,
+            storage_url=storage_url,
+        )
+        self.db.add(doc)
+        await self.db.flush()
+        return doc
+
+    async def set_extracted(self, document_id, *, page_count: int, ocr_done: bool) -> None:
+        await self.db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(page_count=page_count, ocr_done=ocr_done)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def list_page(self, user_id, *, cursor: Optional[str], limit: int, history_cap: Optional[int]):
+        """
+        Resúmenes (sin columnas pesadas) del historial del usuario, más recientes primero.
+        history_cap se aplica en SQL: solo son visibles los `history_cap` más recientes.
+        """
+        cols = (
+            Document.id, Document.filename, Document.mime_type, Document.size_bytes,
+            Document.doc_type, Document.page_count, Document.created_at,
+        )
+        base = select(*cols).where(Document.user_id == user_id, Document.deleted_at.is_(None))
+        if history_cap is not None:
+            visible = (
+                base.order_by(Document.created_at.desc(), Document.id.desc())
+                .limit(history_cap)
+                .subquery("visible")
+            )
+            q = keyset_page(select(visible), visible.c.created_at, visible.c.id, cursor, limit)
+        else:
+            q = keyset_page(base, Document.created_at, Document.id, cursor, limit)
+        res = await self.db.execute(q)
+        return res.all()
@@ -0,0 +1,35 @@
+# app/domain/repositories/exports_repo.py
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.models.models import ExportedReport
+
+class ExportsRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, analysis_id, fmt: str, template_version: str) -> Optional[ExportedReport]:
+        q = await self.db.execute(
+            select(ExportedReport).where(
+                ExportedReport.analysis_id == analysis_id,
+                ExportedReport.format == fmt,
+                ExportedReport.template_version == template_version,
+            )
+        )
+        return q.scalar_one_or_none()
+
+    async def upsert(self, analysis_id, fmt: str, template_version: str, storage_url: str) -> None:
+        """Dos renders concurrentes del mismo export terminan en una sola fila."""
+        stmt = insert(ExportedReport.__table__).values(
+            analysis_id=analysis_id,
+            format=fmt,
+            template_version=template_version,
+            storage_url=storage_url,
+        )
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_export_analysis_format_tpl",
+                set_={"storage_url": stmt.excluded.storage_url},
+            )
+        )
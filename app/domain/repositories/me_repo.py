@@ -0,0 +1,56 @@
+# app/domain/repositories/me_repo.py
+from __future__ import annotations
+import uuid
+from datetime import date, datetime, timezone
+from typing import NamedTuple, Optional
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.models.models import Subscription, User, UserUsageWindow
+
+class LimitsSnapshot(NamedTuple):
+    user_id: uuid.UUID
+    plan_id: Optional[int]      # None = sin suscripción vigente (FREE)
+    analyses_count: int
+
+class MeRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_limits_snapshot(self, user_id, week_start_date: date) -> Optional[LimitsSnapshot]:
+        """
+        En un solo statement: el usuario, el plan_id de su suscripción vigente
+        y el contador de la semana. Los límites del plan salen del catálogo en memoria.
+        Devuelve None si el usuario no existe.
+        """
+        now_utc = datetime.now(tz=timezone.utc)
+        active_plan_id = (
+            select(Subscription.plan_id)
+            .where(
+                Subscription.user_id == User.id,
+                Subscription.status.in_(("active", "in_trial")),
+                (Subscription.current_period_start.is_(None) | (Subscription.current_period_start <= now_utc)),
+                (Subscription.current_period_end.is_(None) | (Subscription.current_period_end > now_utc)),
+            )
+            .order_by(Subscription.created_at.desc())
+            .limit(1)
+            .correlate(User)
+            .scalar_subquery()
+        )
+        q = (
+            select(
+                User.id,
+                active_plan_id.label("plan_id"),
+                func.coalesce(UserUsageWindow.analyses_count, 0).label("analyses_count"),
+            )
+            .select_from(User)
+            .outerjoin(
+                UserUsageWindow,
+                and_(UserUsageWindow.user_id == User.id, UserUsageWindow.window_start == week_start_date),
+            )
+            .where(User.id == user_id)
+        )
+        res = await self.db.execute(q)
+        row = res.first()
+        if not row:
+            return None
+        return LimitsSnapshot(row.id, row.plan_id, int(row.analyses_count))
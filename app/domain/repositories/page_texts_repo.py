@@ -0,0 +1,44 @@
+# app/domain/repositories/page_texts_repo.py
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Sequence
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.models.models import PageText
+from app.utils.batching import insert_batches
+
+class PageTextsRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_pages(self, doc_sha256: str, extractor: str) -> dict[int, tuple[str, bool]]:
+        """{page_no: (texto, ocr)} de las páginas ya extraídas de ese contenido."""
+        res = await self.db.execute(
+            select(PageText.page_no, PageText.text, PageText.ocr).where(
+                PageText.doc_sha256 == doc_sha256,
+                PageText.extractor == extractor,
+            )
+        )
+        return {r.page_no: (r.text, r.ocr) for r in res}
+
+    async def save_pages(self, doc_sha256: str, extractor: str,
+                         pages: Sequence[tuple[int, str, bool]]) -> None:
+        """INSERT multi-fila; ON CONFLICT DO NOTHING si otro worker extrajo las mismas páginas."""
+        if not pages:
+            return
+        now = datetime.now(tz=timezone.utc)
+        pt = PageText.__table__
+        rows = [
+            {
+                "doc_sha256": doc_sha256,
+                "page_no": page_no,
+                "extractor": extractor,
+                "text": text.replace("\x00", ""),   # Postgres no admite NUL en text
+                "ocr": ocr,
+                "created_at": now,
+            }
+            for page_no, text, ocr in pages
+        ]
+        for batch in insert_batches(rows):
+            await self.db.execute(insert(pt).values(batch).on_conflict_do_nothing(constraint="uq_page_text"))
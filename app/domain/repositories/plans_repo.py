@@ -35,6 +35,30 @@ class PlansRepo:
             return None
         return row[0], row[1]
 
+    async def get_active_plan_id(self, user_id) -> Optional[int]:
+        """
+        Igual que get_active_subscription_with_plan, pero solo devuelve el plan_id
+        (los límites se resuelven con el catálogo en memoria).
+        """
+        now_utc = datetime.now(tz=timezone.utc)
+        q = (
+            select(Subscription.plan_id)
+            .where(
+                Subscription.user_id == user_id,
+                Subscription.status.in_(("active", "in_trial")),
+                (Subscription.current_period_start.is_(None) | (Subscription.current_period_start <= now_utc)),
+                (Subscription.current_period_end.is_(None) | (Subscription.current_period_end > now_utc)),
+            )
+            .order_by(Subscription.created_at.desc())
+            .limit(1)
+        )
+        res = await self.db.execute(q)
+        return res.scalar_one_or_none()
+
+    async def list_plans(self) -> list[Plan]:
+        res = await self.db.execute(select(Plan))
+        return list(res.scalars().all())
+
     async def get_plan_by_code(self, code: str) -> Optional[Plan]:
         q = select(Plan).where(Plan.code == code, Plan.active.is_(True)).limit(1)
         res = await self.db.execute(q)
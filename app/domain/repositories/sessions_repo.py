@@ -1,17 +1,21 @@
 # app/domain/repositories/sessions_repo.py
-from datetime import datetime
-from sqlalchemy import select, update
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import func, select, update, insert, literal, Text, String, DateTime
+from sqlalchemy.dialects.postgresql import UUID, INET
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.domain.models.models import AuthSession
+from app.domain.models.models import AuthSession, User
 
 class SessionsRepo:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create(self, *, user_id, refresh_hash: str, jti: str, parent_jti: str | None,
-                     expires_at: datetime, user_agent: str | None, ip: str | None) -> AuthSession:
+                     expires_at: datetime, user_agent: str | None, ip: str | None,
+                     token_epoch: int = 0) -> AuthSession:
         s = AuthSession(
             user_id=user_id,
+            token_epoch=token_epoch,
             refresh_token_hash=refresh_hash,
             jti=jti,
             parent_jti=parent_jti,
@@ -27,9 +31,93 @@ class SessionsRepo:
         q = await self.db.execute(select(AuthSession).where(AuthSession.jti == jti, AuthSession.revoked_at.is_(None)))
         return q.scalar_one_or_none()
 
+    async def rotate(self, *, jti: str, refresh_hash: str, new_jti: str, expires_at: datetime,
+                     user_agent: str | None, ip: str | None) -> tuple[uuid.UUID, str, int] | None:
+        """
+        Revoca la sesión activa `jti` y crea la hija en un solo statement:
+        UPDATE ... RETURNING + INSERT ... SELECT como CTEs.
+        Devuelve (user_id, hash del refresh anterior, token_epoch de la cadena)
+        o None si no había sesión vigente.
+        Una sesión con época menor a la del usuario no rota: cubre la hija que un
+        rotate concurrente insertó fuera del snapshot del logout-all (revoke_all).
+        La verificación del hash queda en el llamador (si falla, hace rollback).
+        """
+        t = AuthSession.__table__
+        now = datetime.now(tz=timezone.utc)
+        old = (
+            update(t)
+            .where(
+                t.c.jti == jti,
+                t.c.revoked_at.is_(None),
+                t.c.expires_at > now,
+                t.c.token_epoch >= select(User.token_epoch).where(User.id == t.c.user_id).scalar_subquery(),
+            )
+            .values(revoked_at=now)
+            .returning(t.c.user_id, t.c.jti, t.c.refresh_token_hash, t.c.token_epoch)
+            .cte("old")
+        )
+        child = (
+            insert(t)
+            .from_select(
+                ["id", "user_id", "refresh_token_hash", "jti", "parent_jti",
+                 "expires_at", "user_agent", "ip", "created_at", "token_epoch"],
+                select(
+                    literal(uuid.uuid4(), UUID(as_uuid=True)),
+                    old.c.user_id,
+                    literal(refresh_hash, Text()),
+                    literal(new_jti, String(128)),
+                    old.c.jti,
+                    literal(expires_at, DateTime(timezone=True)),
+                    literal(user_agent, Text()),
+                    literal(ip, INET()),
+                    literal(now, DateTime(timezone=True)),
+                    old.c.token_epoch,
+                ),
+            )
+            .cte("child")
+        )
+        q = select(old.c.user_id, old.c.refresh_token_hash, old.c.token_epoch).add_cte(child)
+        row = (await self.db.execute(q)).first()
+        if not row:
+            return None
+        return row[0], row[1], row[2]
+
     async def revoke_chain(self, jti: str):
         # revoca el jti actual (puedes ampliar a la cadena si detectas replay)
+        # retorna el user_id de la sesión revocada, o None si no había sesión activa
         now = datetime.utcnow()
-        await self.db.execute(
-            update(AuthSession).where(AuthSession.jti == jti, AuthSession.revoked_at.is_(None)).values(revoked_at=now)
+        res = await self.db.execute(
+            update(AuthSession)
+            .where(AuthSession.jti == jti, AuthSession.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .returning(AuthSession.user_id)
+        )
+        return res.scalar_one_or_none()
+
+    async def revoke_all(self, user_id) -> tuple[int, int] | None:
+        """
+        Logout global en un solo statement: incrementa users.token_epoch
+        (invalida los access tokens emitidos) y revoca todas las sesiones
+        refresh activas del usuario.
+        Devuelve (nueva época, sesiones revocadas) o None si el usuario no existe.
+        """
+        now = datetime.now(tz=timezone.utc)
+        revoked = (
+            update(AuthSession)
+            .where(AuthSession.user_id == user_id, AuthSession.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .returning(AuthSession.id)
+            .cte("revoked")
+        )
+        bumped = (
+            update(User)
+            .where(User.id == user_id)
+            .values(token_epoch=User.token_epoch + 1, tokens_revoked_at=now)
+            .returning(User.token_epoch)
+            .cte("bumped")
         )
+        q = select(bumped.c.token_epoch, select(func.count()).select_from(revoked).scalar_subquery())
+        row = (await self.db.execute(q)).first()
+        if not row:
+            return None
+        return row[0], row[1]
@@ -1,8 +1,18 @@
 # app/domain/repositories/usage_repo.py
+import uuid
+from dataclasses import dataclass
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from datetime import date
-from app.domain.models.models import UserUsageWindow
+from sqlalchemy import select, update, literal, exists, func, Integer, Date, DateTime
+from sqlalchemy.dialects.postgresql import insert, UUID
+from datetime import date, datetime, timedelta, timezone
+from app.domain.models.models import AnalysisRequest, UserUsageWindow
+
+@dataclass(frozen=True, slots=True)
+class ConsumeResult:
+    consumed: bool                  # se descontó una unidad de la cuota
+    duplicate: bool = False         # la idempotency_key ya existía: no se descontó nada
+    count: int | None = None        # contador tras el consumo
+    request_id: uuid.UUID | None = None
 
 class UsageRepo:
     def __init__(self, db: AsyncSession):
@@ -20,3 +30,161 @@ class UsageRepo:
         res = await self.db.execute(q)
         val = res.scalar_one_or_none()
         return int(val or 0)
+
+    async def try_consume(self, user_id, limit: int | None, window_start: date,
+                          idempotency_key: str | None = None,
+                          request_values: dict | None = None) -> ConsumeResult:
+        """
+        Descuenta una unidad de la cuota de la ventana en un solo statement:
+        INSERT ... ON CONFLICT DO UPDATE ... WHERE analyses_count < limit RETURNING.
+        Sin read-modify-write: el tope lo hace cumplir Postgres sobre la fila.
+
+        Con idempotency_key, en el mismo statement se registra el AnalysisRequest
+        (ON CONFLICT DO NOTHING, con request_values como columnas extra)
+        y solo se cuenta si la fila es nueva.
+        Si la cuota se excede, el llamador debe hacer rollback (descarta el request).
+        limit None = ILIMITADO. Hacer commit pronto: el lock de la fila dura hasta el commit.
+        """
+        if limit is not None and limit <= 0:
+            return ConsumeResult(consumed=False)
+
+        uw = UserUsageWindow.__table__
+        now = datetime.now(tz=timezone.utc)
+        request_id = None
+        req = None
+        if idempotency_key is not None:
+            request_id = uuid.uuid4()
+            ar = AnalysisRequest.__table__
+            req = (
+                insert(ar)
+                .values(
+                    id=request_id,
+                    user_id=user_id,
+                    idempotency_key=idempotency_key,
+                    status="pending",
+                    # dentro de un CTE SQLAlchemy no evalúa los defaults de Python (saldría NULL)
+                    attempts=0,
+                    created_at=now,
+                    **(request_values or {}),
+                )
+                .on_conflict_do_nothing(index_elements=[ar.c.user_id, ar.c.idempotency_key])
+                .returning(ar.c.id)
+                .cte("req")
+            )
+            source = select(
+                literal(user_id, UUID(as_uuid=True)),
+                literal(window_start, Date()),
+                literal(1, Integer()),
+                literal(now, DateTime(timezone=True)),
+            ).where(exists(select(req.c.id)))
+            stmt = insert(uw).from_select(
+                ["user_id", "window_start", "analyses_count", "last_updated_at"], source
+            )
+        else:
+            stmt = insert(uw).values(
+                user_id=user_id, window_start=window_start, analyses_count=1, last_updated_at=now
+            )
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[uw.c.user_id, uw.c.window_start],
+            set_={
+                "analyses_count": uw.c.analyses_count + 1,
+                "last_updated_at": now,
+            },
+            where=(uw.c.analyses_count < limit) if limit is not None else None,
+        ).returning(uw.c.analyses_count)
+
+        if req is not None:
+            # ¿se insertó el request? (para distinguir duplicado de cuota agotada)
+            counted = stmt.cte("counted")
+            q = select(
+                select(func.count()).select_from(req).scalar_subquery().label("claimed"),
+                select(counted.c.analyses_count).scalar_subquery().label("count"),
+            )
+            row = (await self.db.execute(q)).one()
+            if not row.claimed:
+                return ConsumeResult(consumed=False, duplicate=True)
+            if row.count is None:
+                return ConsumeResult(consumed=False, request_id=request_id)
+            return ConsumeResult(consumed=True, count=int(row.count), request_id=request_id)
+
+        res = await self.db.execute(stmt)
+        count = res.scalar_one_or_none()
+        if count is None:
+            return ConsumeResult(consumed=False)
+        return ConsumeResult(consumed=True, count=int(count))
+
+    # ---------- Write-behind (ver UsageBuffer) ----------
+
+    async def reserve(self, user_id, window_start: date, idempotency_key: str,
+                      request_values: dict | None = None) -> uuid.UUID | None:
+        """
+        Registra el consumo como un AnalysisRequest con usage_window_start y sin counted_at.
+        Es el registro durable: si el proceso cae antes del volcado, recover_uncounted lo cuenta.
+        Devuelve None si la idempotency_key ya existía.
+        """
+        ar = AnalysisRequest.__table__
+        stmt = (
+            insert(ar)
+            .values(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                idempotency_key=idempotency_key,
+                status="pending",
+                usage_window_start=window_start,
+                created_at=datetime.now(tz=timezone.utc),
+                **(request_values or {}),
+            )
+            .on_conflict_do_nothing(index_elements=[ar.c.user_id, ar.c.idempotency_key])
+            .returning(ar.c.id)
+        )
+        res = await self.db.execute(stmt)
+        return res.scalar_one_or_none()
+
+    async def _apply_uncounted(self, *conditions) -> list[uuid.UUID]:
+        """
+        Marca requests como contados y suma por (user_id, window_start) en un solo statement.
+        Solo quien logra marcar la fila la cuenta, así nunca se cuenta dos veces.
+        Devuelve los ids marcados.
+        """
+        ar = AnalysisRequest.__table__
+        uw = UserUsageWindow.__table__
+        now = datetime.now(tz=timezone.utc)
+        marked = (
+            update(ar)
+            .where(ar.c.counted_at.is_(None), ar.c.usage_window_start.is_not(None), *conditions)
+            .values(counted_at=now)
+            .returning(ar.c.id, ar.c.user_id, ar.c.usage_window_start)
+            .cte("marked")
+        )
+        deltas = (
+            select(
+                marked.c.user_id,
+                marked.c.usage_window_start,
+                func.count().label("delta"),
+                literal(now, DateTime(timezone=True)),
+            )
+            .group_by(marked.c.user_id, marked.c.usage_window_start)
+            # orden estable entre workers para no provocar deadlocks
+            .order_by(marked.c.user_id, marked.c.usage_window_start)
+        )
+        upsert = insert(uw).from_select(["user_id", "window_start", "analyses_count", "last_updated_at"], deltas)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[uw.c.user_id, uw.c.window_start],
+            set_={
+                "analyses_count": uw.c.analyses_count + upsert.excluded.analyses_count,
+                "last_updated_at": upsert.excluded.last_updated_at,
+            },
+        ).cte("upsert")
+        res = await self.db.execute(select(marked.c.id).add_cte(upsert))
+        return list(res.scalars().all())
+
+    async def flush_counted(self, request_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        if not request_ids:
+            return []
+        return await self._apply_uncounted(AnalysisRequest.__table__.c.id.in_(request_ids))
+
+    async def recover_uncounted(self, grace_s: float) -> list[uuid.UUID]:
+        """Cuenta reservas huérfanas (p. ej. de un worker que cayó antes de volcar)."""
+        cutoff = datetime.now(tz=timezone.utc) - timedelta(seconds=grace_s)
+        return await self._apply_uncounted(AnalysisRequest.__table__.c.created_at < cutoff)
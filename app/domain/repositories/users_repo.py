@@ -1,5 +1,6 @@
 # app/domain/repositories/users_repo.py
 import uuid
+from datetime import datetime
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.domain.models.models import User, UserIdentity
@@ -37,3 +38,11 @@ class UsersRepo:
         self.db.add(ident)
         await self.db.flush()
         return user
+
+    async def revoked_epochs_since(self, since: datetime) -> list[tuple[uuid.UUID, int, datetime]]:
+        """(id, token_epoch, tokens_revoked_at) de los usuarios con logout global posterior a `since`."""
+        q = await self.db.execute(
+            select(User.id, User.token_epoch, User.tokens_revoked_at)
+            .where(User.tokens_revoked_at > since)
+        )
+        return [tuple(r) for r in q.all()]
@@ -0,0 +1,61 @@
+# app/domain/repositories/webhooks_repo.py
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Iterable
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from app.domain.models.models import WebhookEvent
+
+class WebhooksRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def ingest(self, provider: str, event_id: str, payload: dict) -> bool:
+        """
+        Guarda el evento crudo con ON CONFLICT DO NOTHING (reintentos del proveedor).
+        Retorna False si ya estaba registrado.
+        """
+        we = WebhookEvent.__table__
+        now = datetime.now(tz=timezone.utc)
+        res = await self.db.execute(
+            insert(we)
+            .values(
+                provider=provider,
+                event_id=event_id,
+                payload=payload,
+                status="received",
+                received_at=now,
+                created_at=now,
+            )
+            .on_conflict_do_nothing(constraint="uq_webhook_provider_event")
+            .returning(we.c.id)
+        )
+        return res.scalar_one_or_none() is not None
+
+    async def claim_batch(self, providers: Iterable[str], limit: int) -> list[WebhookEvent]:
+        """
+        Lote de eventos 'received' en orden de llegada, con FOR UPDATE SKIP LOCKED:
+        varios procesadores drenan la tabla sin tomar los mismos eventos.
+        Los locks duran hasta el commit del lote.
+        """
+        q = await self.db.execute(
+            select(WebhookEvent)
+            .options(undefer(WebhookEvent.payload))
+            .where(WebhookEvent.status == "received", WebhookEvent.provider.in_(tuple(providers)))
+            .order_by(WebhookEvent.received_at, WebhookEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(q.scalars().all())
+
+    async def mark(self, ids: list[int], status: str, processed_at: datetime) -> None:
+        if not ids:
+            return
+        await self.db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(ids))
+            .values(status=status, processed_at=processed_at)
+            .execution_options(synchronize_session=False)
+        )
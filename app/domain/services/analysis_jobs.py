@@ -0,0 +1,237 @@
+# app/domain/services/analysis_jobs.py
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.config import settings
+from app.domain.models.models import AnalysisRequest, Document
+from app.domain.repositories.analyses_repo import AnalysesRepo, AnalysisRequestsRepo
+from app.domain.services.extraction import extraction_pipeline
+from app.domain.services.model_backends import ModelBackend, ModelResult, get_model_backend
+
+logger = logging.getLogger(__name__)
+
+class LeaseLost(Exception):
+    """El lease venció y otro worker retomó el job: este ya no puede cerrarlo."""
+
+@dataclass
+class Lease:
+    request_id: object
+    claimed_at: datetime    # token de cercado; el heartbeat lo avanza al renovar
+
+class AnalysisJobRunner:
+    """
+    Pool de workers async que ejecuta los AnalysisRequest pendientes.
+
+    Cada worker toma un job con FOR UPDATE SKIP LOCKED (varios procesos pueden
+    consumir la misma cola sin pisarse), hace commit del claim y recién entonces
+    llama al modelo. Mientras corre, un heartbeat renueva el lease; si el proceso
+    cae, el job vuelve a la cola al vencer el lease. El cierre del job (complete /
+    fail) solo aplica si el lease sigue siendo de este worker.
+    """
+
+    def __init__(self, concurrency: int, poll_interval_ms: int, lease_timeout_s: int, max_attempts: int):
+        self.concurrency = concurrency
+        self.poll_interval_s = poll_interval_ms / 1000
+        self.lease_timeout_s = lease_timeout_s
+        self.max_attempts = max_attempts
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._backend: Optional[ModelBackend] = None
+        self._tasks: list[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self.claimed = 0
+        self.completed = 0
+        self.failed = 0
+        self.lease_lost = 0
+        self.busy = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def notify(self) -> None:
+        """Despierta a los workers de este proceso (hay un job nuevo)."""
+        self._wake.set()
+
+    def start(self, sessionmaker: async_sessionmaker[AsyncSession], backend: Optional[ModelBackend] = None) -> None:
+        if self._tasks:
+            return
+        self._sessionmaker = sessionmaker
+        self._backend = backend or get_model_backend()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"analysis-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("Analysis worker iteration failed")
+                processed = False
+            if not processed:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def run_once(self) -> bool:
+        """Procesa un job si hay alguno. Devuelve False si la cola estaba vacía."""
+        async with self._sessionmaker() as db:
+            requests = AnalysisRequestsRepo(db)
+            job = await requests.claim_next(self.lease_timeout_s, self.max_attempts)
+            await db.commit()
+            if job is None:
+                return False
+            # un rollback expira `job`: lo necesario para cerrar el job se lee antes
+            lease = Lease(request_id=job.id, claimed_at=job.claimed_at)
+            attempts = job.attempts
+
+            self.claimed += 1
+            self.busy += 1
+            try:
+                stop = asyncio.Event()
+                heartbeat = asyncio.create_task(self._heartbeat(lease, stop))
+                try:
+                    analysis_id = await self._process(db, job)
+                finally:
+                    # el heartbeat termina antes del cierre: no puede mover claimed_at bajo el UPDATE
+                    stop.set()
+                    await heartbeat
+                if not await requests.complete(lease.request_id, lease.claimed_at, analysis_id):
+                    raise LeaseLost()
+                await db.commit()
+                self.completed += 1
+            except LeaseLost:
+                logger.warning("Analysis job %s lease lost; result discarded", lease.request_id)
+                await db.rollback()
+                self.lease_lost += 1
+            except Exception as e:
+                logger.exception("Analysis job %s failed", lease.request_id)
+                await db.rollback()
+                retry = attempts < self.max_attempts
+                if not await requests.fail(lease.request_id, lease.claimed_at, str(e) or e.__class__.__name__, retry=retry):
+                    self.lease_lost += 1
+                await db.commit()
+                self.failed += 1
+            finally:
+                self.busy -= 1
+        return True
+
+    async def _heartbeat(self, lease: Lease, stop: asyncio.Event) -> None:
+        """Renueva el lease cada lease_timeout/3 con su propia sesión hasta que `stop` se active."""
+        interval = self.lease_timeout_s / 3
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                async with self._sessionmaker() as db:
+                    renewed = await AnalysisRequestsRepo(db).renew(lease.request_id, lease.claimed_at)
+                    await db.commit()
+            except Exception:
+                logger.exception("Lease renewal failed for analysis job %s", lease.request_id)
+                continue
+            if renewed is None:
+                logger.warning("Analysis job %s lease was taken over", lease.request_id)
+                return
+            lease.claimed_at = renewed
+
+    async def _process(self, db: AsyncSession, job: AnalysisRequest):
+        """Genera (o clona de la caché) el análisis del job; el llamador cierra el job y hace commit."""
+        document = await db.get(Document, job.document_id)
+        if document is None or document.deleted_at is not None:
+            raise ValueError("Document not found")
+
+        started = time.perf_counter()
+        # La cuota ya se descontó al encolar: un acierto de caché también cuenta
+        analysis = await self._from_cache(db, job, document, started)
+        if analysis is None:
+            # cierra la transacción de lectura: no retener una conexión mientras corre el modelo
+            await db.commit()
+            pages = await extraction_pipeline.extract(db, document) if settings.EXTRACTION_ENABLED else None
+            result = await self._backend.analyze(document, pages)
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            analysis = await self._save_result(db, job, result, duration_ms)
+        return analysis.id
+
+    async def _from_cache(self, db: AsyncSession, job: AnalysisRequest, document: Document, started: float):
+        if not settings.ANALYSIS_CACHE_ENABLED or not document.sha256:
+            return None
+        analyses = AnalysesRepo(db)
+        cached = await analyses.find_cached(
+            sha256=document.sha256,
+            model=job.model or self._backend.name,
+            prompt_version=self._backend.prompt_version,
+            max_age_s=settings.ANALYSIS_CACHE_MAX_AGE_S,
+        )
+        if cached is None:
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        return await analyses.clone(
+            cached,
+            user_id=job.user_id,
+            document_id=job.document_id,
+            summary=self._backend.render_summary(document, cached.result_json),
+            duration_ms=int((time.perf_counter() - started) * 1000),
+        )
+
+    async def _save_result(self, db: AsyncSession, job: AnalysisRequest, result: ModelResult, duration_ms: int):
+        return await AnalysesRepo(db).create(
+            user_id=job.user_id,
+            document_id=job.document_id,
+            model=job.model or self._backend.name,
+            prompt_version=self._backend.prompt_version,
+            result_json=result.result_json,
+            risk_score=result.risk_score,
+            summary=result.summary,
+            tokens_input=result.tokens_input,
+            tokens_output=result.tokens_output,
+            duration_ms=duration_ms,
+            annotations=[
+                {
+                    "clause_type": a.clause_type,
+                    "page": a.page,
+                    "bbox": a.bbox,
+                    "text": a.text,
+                    "explanation": a.explanation,
+                    "risk_weight": a.risk_weight,
+                }
+                for a in result.annotations
+            ],
+        )
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "workers": len(self._tasks),
+            "busy": self.busy,
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "lease_lost": self.lease_lost,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+analysis_jobs = AnalysisJobRunner(
+    concurrency=settings.ANALYSIS_WORKERS,
+    poll_interval_ms=settings.ANALYSIS_POLL_INTERVAL_MS,
+    lease_timeout_s=settings.ANALYSIS_LEASE_TIMEOUT_S,
+    max_attempts=settings.ANALYSIS_MAX_ATTEMPTS,
+)
@@ -0,0 +1,55 @@
+# app/domain/services/analysis_service.py
+from __future__ import annotations
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.models.models import AnalysisRequest
+from app.domain.repositories.analyses_repo import AnalysesRepo, AnalysisRequestsRepo
+from app.domain.repositories.documents_repo import DocumentsRepo
+from app.domain.services.analysis_jobs import analysis_jobs
+from app.domain.services.me_services import MeService
+from app.domain.services.model_backends import get_model_backend
+from app.domain.services.usage_service import UsageService
+from app.utils.time_windows import week_window_lima
+
+class DocumentNotFound(ValueError):
+    pass
+
+class QuotaExceeded(ValueError):
+    pass
+
+class AnalysisService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.documents = DocumentsRepo(db)
+        self.requests = AnalysisRequestsRepo(db)
+        self.analyses = AnalysesRepo(db)
+        self.me = MeService(db)
+        self.usage = UsageService(db)
+
+    async def submit(self, user_id, document_id, idempotency_key: str) -> tuple[AnalysisRequest, bool]:
+        """
+        Encola un análisis: descuenta la cuota y crea el AnalysisRequest en el mismo
+        statement. Retorna (request, creado). Si la key ya existía devuelve el request
+        original sin volver a cobrar.
+        """
+        document = await self.documents.get_for_user(user_id, document_id)
+        if not document:
+            raise DocumentNotFound("Document not found")
+
+        limits = await self.me.get_effective_limits(user_id)
+        week_start, _ = week_window_lima()
+        res = await self.usage.try_consume(
+            user_id,
+            limits.weekly_free_analyses,
+            week_start.date(),
+            idempotency_key,
+            request_values={"document_id": document.id, "model": get_model_backend().name},
+        )
+        if res.duplicate:
+            return await self.requests.get_by_key(user_id, idempotency_key), False
+        if not res.consumed:
+            await self.db.rollback()
+            raise QuotaExceeded("Weekly analysis limit reached")
+
+        await self.db.commit()
+        analysis_jobs.notify()
+        return await self.requests.get(res.request_id), True
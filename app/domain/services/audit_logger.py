@@ -0,0 +1,143 @@
+# app/domain/services/audit_logger.py
+from __future__ import annotations
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.config import settings
+from app.domain.repositories.audit_repo import AuditRepo
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("drop", "block")
+
+class AuditLogger:
+    """
+    Escritura de audit_log fuera de la transacción del request.
+
+    log() solo encola (cola acotada en memoria); una tarea de fondo junta hasta
+    `batch_size` entradas y las inserta con un INSERT multi-fila en su propia
+    transacción. Con la cola llena:
+      - "drop":  se descarta la entrada nueva (el request nunca espera).
+      - "block": se espera hasta `block_timeout_ms` a que haya espacio y luego se descarta.
+    stop() vacía la cola antes de terminar (lifespan shutdown).
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval_ms: int,
+                 policy: str = "drop", block_timeout_ms: int = 50):
+        if policy not in POLICIES:
+            raise ValueError(f"Unsupported audit queue policy: {policy}")
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_ms / 1000
+        self.policy = policy
+        self.block_timeout_s = block_timeout_ms / 1000
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_queue)
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.lost = 0               # entradas de lotes cuyo INSERT falló
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def log(self, action: str, *, user_id=None, entity: str | None = None,
+                  entity_id: str | None = None, metadata: dict | None = None) -> bool:
+        """Encola una entrada. Retorna False si se descartó por cola llena."""
+        entry = {
+            "user_id": user_id,
+            "action": action,
+            "entity": entity,
+            "entity_id": str(entity_id) if entity_id is not None else None,
+            "metadata": metadata,
+            "created_at": datetime.now(tz=timezone.utc),
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            if self.policy != "block":
+                self.dropped += 1
+                return False
+            try:
+                await asyncio.wait_for(self._queue.put(entry), timeout=self.block_timeout_s)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                return False
+        self.enqueued += 1
+        return True
+
+    def start(self, sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+        if self._task is not None:
+            return
+        self._sessionmaker = sessionmaker
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="audit-logger")
+
+    async def stop(self, timeout_s: float = 10.0) -> None:
+        """Deja de esperar nuevas entradas, escribe las pendientes y termina."""
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout_s)
+        except asyncio.TimeoutError:
+            logger.error("Audit drain timed out with %d entries pending", self._queue.qsize())
+        self._task = None
+
+    async def _next_batch(self) -> list[dict]:
+        batch: list[dict] = []
+        if self._queue.empty():
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval_s))
+            except asyncio.TimeoutError:
+                return batch
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while not (self._stopping and self._queue.empty()):
+            batch = await self._next_batch()
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: list[dict]) -> None:
+        try:
+            async with self._sessionmaker() as db:
+                await AuditRepo(db).insert_many(batch)
+                await db.commit()
+            self.written += len(batch)
+            self.batches += 1
+        except Exception:
+            # la auditoría no debe tumbar el proceso: se pierde el lote y se cuenta
+            logger.exception("Audit batch insert failed (%d entries)", len(batch))
+            self.write_errors += 1
+            self.lost += len(batch)
+
+    def stats(self) -> dict[str, int | str | bool]:
+        return {
+            "running": self.running,
+            "policy": self.policy,
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "lost": self.lost,
+        }
+
+
+audit_logger = AuditLogger(
+    max_queue=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval_ms=settings.AUDIT_FLUSH_INTERVAL_MS,
+    policy=settings.AUDIT_QUEUE_POLICY,
+    block_timeout_ms=settings.AUDIT_BLOCK_TIMEOUT_MS,
+)
@@ -5,8 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.domain.repositories.users_repo import UsersRepo
 from app.domain.repositories.sessions_repo import SessionsRepo
 from app.api.core.security import (
-    make_access_token, new_refresh_pair, hash_refresh, verify_refresh, REFRESH_TTL_DAYS
+    make_access_token, new_refresh_pair, parse_refresh_jti, hash_refresh_async, verify_refresh_async, REFRESH_TTL_DAYS
 )
+from app.api.core.revocation import revocation_epochs
+from app.domain.services.audit_logger import audit_logger
 from app.domain.services.idp_verify import verify_google_id_token, verify_apple_id_token
 from app.schemas.auth import SocialLoginIn, TokenPairOut
 
@@ -28,8 +30,15 @@ class AuthService:
         # 2) Buscar o crear usuario
         user = await self.users.get_by_provider(payload.provider, profile["provider_user_id"])
         if not user:
-            user = await self.users.get_by_email(profile["email"])
+            # Solo se entra a una cuenta existente por email si el IdP lo verificó:
+            # si no, cualquiera con una cuenta IdP sin verificar tomaría la cuenta ajena
+            by_email = await self.users.get_by_email(profile["email"])
+            if by_email and not profile.get("email_verified", False):
+                raise ValueError("Email not verified by identity provider")
+            user = by_email
+        created = False
         if not user:
+            created = True
             user = await self.users.create_with_identity(
                 email=profile["email"],
                 name=profile.get("name"),
@@ -40,9 +49,9 @@ class AuthService:
             )
 
         # 3) Emitir tokens + crear sesión refresh
-        access, ttl = make_access_token(str(user.id))
+        access, ttl = make_access_token(str(user.id), epoch=user.token_epoch)
         raw_refresh, jti = new_refresh_pair()
-        refresh_hash = hash_refresh(raw_refresh)
+        refresh_hash = await hash_refresh_async(raw_refresh)
 
         from datetime import datetime, timezone, timedelta as td
         expires_at = datetime.now(tz=timezone.utc) + td(days=REFRESH_TTL_DAYS)
@@ -54,10 +63,15 @@ class AuthService:
             parent_jti=None,
             expires_at=expires_at,
             user_agent="login-social",
-            ip=None
+            ip=None,
+            token_epoch=user.token_epoch,
         )
 
         await self.db.commit()
+        await audit_logger.log(
+            "LOGIN", user_id=user.id, entity="users", entity_id=user.id,
+            metadata={"provider": payload.provider, "new_user": created},
+        )
 
         needs_profile = not bool(user.name)  # o si faltan otros campos obligatorios
         return TokenPairOut(
@@ -66,53 +80,76 @@ class AuthService:
         )
 
     async def rotate_refresh(self, raw_refresh: str, user_agent: str | None, ip: str | None) -> TokenPairOut:
-        # Estrategia: el jti viaja como parte del refresh (raw=... contiene jti? opcional).
-        # Aquí, por simplicidad, buscamos por coincidencia de hash en sesiones activas.
-        # En producción, incluye jti en el refresh (ej. raw="<jti>.<random>") y búscalo directo.
-        # ---- Simplificado: escanea por jti si lo incluyes, o valida sobre la sesión actual.
-        # Aquí asumimos que el cliente manda el jti en el propio token raw (prefijo).
-        try:
-            jti, _ = raw_refresh.split(".", 1)
-        except Exception:
+        # El refresh tiene la forma "<jti>.<secreto>": el jti va directo al índice único.
+        jti = parse_refresh_jti(raw_refresh)
+        if not jti:
             raise ValueError("Malformed refresh token")
 
-        session = await self.sessions.get_active_by_jti(jti)
-        if not session:
-            raise ValueError("Invalid or revoked refresh token")
-
-        if not verify_refresh(raw_refresh, session.refresh_token_hash):
-            # posible replay: revoca la cadena
-            await self.sessions.revoke_chain(session.jti)
-            await self.db.commit()
-            raise ValueError("Refresh token mismatch")
-
-        # Revoca el actual y crea uno nuevo (rotación)
-        await self.sessions.revoke_chain(session.jti)
-
-        access, ttl = make_access_token(str(session.user_id))
+        # El hijo se hashea con el esquema vigente, así los hashes bcrypt
+        # antiguos migran solos al rotar.
         new_raw, new_jti = new_refresh_pair()
-        refresh_hash = hash_refresh(new_raw)
+        refresh_hash = await hash_refresh_async(new_raw)
 
         from datetime import datetime, timezone, timedelta as td
         expires_at = datetime.now(tz=timezone.utc) + td(days=REFRESH_TTL_DAYS)
 
-        await self.sessions.create(
-            user_id=session.user_id,
+        # Revoca el actual y crea el hijo en un solo round-trip
+        rotated = await self.sessions.rotate(
+            jti=jti,
             refresh_hash=refresh_hash,
-            jti=new_jti,
-            parent_jti=session.jti,
+            new_jti=new_jti,
             expires_at=expires_at,
             user_agent=user_agent,
-            ip=ip
+            ip=ip,
         )
+        if not rotated:
+            raise ValueError("Invalid or revoked refresh token")
+
+        user_id, old_hash, epoch = rotated
+        if not await verify_refresh_async(raw_refresh, old_hash):
+            # posible replay: deshace el hijo y deja revocado el actual
+            await self.db.rollback()
+            revoked_user = await self.sessions.revoke_chain(jti)
+            await self.db.commit()
+            await audit_logger.log(
+                "REFRESH_REPLAY", user_id=revoked_user, entity="auth_sessions", entity_id=jti,
+                metadata={"ip": ip, "user_agent": user_agent},
+            )
+            raise ValueError("Refresh token mismatch")
 
         await self.db.commit()
+        await audit_logger.log(
+            "REFRESH", user_id=user_id, entity="auth_sessions", entity_id=new_jti,
+            metadata={"ip": ip, "user_agent": user_agent, "parent_jti": jti},
+        )
+        access, ttl = make_access_token(str(user_id), epoch=epoch)
         return TokenPairOut(access_token=access, refresh_token=new_raw, expires_in=ttl)
 
     async def logout(self, raw_refresh: str, user_agent: str | None, ip: str | None):
-        jti, _ = raw_refresh.split(".", 1)
-        session = await self.sessions.get_active_by_jti(jti)
-        if session:
-            await self.sessions.revoke_chain(session.jti)
+        jti = parse_refresh_jti(raw_refresh)
+        if jti:
+            user_id = await self.sessions.revoke_chain(jti)
             await self.db.commit()
-
+            if user_id:
+                await audit_logger.log(
+                    "LOGOUT", user_id=user_id, entity="auth_sessions", entity_id=jti,
+                    metadata={"ip": ip, "user_agent": user_agent},
+                )
+
+    async def logout_all(self, user_id, user_agent: str | None, ip: str | None) -> int:
+        """
+        Cierra todas las sesiones: revoca los refresh y sube la época, con lo que
+        los access tokens ya emitidos dejan de valer en todos los workers
+        (en este, al instante; en el resto, al próximo poll de revocation_epochs).
+        """
+        result = await self.sessions.revoke_all(user_id)
+        if result is None:
+            raise ValueError("User not found")
+        epoch, revoked = result
+        await self.db.commit()
+        revocation_epochs.bump(user_id, epoch)
+        await audit_logger.log(
+            "LOGOUT_ALL", user_id=user_id, entity="users", entity_id=user_id,
+            metadata={"ip": ip, "user_agent": user_agent, "sessions": revoked, "epoch": epoch},
+        )
+        return revoked
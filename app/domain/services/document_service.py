@@ -0,0 +1,77 @@
+# app/domain/services/document_service.py
+from __future__ import annotations
+import hashlib
+from typing import AsyncIterator, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.domain.models.models import Document
+from app.domain.repositories.documents_repo import DocumentsRepo
+from app.domain.services.storage import StorageBackend, get_storage
+
+ALLOWED_MIME_TYPES = {
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "image/png",
+    "image/jpeg",
+    "text/plain",
+}
+
+class DocumentTooLarge(ValueError):
+    pass
+
+class DocumentService:
+    def __init__(self, db: AsyncSession, storage: StorageBackend | None = None):
+        self.db = db
+        self.documents = DocumentsRepo(db)
+        self.storage = storage or get_storage()
+
+    async def find_duplicate(self, user_id, sha256: str) -> Optional[Document]:
+        return await self.documents.get_by_user_sha256(user_id, sha256.lower())
+
+    async def upload(self, user_id, *, filename: str, mime_type: str, chunks: AsyncIterator[bytes],
+                     expected_sha256: str | None = None) -> tuple[Document, bool]:
+        """
+        Sube un documento por streaming: SHA-256 y tamaño se calculan por chunk,
+        sin tener nunca el archivo completo en memoria.
+        Si el usuario ya tiene un documento con el mismo hash, lo reutiliza.
+        Retorna (documento, deduplicado).
+        """
+        if mime_type not in ALLOWED_MIME_TYPES:
+            raise ValueError(f"Unsupported mime type: {mime_type}")
+
+        h = hashlib.sha256()
+        size = 0
+        staged = self.storage.stage()
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.DOCUMENT_MAX_BYTES:
+                    raise DocumentTooLarge("Document too large")
+                h.update(chunk)
+                await staged.write(chunk)
+
+            digest = h.hexdigest()
+            if expected_sha256 and digest != expected_sha256.lower():
+                raise ValueError("SHA-256 mismatch")
+
+            existing = await self.find_duplicate(user_id, digest)
+            if existing:
+                await staged.discard()
+                return existing, True
+
+            # clave por contenido: reintentos del mismo archivo pisan el mismo objeto
+            storage_url = await staged.commit(f"documents/{user_id}/{digest}")
+        except BaseException:
+            await staged.discard()
+            raise
+
+        doc = await self.documents.create(
+            user_id=user_id,
+            filename=filename,
+            mime_type=mime_type,
+            size_bytes=size,
+            sha256=digest,
+            storage_url=storage_url,
+        )
+        await self.db.commit()
+        return doc, False
@@ -0,0 +1,45 @@
+# app/domain/services/export_service.py
+from __future__ import annotations
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.repositories.analyses_repo import AnalysesRepo
+from app.domain.repositories.exports_repo import ExportsRepo
+from app.domain.services.report_renderers import RENDERERS, TEMPLATE_VERSION, ReportRenderer, report_blocks
+from app.domain.services.storage import StorageBackend, get_storage
+
+class ExportService:
+    def __init__(self, db: AsyncSession, storage: StorageBackend | None = None):
+        self.db = db
+        self.analyses = AnalysesRepo(db)
+        self.exports = ExportsRepo(db)
+        self.storage = storage or get_storage()
+
+    @staticmethod
+    def renderer(fmt: str) -> ReportRenderer:
+        try:
+            return RENDERERS[fmt]
+        except KeyError:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+    async def get_or_render(self, user_id, analysis_id, fmt: str) -> Optional[tuple[str, bool]]:
+        """
+        Devuelve (storage_url, cached) del export, o None si el análisis no es del usuario.
+        Cacheado por (analysis_id, format, TEMPLATE_VERSION): si ya está en storage no
+        se vuelve a renderizar. El render va directo a storage por chunks.
+        """
+        renderer = self.renderer(fmt)
+        analysis = await self.analyses.get_for_user(user_id, analysis_id)
+        if not analysis:
+            return None
+
+        existing = await self.exports.get(analysis.id, fmt, TEMPLATE_VERSION)
+        if existing and existing.storage_url and await self.storage.exists(existing.storage_url):
+            return existing.storage_url, True
+
+        blocks = report_blocks(analysis, self.analyses.stream_annotations(analysis.id))
+        key = f"exports/{analysis.id}/{TEMPLATE_VERSION}.{fmt}"
+        storage_url = await self.storage.put_stream(key, renderer.render(blocks))
+
+        await self.exports.upsert(analysis.id, fmt, TEMPLATE_VERSION, storage_url)
+        await self.db.commit()
+        return storage_url, False
@@ -0,0 +1,165 @@
+# app/domain/services/extraction.py
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.domain.models.models import Document
+from app.domain.repositories.documents_repo import DocumentsRepo
+from app.domain.repositories.page_texts_repo import PageTextsRepo
+from app.domain.services import extractors
+from app.domain.services.storage import StorageBackend, get_storage
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+IMAGES = ("image/png", "image/jpeg")
+
+def _ranges(pages: list[int], n: int) -> list[list[int]]:
+    """Parte `pages` en hasta n tramos contiguos de tamaño parecido (un tramo por tarea)."""
+    n = max(1, min(n, len(pages)))
+    size, extra = divmod(len(pages), n)
+    out, i = [], 0
+    for k in range(n):
+        step = size + (1 if k < extra else 0)
+        out.append(pages[i:i + step])
+        i += step
+    return out
+
+class ExtractionPipeline:
+    """
+    Etapa de extracción de texto/OCR previa al modelo.
+
+    El documento se baja de storage a un archivo temporal; las páginas que no
+    están en la caché (page_texts, por sha256 + página + extractor) se reparten
+    en tramos contiguos sobre un ProcessPoolExecutor (OCR y parseo de PDF son
+    CPU-bound y no deben bloquear el event loop). Al terminar marca
+    page_count/ocr_done en el documento; ocr_done solo si ninguna página
+    escaneada quedó sin OCR (p. ej. sin tesseract instalado).
+    La transacción no queda abierta durante la extracción: se hace commit
+    tras leer la caché y se vuelve a usar la sesión para guardar.
+    workers=0 ejecuta en un hilo, sin pool de procesos.
+    """
+
+    def __init__(self, workers: int, ocr_lang: str = "spa+eng"):
+        self.workers = workers
+        self.ocr_lang = ocr_lang
+        # el tag de caché cambia si aparece el OCR: las páginas vacías se reintentan
+        self.extractor = "text-v1+ocr" if extractors.ocr_available() else "text-v1"
+        self._pool: Optional[Executor] = None
+        self.documents = 0
+        self.pages_extracted = 0
+        self.pages_cached = 0
+        self.pages_ocr = 0
+        self.extract_seconds = 0.0
+
+    def _executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            # spawn: los hijos no heredan el event loop ni conexiones del proceso padre
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, fn, *args):
+        pool = self._executor()
+        if pool is None:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, partial(fn, *args))
+
+    async def _spool(self, storage: StorageBackend, url: str) -> str:
+        fd, path = tempfile.mkstemp(prefix="extract-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                async for chunk in storage.read(url):
+                    await asyncio.to_thread(fh.write, chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    async def _extract_missing(self, path: str, mime_type: str, cached: dict[int, tuple[str, bool]]):
+        if mime_type == PDF:
+            page_count = await asyncio.to_thread(extractors.pdf_page_count, path)
+            missing = [p for p in range(1, page_count + 1) if p not in cached]
+            if not missing:
+                return page_count, []
+            chunks = _ranges(missing, max(1, self.workers) * 2)  # 2 tramos por worker: reparte mejor el OCR
+            parts = await asyncio.gather(*(
+                self._run(extractors.extract_pdf_pages, path, chunk, self.ocr_lang) for chunk in chunks
+            ))
+            return page_count, [r for part in parts for r in part]
+        if 1 in cached:
+            return 1, []
+        if mime_type in IMAGES:
+            return 1, await self._run(extractors.extract_image, path, self.ocr_lang)
+        if mime_type == DOCX:
+            return 1, await self._run(extractors.extract_docx, path)
+        return 1, await self._run(extractors.extract_plain, path)
+
+    async def extract(self, db: AsyncSession, document: Document,
+                      storage: StorageBackend | None = None) -> list[str]:
+        """Texto por página (índice 0 = página 1). Hace commit de la caché y de los flags."""
+        started = time.perf_counter()
+        pages_repo = PageTextsRepo(db)
+        cached = await pages_repo.get_pages(document.sha256, self.extractor) if document.sha256 else {}
+        # libera la conexión: el spool y el OCR pueden tardar minutos
+        await db.commit()
+
+        if document.page_count and all(p in cached for p in range(1, document.page_count + 1)):
+            new: list[extractors.PageResult] = []
+            page_count = document.page_count
+        else:
+            storage = storage or get_storage()
+            path = await self._spool(storage, document.storage_url)
+            try:
+                page_count, new = await self._extract_missing(path, document.mime_type, cached)
+            finally:
+                os.unlink(path)
+
+        pages = dict(cached)
+        pages.update({p: (t, ocr) for p, t, ocr in new})
+        # páginas vacías sin OCR = escaneadas que no se pudieron leer (DOCX/texto no usan OCR)
+        scannable = document.mime_type == PDF or document.mime_type in IMAGES
+        ocr_done = not scannable or all(ocr or text.strip() for text, ocr in pages.values())
+
+        if document.sha256:
+            await pages_repo.save_pages(document.sha256, self.extractor, new)
+        if document.page_count != page_count or document.ocr_done != ocr_done:
+            await DocumentsRepo(db).set_extracted(document.id, page_count=page_count, ocr_done=ocr_done)
+        await db.commit()
+
+        texts = {p: t for p, (t, _) in pages.items()}
+        self.documents += 1
+        self.pages_cached += page_count - len(new)
+        self.pages_extracted += len(new)
+        self.pages_ocr += sum(1 for _, _, ocr in new if ocr)
+        self.extract_seconds += time.perf_counter() - started
+        return [texts.get(p, "") for p in range(1, page_count + 1)]
+
+    def stats(self) -> dict[str, int | float | str]:
+        return {
+            "workers": self.workers,
+            "extractor": self.extractor,
+            "documents": self.documents,
+            "pages_extracted": self.pages_extracted,
+            "pages_cached": self.pages_cached,
+            "pages_ocr": self.pages_ocr,
+            "extract_seconds_total": round(self.extract_seconds, 3),
+        }
+
+
+extraction_pipeline = ExtractionPipeline(
+    workers=settings.EXTRACTION_WORKERS,
+    ocr_lang=settings.EXTRACTION_OCR_LANG,
+)
@@ -0,0 +1,71 @@
+# app/domain/services/extractors.py
+"""
+Extractores de texto por página. Corren dentro del ProcessPoolExecutor de
+extraction.py: solo stdlib y dependencias opcionales, sin importar la app
+(cada proceso hijo arranca rápido y sin abrir conexiones).
+"""
+from __future__ import annotations
+import importlib.util
+import re
+import zipfile
+from html import unescape
+
+PageResult = tuple[int, str, bool]   # (página 1-based, texto, hubo OCR)
+
+def ocr_available() -> bool:
+    return all(importlib.util.find_spec(m) is not None for m in ("pytesseract", "pypdfium2", "PIL"))
+
+def _ocr_image(image, lang: str) -> str:
+    import pytesseract
+    return pytesseract.image_to_string(image, lang=lang)
+
+def _ocr_pdf_page(path: str, index: int, lang: str) -> str | None:
+    if not ocr_available():
+        return None
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        image = pdf[index].render(scale=200 / 72).to_pil()   # ~200 dpi
+        return _ocr_image(image, lang)
+    finally:
+        pdf.close()
+
+def pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+def extract_pdf_pages(path: str, pages: list[int], ocr_lang: str) -> list[PageResult]:
+    """Extrae un rango de páginas (1-based). Páginas sin capa de texto (escaneadas) pasan por OCR."""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    out: list[PageResult] = []
+    for page_no in pages:
+        text = reader.pages[page_no - 1].extract_text() or ""
+        ocr = False
+        if not text.strip():
+            ocr_text = _ocr_pdf_page(path, page_no - 1, ocr_lang)
+            if ocr_text is not None:
+                text, ocr = ocr_text, True
+        out.append((page_no, text, ocr))
+    return out
+
+def extract_image(path: str, ocr_lang: str) -> list[PageResult]:
+    if not ocr_available():
+        return [(1, "", False)]
+    from PIL import Image
+    with Image.open(path) as image:
+        return [(1, _ocr_image(image, ocr_lang), True)]
+
+_W_PARAGRAPH = re.compile(r"<w:p[ >].*?</w:p>", re.S)
+_W_TEXT = re.compile(r"<w:t(?: [^>]*)?>([^<]*)</w:t>")
+
+def extract_docx(path: str) -> list[PageResult]:
+    """DOCX no tiene páginas fijas: todo el cuerpo es la página 1."""
+    with zipfile.ZipFile(path) as zf:
+        xml = zf.read("word/document.xml").decode("utf-8", errors="replace")
+    paragraphs = ("".join(_W_TEXT.findall(p)) for p in _W_PARAGRAPH.findall(xml))
+    return [(1, unescape("\n".join(paragraphs)), False)]
+
+def extract_plain(path: str) -> list[PageResult]:
+    with open(path, "rb") as fh:
+        return [(1, fh.read().decode("utf-8", errors="replace"), False)]
@@ -1,5 +1,8 @@
 # app/services/idp_verify.py
 from typing import TypedDict, Literal
+import jwt
+from app.core.config import settings
+from app.domain.services.jwks import JwksKeyRing
 
 class IdpProfile(TypedDict):
     provider_user_id: str
@@ -8,28 +11,90 @@ class IdpProfile(TypedDict):
     name: str | None
     avatar_url: str | None
 
+GOOGLE_ISSUERS = ["https://accounts.google.com", "accounts.google.com"]
+APPLE_ISSUERS = ["https://appleid.apple.com"]
+
+# Una instancia por proceso: las llaves se comparten entre requests
+google_keys = JwksKeyRing(settings.GOOGLE_JWKS_URL)
+apple_keys = JwksKeyRing(settings.APPLE_JWKS_URL)
+
+def _client_ids(raw: str) -> list[str]:
+    return [c.strip() for c in raw.split(",") if c.strip()]
+
+async def _verify(id_token: str, keys: JwksKeyRing, issuers: list[str], audience: list[str]) -> dict:
+    """Firma (JWKS por kid), iss, aud y exp. Cualquier fallo es ValueError."""
+    try:
+        header = jwt.get_unverified_header(id_token)
+    except jwt.PyJWTError:
+        raise ValueError("Malformed ID token")
+    if header.get("alg") != "RS256":
+        raise ValueError("Unsupported ID token algorithm")
+    key = await keys.get_key(header.get("kid"))
+    try:
+        return jwt.decode(
+            id_token,
+            key.key,
+            algorithms=["RS256"],
+            audience=audience,
+            issuer=issuers,
+            leeway=60,
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise ValueError(f"Invalid ID token: {e}")
+
+def _as_bool(value) -> bool:
+    # Apple manda email_verified como "true"/"false"
+    return value is True or str(value).lower() == "true"
+
 async def verify_google_id_token(id_token: str) -> IdpProfile:
-    # TODO: validar firma/iss/aud/exp con JWKS oficial de Google
-    # De momento, levanta error si el token parece inválido
-    if not id_token or len(id_token) < 20:
-        raise ValueError("Invalid Google ID token")
-    # MOCK: reemplazar por verificación real
+    client_ids = _client_ids(settings.GOOGLE_CLIENT_IDS)
+    if not client_ids:
+        if settings.ENV != "dev":
+            raise ValueError("Google sign-in not configured")
+        # Sin client ids configurados (dev): MOCK
+        if not id_token or len(id_token) < 20:
+            raise ValueError("Invalid Google ID token")
+        return {
+            "provider_user_id": "google|mocksub",
+            "email": "mock@example.com",
+            "email_verified": True,
+            "name": "Mock User",
+            "avatar_url": None,
+        }
+    claims = await _verify(id_token, google_keys, GOOGLE_ISSUERS, client_ids)
+    if not claims.get("email"):
+        raise ValueError("Google ID token without email")
     return {
-        "provider_user_id": "google|mocksub",
-        "email": "mock@example.com",
-        "email_verified": True,
-        "name": "Mock User",
-        "avatar_url": None,
+        "provider_user_id": claims["sub"],
+        "email": claims["email"],
+        "email_verified": _as_bool(claims.get("email_verified")),
+        "name": claims.get("name"),
+        "avatar_url": claims.get("picture"),
     }
 
 async def verify_apple_id_token(id_token: str) -> IdpProfile:
-    # TODO: validar firma/iss/aud/exp con JWKS de Apple
-    if not id_token or len(id_token) < 20:
-        raise ValueError("Invalid Apple ID token")
+    client_ids = _client_ids(settings.APPLE_CLIENT_IDS)
+    if not client_ids:
+        if settings.ENV != "dev":
+            raise ValueError("Apple sign-in not configured")
+        # Sin client ids configurados (dev): MOCK
+        if not id_token or len(id_token) < 20:
+            raise ValueError("Invalid Apple ID token")
+        return {
+            "provider_user_id": "apple|mocksub",
+            "email": "mock@example.com",
+            "email_verified": True,
+            "name": "Mock User",
+            "avatar_url": None,
+        }
+    claims = await _verify(id_token, apple_keys, APPLE_ISSUERS, client_ids)
+    if not claims.get("email"):
+        raise ValueError("Apple ID token without email")
     return {
-        "provider_user_id": "apple|mocksub",
-        "email": "mock@example.com",
-        "email_verified": True,
-        "name": "Mock User",
+        "provider_user_id": claims["sub"],
+        "email": claims["email"],
+        "email_verified": _as_bool(claims.get("email_verified")),
+        "name": None,  # Apple solo manda el nombre al cliente, en el primer login
         "avatar_url": None,
     }
@@ -0,0 +1,167 @@
+# app/domain/services/jwks.py
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+import urllib.request
+from typing import Awaitable, Callable, Optional
+from jwt import PyJWK
+from jwt.exceptions import PyJWKError
+
+logger = logging.getLogger(__name__)
+
+# (body, headers en minúsculas)
+Fetcher = Callable[[str], Awaitable[tuple[bytes, dict[str, str]]]]
+
+async def http_get(url: str, timeout_s: float = 5.0) -> tuple[bytes, dict[str, str]]:
+    def _get():
+        req = urllib.request.Request(url, headers={"Accept": "application/json"})
+        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+            return resp.read(), {k.lower(): v for k, v in resp.headers.items()}
+    return await asyncio.to_thread(_get)
+
+def cache_ttl(headers: dict[str, str]) -> Optional[float]:
+    """Segundos de vigencia según Cache-Control max-age (menos Age). None si no hay."""
+    max_age = None
+    for part in (headers.get("cache-control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        name = name.lower()
+        if name in ("no-cache", "no-store"):
+            return 0.0
+        if name == "max-age" and value.strip().isdigit():
+            max_age = float(value.strip())
+    if max_age is None:
+        return None
+    age = headers.get("age", "")
+    return max(0.0, max_age - (float(age) if age.isdigit() else 0.0))
+
+class JwksKeyRing:
+    """
+    Llaves públicas de un IdP (JWKS) ya parseadas, por `kid`.
+
+    - Vigencia según Cache-Control max-age (acotada a [min_ttl_s, max_ttl_s]).
+    - Cerca del vencimiento se refresca en segundo plano: el login sigue con
+      las llaves actuales (los IdP rotan con solapamiento).
+    - Misses concurrentes comparten un solo fetch (single-flight).
+    - Un `kid` desconocido fuerza un refetch, como mucho uno cada
+      `unknown_kid_interval_s` (evita que tokens basura generen tráfico al IdP).
+    """
+
+    def __init__(self, url: str, *, fetch: Fetcher = http_get, default_ttl_s: float = 3600,
+                 min_ttl_s: float = 60, max_ttl_s: float = 24 * 3600, refresh_ahead: float = 0.1,
+                 unknown_kid_interval_s: float = 30, clock: Callable[[], float] = time.monotonic):
+        self.url = url
+        self._fetch = fetch
+        self.default_ttl_s = default_ttl_s
+        self.min_ttl_s = min_ttl_s
+        self.max_ttl_s = max_ttl_s
+        self.refresh_ahead = refresh_ahead
+        self.unknown_kid_interval_s = unknown_kid_interval_s
+        self._clock = clock
+        self._keys: dict[str, PyJWK] = {}
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._last_attempt = float("-inf")
+        self._failed_at = float("-inf")
+        self._inflight: Optional[asyncio.Task] = None
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.coalesced = 0
+        self.unknown_kid_refetches = 0
+        self.unknown_kid_throttled = 0
+
+    async def _load(self) -> None:
+        self._last_attempt = self._clock()
+        self.fetches += 1
+        try:
+            body, headers = await self._fetch(self.url)
+            doc = json.loads(body)
+            keys: dict[str, PyJWK] = {}
+            for jwk in doc.get("keys", []):
+                if jwk.get("use", "sig") != "sig" or not jwk.get("kid"):
+                    continue
+                try:
+                    keys[jwk["kid"]] = PyJWK(jwk)
+                except PyJWKError:
+                    logger.warning("Skipping unsupported JWK %s from %s", jwk.get("kid"), self.url)
+            if not keys:
+                raise ValueError("JWKS without usable signing keys")
+        except Exception:
+            self.fetch_errors += 1
+            self._failed_at = self._clock()
+            raise
+
+        ttl = cache_ttl(headers)
+        ttl = self.default_ttl_s if ttl is None else min(max(ttl, self.min_ttl_s), self.max_ttl_s)
+        now = self._clock()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + ttl
+        self._refresh_at = now + ttl * (1 - self.refresh_ahead)
+
+    async def refresh(self) -> None:
+        """Refetch single-flight: si ya hay uno en curso, se espera ese."""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._load())
+        else:
+            self.coalesced += 1
+        # shield: cancelar a un llamador no cancela el fetch que esperan los demás
+        await asyncio.shield(self._inflight)
+
+    def _refresh_in_background(self) -> None:
+        if self._inflight is not None and not self._inflight.done():
+            return
+        if self._recently_failed():
+            return
+        self._inflight = asyncio.create_task(self._load())
+        self._inflight.add_done_callback(self._log_background_error)
+
+    def _recently_failed(self) -> bool:
+        # tras un fallo no reintentar en cada request
+        return self._clock() - self._failed_at < self.unknown_kid_interval_s
+
+    def _log_background_error(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background JWKS refresh failed for %s: %s", self.url, task.exception())
+
+    async def get_key(self, kid: Optional[str]) -> PyJWK:
+        now = self._clock()
+        if not self._keys:
+            await self.refresh()
+        elif now >= self._expires_at and not self._recently_failed():
+            try:
+                await self.refresh()
+            except Exception:
+                logger.warning("JWKS refresh failed for %s, using stale keys", self.url, exc_info=True)
+        elif now >= self._refresh_at:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid) if kid else None
+        if key is None and kid:
+            if self._clock() - self._last_attempt >= self.unknown_kid_interval_s:
+                self.unknown_kid_refetches += 1
+                try:
+                    await self.refresh()
+                except Exception:
+                    logger.warning("JWKS refetch for unknown kid failed for %s", self.url, exc_info=True)
+                key = self._keys.get(kid)
+            else:
+                self.unknown_kid_throttled += 1
+        if key is None:
+            raise ValueError("Unknown signing key")
+        return key
+
+    def stats(self) -> dict[str, int | float]:
+        now = self._clock()
+        return {
+            "keys": len(self._keys),
+            "age_s": round(now - self._fetched_at, 1) if self._keys else 0.0,
+            "expires_in_s": round(self._expires_at - now, 1) if self._keys else 0.0,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "coalesced": self.coalesced,
+            "unknown_kid_refetches": self.unknown_kid_refetches,
+            "unknown_kid_throttled": self.unknown_kid_throttled,
+        }
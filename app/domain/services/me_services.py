@@ -1,68 +1,112 @@
 # app/services/me_service.py
 from __future__ import annotations
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
 from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.repositories.analyses_repo import AnalysesRepo
+from app.domain.repositories.documents_repo import DocumentsRepo
+from app.domain.repositories.me_repo import MeRepo
 from app.domain.repositories.plans_repo import PlansRepo
 from app.domain.repositories.usage_repo import UsageRepo
+from app.domain.services.plan_catalog import PlanLimits, plan_catalog
+from app.domain.services.usage_buffer import usage_buffer
+from app.schemas.analysis import AnalysisPageOut, AnalysisSummaryOut
+from app.schemas.document import DocumentPageOut, DocumentSummaryOut
 from app.schemas.me import MeLimitsOut, MeUsageWeekOut
+from app.utils.pagination import encode_cursor
 from app.utils.time_windows import week_window_lima
 
-DEFAULT_FREE_LIMITS = {"weekly_free_analyses": 1, "history_cap": 3}
-
 class MeService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.plans = PlansRepo(db)
         self.usage = UsageRepo(db)
+        self.me = MeRepo(db)
+        self.documents = DocumentsRepo(db)
+        self.analyses = AnalysesRepo(db)
+
+    async def _limits_for_plan(self, plan_id) -> PlanLimits:
+        await plan_catalog.ensure_fresh(self.db)
+        if plan_id is not None:
+            limits = plan_catalog.get(plan_id)
+            if limits is None:
+                # plan creado después de la última carga del catálogo
+                plan_catalog.invalidate()
+                await plan_catalog.ensure_fresh(self.db)
+                limits = plan_catalog.get(plan_id)
+            if limits is not None:
+                return limits
+
+        return plan_catalog.free
 
-    async def _resolve_effective_limits(self, user_id) -> tuple[str, Optional[int], Optional[int]]:
+    async def _resolve_effective_limits(self, user_id) -> PlanLimits:
         """
-        Retorna (plan_code, weekly_limit, history_cap)
-        - Si hay plan vigente: lee de plan.limits (JSON)
-        - Si no hay: usa FREE por defecto (o plan.code == 'free' si existe)
-        - None significa ILIMITADO
+        Retorna los límites efectivos del usuario (ver PlanLimits).
+        - Si hay plan vigente: sus límites compilados del catálogo
+        - Si no hay: FREE (plan.code == 'free' si existe, o valores por defecto)
+        Solo la búsqueda de la suscripción va a la BD.
         """
-        sub_with_plan = await self.plans.get_active_subscription_with_plan(user_id)
-        if sub_with_plan:
-            _, plan = sub_with_plan
-            limits = (plan.limits or {}) if plan.limits is not None else {}
-            weekly = limits.get("weekly_free_analyses")
-            hist = limits.get("history_cap")
-            # Convención: si premium no tiene tope, guarda None
-            return plan.code, weekly, hist
+        plan_id = await self.plans.get_active_plan_id(user_id)
+        return await self._limits_for_plan(plan_id)
 
-        # Fallback: FREE
-        free = await self.plans.get_plan_by_code("free")
-        if free and free.limits:
-            weekly = free.limits.get("weekly_free_analyses", DEFAULT_FREE_LIMITS["weekly_free_analyses"])
-            hist = free.limits.get("history_cap", DEFAULT_FREE_LIMITS["history_cap"])
-            return free.code, weekly, hist
+    async def get_effective_limits(self, user_id) -> PlanLimits:
+        return await self._resolve_effective_limits(user_id)
 
-        # Si ni siquiera hay plan free sembrado, aplica valores por defecto
-        return "free", DEFAULT_FREE_LIMITS["weekly_free_analyses"], DEFAULT_FREE_LIMITS["history_cap"]
+    async def _limits_and_usage(self, user_id, week_start: datetime) -> tuple[PlanLimits, int]:
+        # Usuario + plan vigente + uso semanal en un solo round-trip
+        snap = await self.me.get_limits_snapshot(user_id, week_start.date())
+        if snap is None:
+            raise ValueError("User not found")
+        # suma los consumos aún no volcados por el buffer write-behind de este worker
+        used = snap.analyses_count + usage_buffer.pending_delta(user_id, week_start.date())
+        return await self._limits_for_plan(snap.plan_id), used
 
     async def get_limits(self, user_id) -> MeLimitsOut:
         week_start, next_week_start = week_window_lima()
-        plan_code, weekly_limit, history_cap = await self._resolve_effective_limits(user_id)
-        used = await self.usage.get_week_count(user_id, week_start.date())
+        limits, used = await self._limits_and_usage(user_id, week_start)
 
         # Si el plan es premium y definiste sin topes, weekly_limit/history_cap pueden ser None
         return MeLimitsOut(
-            plan=plan_code,
-            weekly_free_analyses=weekly_limit,
-            history_cap=history_cap,
+            plan=limits.code,
+            weekly_free_analyses=limits.weekly_free_analyses,
+            history_cap=limits.history_cap,
             used_this_week=used,
             resets_at=next_week_start,
         )
 
     async def get_usage_week(self, user_id) -> MeUsageWeekOut:
         week_start, next_week_start = week_window_lima()
-        plan_code, weekly_limit, _ = await self._resolve_effective_limits(user_id)
-        count = await self.usage.get_week_count(user_id, week_start.date())
+        limits, count = await self._limits_and_usage(user_id, week_start)
         return MeUsageWeekOut(
             count=count,
-            limit=weekly_limit,
+            limit=limits.weekly_free_analyses,
             window_start=week_start,
             window_end=next_week_start,
         )
+
+    @staticmethod
+    def _next_cursor(rows, limit: int) -> Optional[str]:
+        if len(rows) <= limit:
+            return None
+        last = rows[limit - 1]
+        return encode_cursor(last.created_at, last.id)
+
+    async def list_documents(self, user_id, cursor: Optional[str], limit: int) -> DocumentPageOut:
+        limits = await self._resolve_effective_limits(user_id)
+        rows = await self.documents.list_page(
+            user_id, cursor=cursor, limit=limit, history_cap=limits.history_cap
+        )
+        return DocumentPageOut(
+            items=[DocumentSummaryOut.model_validate(r) for r in rows[:limit]],
+            next_cursor=self._next_cursor(rows, limit),
+        )
+
+    async def list_analyses(self, user_id, cursor: Optional[str], limit: int) -> AnalysisPageOut:
+        limits = await self._resolve_effective_limits(user_id)
+        rows = await self.analyses.list_page(
+            user_id, cursor=cursor, limit=limit, history_cap=limits.history_cap
+        )
+        return AnalysisPageOut(
+            items=[AnalysisSummaryOut.model_validate(r) for r in rows[:limit]],
+            next_cursor=self._next_cursor(rows, limit),
+        )
@@ -0,0 +1,96 @@
+# app/domain/services/model_backends.py
+from __future__ import annotations
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+from app.core.config import settings
+from app.domain.models.models import Document
+
+@dataclass(slots=True)
+class AnnotationResult:
+    clause_type: str                 # HIGH / WARN / STANDARD
+    page: Optional[int] = None
+    bbox: Optional[dict] = None
+    text: Optional[str] = None
+    explanation: Optional[str] = None
+    risk_weight: Optional[float] = None
+
+@dataclass(slots=True)
+class ModelResult:
+    result_json: dict
+    risk_score: Optional[float] = None
+    summary: Optional[str] = None
+    annotations: list[AnnotationResult] = field(default_factory=list)
+    tokens_input: Optional[int] = None
+    tokens_output: Optional[int] = None
+
+class ModelBackend(ABC):
+    """Backend que ejecuta el análisis de riesgo de un documento."""
+    name: str
+    prompt_version: str = "v1"  # súbelo al cambiar el prompt: invalida la caché de resultados
+
+    @abstractmethod
+    async def analyze(self, document: Document, pages: Optional[Sequence[str]] = None) -> ModelResult:
+        """`pages`: texto por página de la etapa de extracción (None si está desactivada)."""
+
+    def render_summary(self, document: Document, result_json: dict) -> Optional[str]:
+        """
+        Summary de un resultado cacheado para otro documento con el mismo contenido.
+        No se copia el del original: puede mencionar datos de ese documento (nombre, etc.).
+        """
+        return None
+
+class StubModelBackend(ModelBackend):
+    """
+    Backend local determinista (por sha256 del documento), para dev y pruebas
+    de throughput. `latency_ms` simula la espera del modelo real.
+    """
+    name = "stub-v1"
+
+    def __init__(self, latency_ms: int = 0, annotations: int = 3):
+        self.latency_ms = latency_ms
+        self.annotations = annotations
+
+    async def analyze(self, document: Document, pages: Optional[Sequence[str]] = None) -> ModelResult:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        seed = int(hashlib.sha256((document.sha256 or str(document.id)).encode()).hexdigest()[:8], 16)
+        risk = round((seed % 100) / 10, 1)
+        kinds = ("HIGH", "WARN", "STANDARD")
+        annotations = [
+            AnnotationResult(
+                clause_type=kinds[(seed + i) % 3],
+                page=1 + i,
+                bbox={"x": 0.1, "y": 0.1 * (i + 1), "w": 0.8, "h": 0.05},
+                text=f"Cláusula {i + 1}",
+                explanation="Resultado simulado",
+                risk_weight=round(((seed >> i) % 100) / 100, 2),
+            )
+            for i in range(self.annotations)
+        ]
+        result_json = {"backend": self.name, "risk_score": risk, "clauses": len(annotations)}
+        return ModelResult(
+            result_json=result_json,
+            risk_score=risk,
+            summary=self.render_summary(document, result_json),
+            annotations=annotations,
+            tokens_input=(sum(len(p) for p in pages) if pages is not None else document.size_bytes or 0) // 4,
+            tokens_output=50 * len(annotations),
+        )
+
+    def render_summary(self, document: Document, result_json: dict) -> Optional[str]:
+        return f"Análisis simulado de {document.filename}"
+
+
+_backend: ModelBackend | None = None
+
+def get_model_backend() -> ModelBackend:
+    global _backend
+    if _backend is None:
+        if settings.ANALYSIS_MODEL_BACKEND == "stub":
+            _backend = StubModelBackend(latency_ms=settings.ANALYSIS_STUB_LATENCY_MS)
+        else:
+            raise RuntimeError(f"Unsupported model backend: {settings.ANALYSIS_MODEL_BACKEND}")
+    return _backend
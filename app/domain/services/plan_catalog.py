@@ -0,0 +1,103 @@
+# app/domain/services/plan_catalog.py
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.domain.models.models import Plan
+from app.domain.repositories.plans_repo import PlansRepo
+
+DEFAULT_FREE_LIMITS = {"weekly_free_analyses": 1, "history_cap": 3}
+
+@dataclass(frozen=True, slots=True)
+class PlanLimits:
+    """Límites ya resueltos de un plan. None significa ILIMITADO."""
+    plan_id: Optional[int]
+    code: str
+    weekly_free_analyses: Optional[int]
+    history_cap: Optional[int]
+
+DEFAULT_FREE = PlanLimits(
+    plan_id=None,
+    code="free",
+    weekly_free_analyses=DEFAULT_FREE_LIMITS["weekly_free_analyses"],
+    history_cap=DEFAULT_FREE_LIMITS["history_cap"],
+)
+
+def compile_plan(plan: Plan) -> PlanLimits:
+    # Convención: si premium no tiene tope, guarda None
+    limits = plan.limits or {}
+    return PlanLimits(
+        plan_id=plan.id,
+        code=plan.code,
+        weekly_free_analyses=limits.get("weekly_free_analyses"),
+        history_cap=limits.get("history_cap"),
+    )
+
+def compile_free_plan(plan: Plan) -> PlanLimits:
+    # En FREE, las claves ausentes caen en los valores por defecto
+    limits = plan.limits or {}
+    return PlanLimits(
+        plan_id=plan.id,
+        code=plan.code,
+        weekly_free_analyses=limits.get("weekly_free_analyses", DEFAULT_FREE.weekly_free_analyses),
+        history_cap=limits.get("history_cap", DEFAULT_FREE.history_cap),
+    )
+
+class PlanCatalog:
+    """
+    Catálogo de planes en memoria (uno por worker). Se carga al arrancar y se
+    recarga cuando vence el TTL o cuando alguien llama a invalidate().
+    invalidate() es el hook para invalidación entre workers (p. ej. desde un
+    LISTEN/NOTIFY o un endpoint de administración).
+    """
+
+    def __init__(self, ttl_s: float):
+        self.ttl_s = ttl_s
+        self.version = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._by_id: dict[int, PlanLimits] = {}
+        self._free: PlanLimits = DEFAULT_FREE
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        if self._loaded_version != self.version:
+            return True
+        return time.monotonic() - self._loaded_at >= self.ttl_s
+
+    async def load(self, db: AsyncSession) -> None:
+        version = self.version
+        plans = await PlansRepo(db).list_plans()
+        # Se cargan también los planes inactivos: puede haber suscripciones vigentes a ellos
+        by_id = {p.id: compile_plan(p) for p in plans}
+        free = next((p for p in plans if p.code == "free" and p.active), None)
+        self._by_id = by_id
+        self._free = compile_free_plan(free) if free else DEFAULT_FREE
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        if not self.is_stale:
+            return
+        async with self._lock:
+            if self.is_stale:
+                await self.load(db)
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+    def get(self, plan_id: Optional[int]) -> Optional[PlanLimits]:
+        if plan_id is None:
+            return None
+        return self._by_id.get(plan_id)
+
+    @property
+    def free(self) -> PlanLimits:
+        return self._free
+
+
+plan_catalog = PlanCatalog(ttl_s=settings.PLAN_CATALOG_TTL_S)
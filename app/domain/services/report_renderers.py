@@ -0,0 +1,228 @@
+# app/domain/services/report_renderers.py
+from __future__ import annotations
+import re
+import textwrap
+import zipfile
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+from xml.sax.saxutils import escape
+from app.domain.models.models import Analysis
+
+# Súbelo al cambiar el layout: invalida los exports cacheados en storage
+TEMPLATE_VERSION = "v1"
+
+CLAUSE_LABELS = {"HIGH": "Riesgo alto", "WARN": "Advertencia", "STANDARD": "Estándar"}
+
+async def report_blocks(analysis: Analysis, annotations: AsyncIterator) -> AsyncIterator[tuple[str, str]]:
+    """Contenido del reporte como (estilo, texto); estilo: title / heading / body / blank."""
+    yield "title", "Reporte de análisis"
+    yield "body", f"Modelo: {analysis.model}"
+    if analysis.risk_score is not None:
+        yield "body", f"Puntaje de riesgo: {analysis.risk_score}"
+    yield "body", f"Fecha: {analysis.created_at:%Y-%m-%d %H:%M} UTC"
+    if analysis.summary:
+        yield "blank", ""
+        yield "heading", "Resumen"
+        yield "body", analysis.summary
+    yield "blank", ""
+    yield "heading", "Cláusulas"
+    async for a in annotations:
+        label = CLAUSE_LABELS.get(a.clause_type, a.clause_type)
+        where = f"página {a.page}" if a.page is not None else "sin página"
+        weight = f" · peso {a.risk_weight}" if a.risk_weight is not None else ""
+        yield "heading", f"[{label}] {where}{weight}"
+        if a.text:
+            yield "body", a.text
+        if a.explanation:
+            yield "body", a.explanation
+        yield "blank", ""
+
+class ReportRenderer(ABC):
+    format: str
+    media_type: str
+
+    @abstractmethod
+    def render(self, blocks: AsyncIterator[tuple[str, str]]) -> AsyncIterator[bytes]:
+        """Genera el archivo por chunks (una página / lote de párrafos a la vez)."""
+
+# ---------- PDF ----------
+
+class PdfRenderer(ReportRenderer):
+    """
+    PDF 1.4 mínimo (Helvetica, WinAnsi) escrito en streaming: cada página se
+    emite apenas se llena. Solo se retienen offsets del xref y los ids de página.
+    """
+    format = "pdf"
+    media_type = "application/pdf"
+
+    PAGE_W, PAGE_H = 595, 842     # A4 en puntos
+    MARGIN = 50
+    LINE_H = 14
+    WRAP = 95
+    STYLES = {"title": ("F2", 16), "heading": ("F2", 11), "body": ("F1", 10), "blank": ("F1", 10)}
+
+    # ids fijos; páginas y contenidos se numeran desde 5
+    CATALOG, PAGES, FONT, FONT_BOLD = 1, 2, 3, 4
+
+    @property
+    def lines_per_page(self) -> int:
+        return (self.PAGE_H - 2 * self.MARGIN) // self.LINE_H
+
+    @staticmethod
+    def _pdf_text(s: str) -> str:
+        s = s.encode("cp1252", errors="replace").decode("latin-1")
+        return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    def _page_content(self, lines: list[tuple[str, str]]) -> bytes:
+        out = [f"BT {self.MARGIN} {self.PAGE_H - self.MARGIN} Td {self.LINE_H} TL"]
+        for style, text in lines:
+            font, size = self.STYLES[style]
+            out.append(f"/{font} {size} Tf ({self._pdf_text(text)}) Tj T*")
+        out.append("ET")
+        return "\n".join(out).encode("latin-1")
+
+    async def render(self, blocks: AsyncIterator[tuple[str, str]]) -> AsyncIterator[bytes]:
+        offsets: dict[int, int] = {}
+        pos = 0
+        next_id = 5
+        kids: list[int] = []
+
+        def obj(num: int, body: bytes) -> bytes:
+            nonlocal pos
+            offsets[num] = pos
+            data = b"%d 0 obj\n" % num + body + b"\nendobj\n"
+            pos += len(data)
+            return data
+
+        def page(lines: list[tuple[str, str]]) -> bytes:
+            nonlocal next_id
+            content_id, page_id = next_id, next_id + 1
+            next_id += 2
+            kids.append(page_id)
+            stream = self._page_content(lines)
+            return obj(
+                content_id,
+                b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+            ) + obj(
+                page_id,
+                (
+                    f"<< /Type /Page /Parent {self.PAGES} 0 R /MediaBox [0 0 {self.PAGE_W} {self.PAGE_H}] "
+                    f"/Resources << /Font << /F1 {self.FONT} 0 R /F2 {self.FONT_BOLD} 0 R >> >> "
+                    f"/Contents {content_id} 0 R >>"
+                ).encode(),
+            )
+
+        header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        pos = len(header)
+        yield header
+        yield obj(self.FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        yield obj(self.FONT_BOLD, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+        lines: list[tuple[str, str]] = []
+        async for style, text in blocks:
+            wrapped = textwrap.wrap(text, self.WRAP) if text else [""]
+            for chunk in wrapped:
+                lines.append((style, chunk))
+                if len(lines) == self.lines_per_page:
+                    yield page(lines)
+                    lines = []
+        if lines or not kids:
+            yield page(lines)
+
+        kids_ref = " ".join(f"{k} 0 R" for k in kids)
+        yield obj(self.PAGES, f"<< /Type /Pages /Kids [{kids_ref}] /Count {len(kids)} >>".encode())
+        yield obj(self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>".encode())
+
+        xref_at = pos
+        size = next_id
+        xref = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        xref += [f"{offsets[n]:010d} 00000 n \n" for n in range(1, size)]
+        xref.append(f"trailer\n<< /Size {size} /Root {self.CATALOG} 0 R >>\nstartxref\n{xref_at}\n%%EOF\n")
+        yield "".join(xref).encode()
+
+# ---------- DOCX ----------
+
+class _ChunkSink:
+    """Destino no seekable para ZipFile: acumula lo escrito hasta el siguiente drain()."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buf += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+class DocxRenderer(ReportRenderer):
+    """
+    DOCX (WordprocessingML) generado con zipfile en modo streaming: document.xml
+    se escribe párrafo a párrafo y se vacía al destino cada `FLUSH_EVERY` párrafos.
+    """
+    format = "docx"
+    media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+    FLUSH_EVERY = 200
+    SIZES = {"title": 32, "heading": 22, "body": 20, "blank": 20}   # medio-puntos
+
+    CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '</Types>'
+    )
+    RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/>'
+        '</Relationships>'
+    )
+    DOC_OPEN = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    )
+    DOC_CLOSE = '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/></w:sectPr></w:body></w:document>'
+
+    def _paragraph(self, style: str, text: str) -> str:
+        if style == "blank":
+            return "<w:p/>"
+        bold = "<w:b/>" if style in ("title", "heading") else ""
+        body = escape(_XML_INVALID.sub("", text))
+        return (
+            f'<w:p><w:r><w:rPr>{bold}<w:sz w:val="{self.SIZES[style]}"/></w:rPr>'
+            f'<w:t xml:space="preserve">{body}</w:t></w:r></w:p>'
+        )
+
+    async def render(self, blocks: AsyncIterator[tuple[str, str]]) -> AsyncIterator[bytes]:
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("[Content_Types].xml", self.CONTENT_TYPES)
+            zf.writestr("_rels/.rels", self.RELS)
+            with zf.open("word/document.xml", "w", force_zip64=True) as doc:
+                doc.write(self.DOC_OPEN.encode())
+                n = 0
+                async for style, text in blocks:
+                    doc.write(self._paragraph(style, text).encode())
+                    n += 1
+                    if n % self.FLUSH_EVERY == 0:
+                        data = sink.drain()
+                        if data:
+                            yield data
+                doc.write(self.DOC_CLOSE.encode())
+        yield sink.drain()
+
+
+RENDERERS: dict[str, ReportRenderer] = {r.format: r for r in (PdfRenderer(), DocxRenderer())}
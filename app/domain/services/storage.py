@@ -0,0 +1,128 @@
+# app/domain/services/storage.py
+from __future__ import annotations
+import asyncio
+import os
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO
+from app.core.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+class StagedUpload(ABC):
+    """Objeto en escritura: se escribe por chunks y luego se confirma o descarta."""
+
+    @abstractmethod
+    async def write(self, chunk: bytes) -> None: ...
+
+    @abstractmethod
+    async def commit(self, key: str) -> str:
+        """Publica el objeto bajo `key` y devuelve su storage_url."""
+
+    @abstractmethod
+    async def discard(self) -> None: ...
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def stage(self) -> StagedUpload: ...
+
+    @abstractmethod
+    def read(self, url: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]: ...
+
+    @abstractmethod
+    async def exists(self, url: str) -> bool: ...
+
+    @abstractmethod
+    async def delete(self, url: str) -> None: ...
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> str:
+        staged = self.stage()
+        try:
+            async for chunk in chunks:
+                await staged.write(chunk)
+            return await staged.commit(key)
+        except BaseException:
+            await staged.discard()
+            raise
+
+# ---------- Filesystem local (dev / tests) ----------
+
+class _LocalStagedUpload(StagedUpload):
+    def __init__(self, backend: "LocalStorage"):
+        self._backend = backend
+        self._tmp = backend.root / "tmp" / uuid.uuid4().hex
+        self._fh: BinaryIO | None = None
+
+    async def write(self, chunk: bytes) -> None:
+        if self._fh is None:
+            self._tmp.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self._tmp, "wb")
+        await asyncio.to_thread(self._fh.write, chunk)
+
+    def _close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    async def commit(self, key: str) -> str:
+        if self._fh is None:  # objeto vacío
+            await self.write(b"")
+        self._close()
+        dest = self._backend.path_for_key(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._tmp, dest)
+        return LocalStorage.SCHEME + key
+
+    async def discard(self) -> None:
+        self._close()
+        self._tmp.unlink(missing_ok=True)
+
+class LocalStorage(StorageBackend):
+    SCHEME = "local://"
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def path_for_key(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError("Invalid storage key")
+        return path
+
+    def _path(self, url: str) -> Path:
+        if not url.startswith(self.SCHEME):
+            raise ValueError(f"Not a local storage url: {url}")
+        return self.path_for_key(url[len(self.SCHEME):])
+
+    def stage(self) -> StagedUpload:
+        return _LocalStagedUpload(self)
+
+    async def read(self, url: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        fh = await asyncio.to_thread(open, self._path(url), "rb")
+        try:
+            while True:
+                chunk = await asyncio.to_thread(fh.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            fh.close()
+
+    async def exists(self, url: str) -> bool:
+        return self._path(url).exists()
+
+    async def delete(self, url: str) -> None:
+        self._path(url).unlink(missing_ok=True)
+
+
+_storage: StorageBackend | None = None
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "local":
+            _storage = LocalStorage(settings.STORAGE_LOCAL_ROOT)
+        else:
+            raise RuntimeError(f"Unsupported storage backend: {settings.STORAGE_BACKEND}")
+    return _storage
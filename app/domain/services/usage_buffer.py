@@ -0,0 +1,191 @@
+# app/domain/services/usage_buffer.py
+from __future__ import annotations
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import AsyncExitStack
+from datetime import date
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.config import settings
+from app.domain.repositories.usage_repo import ConsumeResult, UsageRepo
+
+logger = logging.getLogger(__name__)
+
+KEY_LOCK_STRIPES = 64
+
+class UsageBuffer:
+    """
+    Contadores de uso write-behind (uno por worker).
+
+    Cada consumo se reserva como un AnalysisRequest (usage_window_start, counted_at NULL),
+    que es una fila nueva por análisis, sin contención. Los incrementos de
+    user_usage_windows se acumulan en memoria y se vuelcan en un solo upsert multi-fila
+    cada N ms o cada M entradas. Si el proceso cae, las reservas sin contar se
+    recuperan con UsageRepo.recover_uncounted: el contador nunca pierde consumos.
+
+    El tope de cuota es exacto dentro del worker; entre workers es aproximado
+    (cada uno ve el contador en BD + sus propios deltas). Para que "BD + deltas"
+    sea consistente, la lectura+chequeo+incremento de try_consume y el
+    commit+descuento de flush de una misma key se serializan con un lock por
+    key (striped: memoria acotada).
+    """
+
+    def __init__(self, flush_interval_ms: int, max_pending: int, recovery_grace_s: int):
+        self.flush_interval_s = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.recovery_grace_s = recovery_grace_s
+        self._pending: dict[uuid.UUID, tuple[tuple[uuid.UUID, date], float]] = {}
+        self._deltas: dict[tuple[uuid.UUID, date], int] = {}
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._key_locks = [asyncio.Lock() for _ in range(KEY_LOCK_STRIPES)]
+        self._last_recovery = 0.0
+        self.flushes = 0
+        self.flushed_requests = 0
+        self.flush_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def pending_delta(self, user_id, window_start: date) -> int:
+        return self._deltas.get((_as_uuid(user_id), window_start), 0)
+
+    async def try_consume(self, db: AsyncSession, user_id, limit: Optional[int], window_start: date,
+                          idempotency_key: Optional[str] = None,
+                          request_values: Optional[dict] = None) -> ConsumeResult:
+        if limit is not None and limit <= 0:
+            return ConsumeResult(consumed=False)
+
+        key = (_as_uuid(user_id), window_start)
+        repo = UsageRepo(db)
+        # con el lock, un flush no puede pasar deltas a la BD entre la lectura y el chequeo
+        async with self._key_lock(key):
+            used = await repo.get_week_count(user_id, window_start)
+            count = used + self._deltas.get(key, 0)
+            if limit is not None and count >= limit:
+                return ConsumeResult(consumed=False)
+            self._deltas[key] = self._deltas.get(key, 0) + 1
+
+        try:
+            request_id = await repo.reserve(
+                user_id, window_start, idempotency_key or uuid.uuid4().hex, request_values
+            )
+        except Exception:
+            self._release(key)
+            raise
+        if request_id is None:
+            self._release(key)
+            return ConsumeResult(consumed=False, duplicate=True)
+
+        # Si el llamador hace rollback, el id nunca se marca y su delta local se descarta
+        # al vencer recovery_grace_s (mientras tanto se sobrecuenta: lado seguro).
+        self._pending[request_id] = (key, time.monotonic())
+        if len(self._pending) >= self.max_pending:
+            self._wake.set()
+        return ConsumeResult(consumed=True, count=count + 1, request_id=request_id)
+
+    def _key_lock(self, key: tuple[uuid.UUID, date]) -> asyncio.Lock:
+        return self._key_locks[hash(key) % KEY_LOCK_STRIPES]
+
+    def _release(self, key: tuple[uuid.UUID, date]) -> None:
+        left = self._deltas.get(key, 0) - 1
+        if left > 0:
+            self._deltas[key] = left
+        else:
+            self._deltas.pop(key, None)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending or self._sessionmaker is None:
+                return 0
+            batch = dict(self._pending)
+            # commit + descuento de deltas atómicos respecto de try_consume (orden fijo: sin deadlocks)
+            stripes = sorted({hash(key) % KEY_LOCK_STRIPES for key, _ in batch.values()})
+            async with AsyncExitStack() as stack:
+                for i in stripes:
+                    await stack.enter_async_context(self._key_locks[i])
+                try:
+                    async with self._sessionmaker() as db:
+                        marked = await UsageRepo(db).flush_counted(list(batch))
+                        await db.commit()
+                except Exception:
+                    # se reintenta en el próximo ciclo (o los recupera recover_uncounted)
+                    self.flush_errors += 1
+                    raise
+                for request_id in marked:
+                    key, _ = self._pending.pop(request_id)
+                    self._release(key)
+                # ids sin marcar: transacción aún abierta o con rollback. Pasado el margen
+                # se sueltan; si existían, recover_uncounted los cuenta.
+                now = time.monotonic()
+                for request_id, (key, reserved_at) in batch.items():
+                    if request_id in self._pending and now - reserved_at > self.recovery_grace_s:
+                        del self._pending[request_id]
+                        self._release(key)
+            self.flushes += 1
+            self.flushed_requests += len(marked)
+            return len(marked)
+
+    async def recover(self) -> int:
+        if self._sessionmaker is None:
+            return 0
+        self._last_recovery = time.monotonic()
+        async with self._sessionmaker() as db:
+            recovered = await UsageRepo(db).recover_uncounted(self.recovery_grace_s)
+            await db.commit()
+        return len(recovered)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_recovery >= self.recovery_grace_s:
+                    await self.recover()
+            except Exception:
+                logger.exception("Usage buffer flush failed")
+
+    def start(self, sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+        if self._task is None:
+            self._sessionmaker = sessionmaker
+            self._task = asyncio.create_task(self._run(), name="usage-buffer")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending_requests": len(self._pending),
+            "pending_keys": len(self._deltas),
+            "flushes": self.flushes,
+            "flushed_requests": self.flushed_requests,
+            "flush_errors": self.flush_errors,
+        }
+
+
+def _as_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+usage_buffer = UsageBuffer(
+    flush_interval_ms=settings.USAGE_FLUSH_INTERVAL_MS,
+    max_pending=settings.USAGE_FLUSH_MAX_PENDING,
+    recovery_grace_s=settings.USAGE_RECOVERY_GRACE_S,
+)
@@ -0,0 +1,25 @@
+# app/domain/services/usage_service.py
+from __future__ import annotations
+from datetime import date
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.repositories.usage_repo import ConsumeResult, UsageRepo
+from app.domain.services.usage_buffer import usage_buffer
+
+class UsageService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.usage = UsageRepo(db)
+
+    async def try_consume(self, user_id, limit: Optional[int], window_start: date,
+                          idempotency_key: Optional[str] = None,
+                          request_values: Optional[dict] = None) -> ConsumeResult:
+        """
+        Descuenta una unidad de la cuota semanal. Con USAGE_WRITE_BEHIND va por el
+        buffer en memoria; si no, por el upsert atómico directo sobre user_usage_windows.
+        """
+        if usage_buffer.running:
+            return await usage_buffer.try_consume(
+                self.db, user_id, limit, window_start, idempotency_key, request_values
+            )
+        return await self.usage.try_consume(user_id, limit, window_start, idempotency_key, request_values)
@@ -0,0 +1,110 @@
+# app/domain/services/webhook_handlers.py
+from __future__ import annotations
+import uuid
+from datetime import datetime, timezone
+from functools import partial
+from typing import Awaitable, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.repositories.billing_repo import BillingRepo
+from app.domain.repositories.plans_repo import PlansRepo
+
+# Un handler aplica el evento y retorna False si el tipo de evento no nos interesa
+WebhookHandler = Callable[[AsyncSession, dict], Awaitable[bool]]
+
+def _ts(value) -> datetime | None:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value else None
+
+# ---------- Stripe ----------
+
+# Los handlers de Stripe reciben el `data.object` y el `created` del evento
+StripeHandler = Callable[[AsyncSession, dict, datetime | None], Awaitable[bool]]
+
+STRIPE_SUB_STATUS = {
+    "active": "active",
+    "trialing": "in_trial",
+    "past_due": "past_due",
+    "unpaid": "past_due",
+    "canceled": "canceled",
+    "incomplete_expired": "canceled",
+}
+
+async def _stripe_subscription(db: AsyncSession, obj: dict, created: datetime | None) -> bool:
+    status = STRIPE_SUB_STATUS.get(obj.get("status"))
+    if status is None:  # incomplete / paused: todavía no cambia el plan
+        return False
+    billing = BillingRepo(db)
+    existing = await billing.get_subscription("stripe", obj["id"])
+    meta = obj.get("metadata") or {}
+    items = (obj.get("items") or {}).get("data") or [{}]
+
+    user_id = existing.user_id if existing else None
+    if user_id is None and meta.get("user_id"):
+        user_id = uuid.UUID(meta["user_id"])
+    if user_id is None:
+        user_id = await billing.user_for_customer("stripe", obj.get("customer"))
+    if user_id is None:
+        raise ValueError(f"Cannot resolve user for subscription {obj['id']}")
+
+    plan_code = meta.get("plan_code") or (items[0].get("price") or {}).get("lookup_key")
+    plan = await PlansRepo(db).get_plan_by_code(plan_code) if plan_code else None
+    plan_id = plan.id if plan else (existing.plan_id if existing else None)
+    if plan_id is None:
+        raise ValueError(f"Cannot resolve plan for subscription {obj['id']}")
+
+    # API nuevas mueven el periodo a los items. Stripe no garantiza el orden de entrega:
+    # un evento más viejo que el último aplicado (p. ej. un .updated tardío tras .deleted) no pisa nada
+    return await billing.upsert_subscription(
+        user_id=user_id,
+        provider="stripe",
+        external_subscription_id=obj["id"],
+        external_customer_id=obj.get("customer"),
+        plan_id=plan_id,
+        status=status,
+        current_period_start=_ts(obj.get("current_period_start") or items[0].get("current_period_start")),
+        current_period_end=_ts(obj.get("current_period_end") or items[0].get("current_period_end")),
+        cancel_at=_ts(obj.get("cancel_at")),
+        event_created_at=created,
+    )
+
+async def _stripe_invoice(db: AsyncSession, obj: dict, created: datetime | None, *, status: str) -> bool:
+    billing = BillingRepo(db)
+    sub_ext = obj.get("subscription") or ((obj.get("parent") or {}).get("subscription_details") or {}).get("subscription")
+    sub = await billing.get_subscription("stripe", sub_ext) if sub_ext else None
+    user_id = sub.user_id if sub else await billing.user_for_customer("stripe", obj.get("customer"))
+    amount = obj.get("amount_paid") if status == "succeeded" else obj.get("amount_due")
+    await billing.upsert_payment(
+        provider="stripe",
+        provider_payment_id=obj.get("payment_intent") or obj["id"],
+        user_id=user_id,
+        subscription_id=sub.id if sub else None,
+        amount_cents=amount or 0,
+        currency=(obj.get("currency") or "usd").upper(),
+        status=status,
+    )
+    return True
+
+async def _stripe_refund(db: AsyncSession, obj: dict, created: datetime | None) -> bool:
+    await BillingRepo(db).set_payment_status(obj.get("payment_intent") or obj["id"], "refunded")
+    return True
+
+STRIPE_EVENTS: dict[str, StripeHandler] = {
+    "customer.subscription.created": _stripe_subscription,
+    "customer.subscription.updated": _stripe_subscription,
+    "customer.subscription.deleted": _stripe_subscription,
+    "invoice.paid": partial(_stripe_invoice, status="succeeded"),
+    "invoice.payment_succeeded": partial(_stripe_invoice, status="succeeded"),
+    "invoice.payment_failed": partial(_stripe_invoice, status="failed"),
+    "charge.refunded": _stripe_refund,
+}
+
+async def handle_stripe(db: AsyncSession, payload: dict) -> bool:
+    handler = STRIPE_EVENTS.get(payload.get("type"))
+    if handler is None:
+        return False
+    return await handler(db, payload["data"]["object"], _ts(payload.get("created")))
+
+
+# Un proveedor solo entra en webhook_service.PROVIDERS cuando tiene verificación y handler aquí
+HANDLERS: dict[str, WebhookHandler] = {
+    "stripe": handle_stripe,
+}
@@ -0,0 +1,144 @@
+# app/domain/services/webhook_processor.py
+from __future__ import annotations
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.config import settings
+from app.domain.repositories.webhooks_repo import WebhooksRepo
+from app.domain.services.webhook_handlers import HANDLERS, WebhookHandler
+
+logger = logging.getLogger(__name__)
+
+class ProviderStats:
+    def __init__(self):
+        self.received = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.ignored = 0
+        self.failed = 0
+        self.lag_s_last = 0.0       # received_at -> processed_at del último evento
+        self.lag_s_max = 0.0
+        self._lag_s_total = 0.0
+
+    def record_lag(self, lag_s: float) -> None:
+        self.lag_s_last = lag_s
+        self.lag_s_max = max(self.lag_s_max, lag_s)
+        self._lag_s_total += lag_s
+
+    def as_dict(self) -> dict[str, int | float]:
+        done = self.processed + self.ignored + self.failed
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "processed": self.processed,
+            "ignored": self.ignored,
+            "failed": self.failed,
+            "lag_s_last": round(self.lag_s_last, 3),
+            "lag_s_max": round(self.lag_s_max, 3),
+            "lag_s_avg": round(self._lag_s_total / done, 3) if done else 0.0,
+        }
+
+class WebhookProcessor:
+    """
+    Procesa en segundo plano los webhook_events 'received'. La ruta solo persiste
+    y responde; aquí se drenan lotes con FOR UPDATE SKIP LOCKED y se aplican los
+    cambios de Subscription/Payment. Cada evento corre en un SAVEPOINT: uno que
+    falla queda 'failed' sin tumbar el resto del lote. Un commit por lote.
+    """
+
+    def __init__(self, batch_size: int, poll_interval_ms: int,
+                 handlers: Optional[dict[str, WebhookHandler]] = None):
+        self.batch_size = batch_size
+        self.poll_interval_s = poll_interval_ms / 1000
+        self.handlers = handlers if handlers is not None else HANDLERS
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.providers: dict[str, ProviderStats] = defaultdict(ProviderStats)
+        self.batches = 0
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def record_ingest(self, provider: str, inserted: bool) -> None:
+        stats = self.providers[provider]
+        if inserted:
+            stats.received += 1
+        else:
+            stats.duplicates += 1
+
+    def start(self, sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+        if self._task is not None:
+            return
+        self._sessionmaker = sessionmaker
+        self._task = asyncio.create_task(self._run(), name="webhook-processor")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                n = await self.run_once()
+            except Exception:
+                logger.exception("Webhook batch failed")
+                n = 0
+            if n < self.batch_size:  # lote completo = probablemente hay más, seguir sin esperar
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def run_once(self) -> int:
+        """Procesa un lote. Devuelve cuántos eventos tomó."""
+        async with self._sessionmaker() as db:
+            repo = WebhooksRepo(db)
+            events = await repo.claim_batch(self.handlers.keys(), self.batch_size)
+            if not events:
+                return 0
+
+            results: list[tuple[int, str, datetime, str]] = []  # (id, provider, received_at, status)
+            for ev in events:
+                try:
+                    async with db.begin_nested():
+                        applied = await self.handlers[ev.provider](db, ev.payload)
+                    status = "processed" if applied else "ignored"
+                except Exception:
+                    logger.exception("Webhook %s/%s failed", ev.provider, ev.event_id)
+                    status = "failed"
+                results.append((ev.id, ev.provider, ev.received_at, status))
+
+            now = datetime.now(tz=timezone.utc)
+            for status in ("processed", "ignored", "failed"):
+                await repo.mark([r[0] for r in results if r[3] == status], status, now)
+            await db.commit()
+
+        for _, provider, received_at, status in results:
+            stats = self.providers[provider]
+            setattr(stats, status, getattr(stats, status) + 1)
+            if received_at.tzinfo is None:
+                received_at = received_at.replace(tzinfo=timezone.utc)
+            stats.record_lag((now - received_at).total_seconds())
+        self.batches += 1
+        return len(events)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "batches": self.batches,
+            "providers": {p: s.as_dict() for p, s in self.providers.items()},
+        }
+
+
+webhook_processor = WebhookProcessor(
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    poll_interval_ms=settings.WEBHOOK_POLL_INTERVAL_MS,
+)
@@ -0,0 +1,70 @@
+# app/domain/services/webhook_service.py
+from __future__ import annotations
+import hashlib
+import hmac
+import json
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.domain.repositories.webhooks_repo import WebhooksRepo
+from app.domain.services.webhook_processor import webhook_processor
+
+# Solo proveedores con verificación de firma y handler: App Store / Play Store se
+# agregan cuando existan la verificación del JWS / del token OIDC de Pub/Sub y sus handlers
+PROVIDERS = ("stripe",)
+STRIPE_TOLERANCE_S = 300
+
+class InvalidSignature(ValueError):
+    pass
+
+def verify_stripe_signature(raw: bytes, header: str | None, secret: str, now: float | None = None) -> None:
+    """Stripe-Signature: t=<ts>,v1=<hmac_sha256(secret, f'{t}.{body}')>[,v1=...]"""
+    if not header:
+        raise InvalidSignature("Missing Stripe-Signature")
+    parts = [p.split("=", 1) for p in header.split(",") if "=" in p]
+    ts = next((v for k, v in parts if k == "t"), None)
+    sigs = [v for k, v in parts if k == "v1"]
+    if not ts or not ts.isdigit() or not sigs:
+        raise InvalidSignature("Malformed Stripe-Signature")
+    if abs((now or time.time()) - int(ts)) > STRIPE_TOLERANCE_S:
+        raise InvalidSignature("Stale Stripe-Signature")
+    expected = hmac.new(secret.encode(), ts.encode() + b"." + raw, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, s) for s in sigs):
+        raise InvalidSignature("Invalid Stripe-Signature")
+
+def extract_event_id(provider: str, payload: dict, raw: bytes) -> str:
+    event_id = payload.get("id") if provider == "stripe" else None
+    # sin id propio: el contenido identifica al evento (los reintentos son byte a byte iguales)
+    return str(event_id or hashlib.sha256(raw).hexdigest())[:120]
+
+class WebhookService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.webhooks = WebhooksRepo(db)
+
+    async def ingest(self, provider: str, raw: bytes, signature: str | None = None) -> bool:
+        """
+        Verifica, persiste el payload crudo y retorna sin procesarlo (el proveedor
+        reintenta si tardamos). Retorna False si el evento ya estaba registrado.
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unsupported provider: {provider}")
+        if provider == "stripe":
+            if settings.STRIPE_WEBHOOK_SECRET:
+                verify_stripe_signature(raw, signature, settings.STRIPE_WEBHOOK_SECRET)
+            elif settings.ENV != "dev":
+                # sin secreto no hay forma de autenticar al emisor: cualquiera podría otorgarse un plan
+                raise InvalidSignature("Stripe webhook secret not configured")
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            raise ValueError("Invalid JSON payload")
+        if not isinstance(payload, dict):
+            raise ValueError("Invalid JSON payload")
+
+        inserted = await self.webhooks.ingest(provider, extract_event_id(provider, payload, raw), payload)
+        await self.db.commit()
+        webhook_processor.record_ingest(provider, inserted)
+        if inserted:
+            webhook_processor.notify()
+        return inserted
@@ -1,16 +1,55 @@
+import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from app.db_async import engine
+from app.db_async import engine, SessionLocal
+from app.api.core.security import refresh_hasher
+from app.api.core.revocation import revocation_epochs
 from app.api.routes.auth import router as auth_router
 from app.api.routes.me import router as me_router
+from app.api.routes.health import router as health_router
+from app.api.routes.documents import router as documents_router
+from app.api.routes.analyses import router as analyses_router
+from app.api.routes.webhooks import router as webhooks_router
+from app.api.routes.wellknown import router as wellknown_router
+from app.core.config import settings
+from app.domain.services.plan_catalog import plan_catalog
+from app.domain.services.usage_buffer import usage_buffer
+from app.domain.services.analysis_jobs import analysis_jobs
+from app.domain.services.webhook_processor import webhook_processor
+from app.domain.services.audit_logger import audit_logger
+from app.domain.services.extraction import extraction_pipeline
+
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
+    try:
+        async with SessionLocal() as db:
+            await plan_catalog.load(db)
+    except Exception:
+        # sin BD al arrancar: el catálogo se carga en la primera consulta
+        logger.warning("Plan catalog not loaded at startup", exc_info=True)
+    revocation_epochs.start(SessionLocal)
+    if settings.AUDIT_ENABLED:
+        audit_logger.start(SessionLocal)
+    if settings.USAGE_WRITE_BEHIND:
+        usage_buffer.start(SessionLocal)
+    if settings.ANALYSIS_WORKERS > 0:
+        analysis_jobs.start(SessionLocal)
+    if settings.WEBHOOK_PROCESSOR_ENABLED:
+        webhook_processor.start(SessionLocal)
     yield
     # shutdown
+    await revocation_epochs.stop()
+    await webhook_processor.stop()  # un lote cortado hace rollback y vuelve a 'received'
+    await analysis_jobs.stop()  # los jobs cortados vuelven a la cola al vencer el lease
+    extraction_pipeline.shutdown()
+    await usage_buffer.stop()  # vuelca los contadores pendientes
+    await audit_logger.stop(settings.AUDIT_DRAIN_TIMEOUT_S)  # escribe lo que quede en la cola
     await engine.dispose()
+    refresh_hasher.shutdown()
 
 app = FastAPI(title="Legal Risk AI", lifespan=lifespan)
 
@@ -26,6 +65,11 @@ app.add_middleware(
 # Routers
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(me_router, tags=["me"])
+app.include_router(documents_router, tags=["documents"])
+app.include_router(analyses_router, tags=["analyses"])
+app.include_router(webhooks_router, tags=["webhooks"])
+app.include_router(wellknown_router, tags=["well-known"])
+app.include_router(health_router, tags=["health"])
 
 @app.get("/")
 async def root():
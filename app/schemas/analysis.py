@@ -0,0 +1,46 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+
+class AnalysisCreateIn(BaseModel):
+    document_id: UUID
+
+class AnalysisRequestOut(BaseModel):
+    id: UUID
+    status: str                          # pending/running/completed/failed
+    status_url: str
+    document_id: Optional[UUID] = None
+    analysis_id: Optional[UUID] = None
+    error_message: Optional[str] = None
+    created_at: datetime
+
+class AnalysisOut(BaseModel):
+    id: UUID
+    document_id: UUID
+    model: str
+    risk_score: Optional[float] = None
+    summary: Optional[str] = None
+    result_json: dict
+    tokens_input: Optional[int] = None
+    tokens_output: Optional[int] = None
+    duration_ms: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class AnalysisSummaryOut(BaseModel):
+    id: UUID
+    document_id: UUID
+    model: str
+    risk_score: Optional[float] = None
+    duration_ms: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class AnalysisPageOut(BaseModel):
+    items: list[AnalysisSummaryOut]
+    next_cursor: Optional[str] = None    # None = no hay más páginas
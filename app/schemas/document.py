@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+
+class DocumentOut(BaseModel):
+    id: UUID
+    filename: str
+    mime_type: str
+    size_bytes: Optional[int] = None
+    sha256: Optional[str] = None
+    page_count: Optional[int] = None
+    created_at: datetime
+    deduplicated: bool = False
+
+    class Config:
+        from_attributes = True
+
+class DocumentSummaryOut(BaseModel):
+    id: UUID
+    filename: str
+    mime_type: str
+    size_bytes: Optional[int] = None
+    doc_type: Optional[str] = None
+    page_count: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class DocumentPageOut(BaseModel):
+    items: list[DocumentSummaryOut]
+    next_cursor: Optional[str] = None    # None = no hay más páginas
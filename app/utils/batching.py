@@ -0,0 +1,14 @@
+# app/utils/batching.py
+from __future__ import annotations
+from typing import Iterator, Mapping, Sequence
+
+# asyncpg admite hasta 32767 parámetros por statement
+MAX_BIND_PARAMS = 32767
+
+def insert_batches(rows: Sequence[Mapping]) -> Iterator[Sequence[Mapping]]:
+    """Lotes de filas (dicts con las mismas claves) para INSERT multi-fila sin pasar el límite de parámetros."""
+    if not rows:
+        return
+    size = max(1, MAX_BIND_PARAMS // len(rows[0]))
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
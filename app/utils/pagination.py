@@ -0,0 +1,29 @@
+# app/utils/pagination.py
+from __future__ import annotations
+import base64
+import uuid
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Select, tuple_
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(ts), uuid.UUID(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_page(q: Select, created_col, id_col, cursor: Optional[str], limit: int) -> Select:
+    """
+    Paginación keyset sobre (created_at DESC, id DESC): en vez de OFFSET,
+    sigue después de la última fila vista. Pide limit+1 para saber si hay más.
+    """
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        q = q.where(tuple_(created_col, id_col) < tuple_(ts, row_id))
+    return q.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
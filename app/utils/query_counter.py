@@ -0,0 +1,66 @@
+# app/utils/query_counter.py
+from __future__ import annotations
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import InstanceState
+from app.domain.models.models import Base
+
+def _value_size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (dict, list)):
+        return len(repr(value))
+    return sys.getsizeof(value)
+
+@dataclass
+class QueryStats:
+    statements: list[str] = field(default_factory=list)
+    rows_loaded: int = 0        # entidades ORM materializadas
+    bytes_loaded: int = 0       # tamaño aproximado de los valores de columna cargados
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def assert_max(self, n: int) -> None:
+        if self.count > n:
+            listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(self.statements))
+            raise AssertionError(f"Expected at most {n} statements, got {self.count}:\n{listing}")
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[QueryStats]:
+    """
+    Cuenta los statements que emite `engine` (pasar engine.sync_engine si es async)
+    y el volumen de columnas que carga el ORM dentro del bloque. Pensado para
+    pruebas y diagnóstico: detecta N+1 y columnas pesadas cargadas de más.
+
+        with count_queries(engine.sync_engine) as stats:
+            await repo.list_page(...)
+        stats.assert_max(1)
+    """
+    stats = QueryStats()
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        stats.statements.append(statement)
+
+    def _on_load(target, context):
+        state: InstanceState = target._sa_instance_state
+        stats.rows_loaded += 1
+        # solo lo presente en el dict: las columnas diferidas no cuentan
+        stats.bytes_loaded += sum(
+            _value_size(state.dict[key]) for key in state.mapper.column_attrs.keys() if key in state.dict
+        )
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    event.listen(Base, "load", _on_load, propagate=True)
+    try:
+        yield stats
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+        event.remove(Base, "load", _on_load)
@@ -1,23 +1,74 @@
 # app/utils/time_windows.py
-from datetime import datetime, time, timedelta, timezone
+import time as _time
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable
 from zoneinfo import ZoneInfo
 
 TZ_LIMA = ZoneInfo("America/Lima")
 
+PERIODS = ("daily", "weekly", "monthly")
+
 def now_lima() -> datetime:
     return datetime.now(tz=TZ_LIMA)
 
+def _period_start_date(d: date, period: str) -> date:
+    if period == "daily":
+        return d
+    if period == "weekly":
+        # Lunes=0 .. Domingo=6
+        return d - timedelta(days=d.weekday())
+    return d.replace(day=1)
+
+def _next_period_date(start: date, period: str) -> date:
+    if period == "daily":
+        return start + timedelta(days=1)
+    if period == "weekly":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+class WindowProvider:
+    """
+    Ventana de uso vigente (inicio, inicio siguiente) en una zona horaria.
+    Cachea la ventana actual y solo la recalcula cuando el reloj pasa el
+    siguiente inicio. `clock` devuelve epoch en segundos (inyectable en tests).
+    """
+
+    def __init__(self, tz: ZoneInfo = TZ_LIMA, period: str = "weekly",
+                 clock: Callable[[], float] = _time.time):
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported window period: {period}")
+        self.tz = tz
+        self.period = period
+        self._clock = clock
+        self._window: tuple[datetime, datetime] | None = None
+        self._start_ts = 0.0
+        self._next_ts = 0.0
+
+    def window_for(self, ref: datetime) -> tuple[datetime, datetime]:
+        local = ref.astimezone(self.tz)
+        start_date = _period_start_date(local.date(), self.period)
+        # combine en vez de sumar timedelta: correcto también en zonas con horario de verano
+        start = datetime.combine(start_date, time(0, 0), tzinfo=self.tz)
+        next_start = datetime.combine(_next_period_date(start_date, self.period), time(0, 0), tzinfo=self.tz)
+        return start, next_start
+
+    def current(self) -> tuple[datetime, datetime]:
+        now = self._clock()
+        if self._window is None or not (self._start_ts <= now < self._next_ts):
+            self._window = self.window_for(datetime.fromtimestamp(now, tz=timezone.utc))
+            self._start_ts = self._window[0].timestamp()
+            self._next_ts = self._window[1].timestamp()
+        return self._window
+
+
+weekly_window_lima = WindowProvider(TZ_LIMA, "weekly")
+
 def week_window_lima(ref: datetime | None = None) -> tuple[datetime, datetime]:
     """
     Devuelve (week_start, next_week_start) para la semana ISO en America/Lima.
     week_start = lunes 00:00:00, next_week_start = week_start + 7 días.
+    Sin `ref` usa la ventana cacheada.
     """
     if ref is None:
-        ref = now_lima()
-    # Lunes=0 .. Domingo=6
-    weekday = ref.weekday()
-    # Fecha del lunes de esta semana en Lima
-    monday_date = (ref - timedelta(days=weekday)).date()
-    week_start = datetime.combine(monday_date, time(0, 0), tzinfo=TZ_LIMA)
-    next_week_start = week_start + timedelta(days=7)
-    return week_start, next_week_start
+        return weekly_window_lima.current()
+    return weekly_window_lima.window_for(ref)
@@ -0,0 +1,81 @@
+import asyncio
+import uuid
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from app.domain.models.models import Analysis, ClauseAnnotation, Document, User
+from app.domain.repositories.analyses_repo import AnalysesRepo
+from app.utils.query_counter import count_queries
+
+BIG = 200_000  # result_json/summary de ~200 KB: el peso que el diferido evita cargar
+
+async def _seed(pg_sessionmaker):
+    async with pg_sessionmaker() as db:
+        user = User(email=f"{uuid.uuid4()}@test.local")
+        db.add(user)
+        await db.flush()
+        document = Document(user_id=user.id, filename="a.pdf", mime_type="application/pdf", sha256="ab" * 32)
+        db.add(document)
+        await db.flush()
+        analysis = await AnalysesRepo(db).create(
+            user_id=user.id, document_id=document.id, model="stub-v1", prompt_version="v1",
+            result_json={"clauses": "x" * BIG}, risk_score=1.0, summary="s" * BIG,
+            tokens_input=None, tokens_output=None, duration_ms=1,
+            annotations=[{"clause_type": "HIGH", "page": 1, "bbox": None, "text": "t" * 1000,
+                          "explanation": "e", "risk_weight": 0.5}],
+        )
+        await db.commit()
+        return user.id, analysis.id
+
+def test_user_collections_raise_instead_of_lazy_loading(pg_sessionmaker):
+    async def main():
+        user_id, _ = await _seed(pg_sessionmaker)
+        async with pg_sessionmaker() as db:
+            user = await db.get(User, user_id)
+            for name in ("documents", "analyses"):
+                with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+                    getattr(user, name)
+
+    asyncio.run(main())
+
+def test_deferred_heavy_columns_raise_unless_undeferred(pg_sessionmaker):
+    async def main():
+        user_id, analysis_id = await _seed(pg_sessionmaker)
+        async with pg_sessionmaker() as db:
+            plain = (await db.execute(select(Analysis).where(Analysis.id == analysis_id))).scalar_one()
+            for name in ("result_json", "summary"):
+                with pytest.raises(InvalidRequestError, match="raiseload"):
+                    getattr(plain, name)
+            annotation = (
+                await db.execute(select(ClauseAnnotation).where(ClauseAnnotation.analysis_id == analysis_id))
+            ).scalar_one()
+            for name in ("text", "explanation"):
+                with pytest.raises(InvalidRequestError, match="raiseload"):
+                    getattr(annotation, name)
+        async with pg_sessionmaker() as db:
+            full = await AnalysesRepo(db).get_for_user(user_id, analysis_id)
+            return len(full.result_json["clauses"]), len(full.summary)
+
+    assert asyncio.run(main()) == (BIG, BIG)
+
+def test_heavy_columns_only_load_when_asked(pg_engine, pg_sessionmaker):
+    async def main():
+        user_id, analysis_id = await _seed(pg_sessionmaker)
+        async with pg_sessionmaker() as db:
+            with count_queries(pg_engine.sync_engine) as light:
+                await db.execute(select(Analysis).where(Analysis.id == analysis_id))
+        async with pg_sessionmaker() as db:
+            with count_queries(pg_engine.sync_engine) as cached:
+                await AnalysesRepo(db).find_cached(sha256="ab" * 32, model="stub-v1", prompt_version="v1", max_age_s=60)
+        async with pg_sessionmaker() as db:
+            with count_queries(pg_engine.sync_engine) as full:
+                await AnalysesRepo(db).get_for_user(user_id, analysis_id)
+        return light, cached, full
+
+    light, cached, full = asyncio.run(main())
+    assert light.count == cached.count == full.count == 1
+    assert light.rows_loaded == cached.rows_loaded == full.rows_loaded == 1
+    assert light.bytes_loaded < 1_000
+    # la caché solo necesita result_json; summary se rinde por documento
+    assert BIG < cached.bytes_loaded < 2 * BIG
+    assert full.bytes_loaded > 2 * BIG
@@ -0,0 +1,192 @@
+import asyncio
+import uuid
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from app.domain.models.models import AnalysisRequest, Document, User
+from app.domain.repositories.analyses_repo import AnalysisRequestsRepo
+from app.domain.services import analysis_jobs as jobs_module
+from app.domain.services.analysis_jobs import AnalysisJobRunner
+
+class FakeRequestsRepo:
+    failures = []
+
+    def __init__(self, db):
+        self.db = db
+
+    async def claim_next(self, lease_timeout_s, max_attempts):
+        return self.db.job
+
+    async def fail(self, request_id, claimed_at, error, retry):
+        self.failures.append((request_id, error, retry))
+        return True
+
+@pytest.fixture
+def run_failing_job(fake_session, expiring, monkeypatch):
+    """Corre run_once con un job (que expira con el rollback) cuyo procesamiento falla."""
+
+    async def boom(model, pk):
+        raise RuntimeError("boom")
+
+    def run(attempts, max_attempts):
+        job = fake_session.track(expiring(
+            id=uuid.uuid4(), attempts=attempts, document_id=uuid.uuid4(),
+            claimed_at=datetime.now(tz=timezone.utc),
+        ))
+        fake_session.job = job
+        fake_session.get = boom
+        FakeRequestsRepo.failures = []
+        monkeypatch.setattr(jobs_module, "AnalysisRequestsRepo", FakeRequestsRepo)
+        runner = AnalysisJobRunner(concurrency=1, poll_interval_ms=10, lease_timeout_s=60, max_attempts=max_attempts)
+        runner._sessionmaker = lambda: fake_session
+        job_id = job.id
+        assert asyncio.run(runner.run_once()) is True
+        return runner, job_id
+
+    return run
+
+def test_failed_job_is_requeued_after_rollback(run_failing_job):
+    runner, job_id = run_failing_job(attempts=1, max_attempts=3)
+    assert FakeRequestsRepo.failures == [(job_id, "boom", True)]
+    assert runner.failed == 1 and runner.busy == 0
+
+def test_failed_job_is_not_retried_past_max_attempts(run_failing_job):
+    _, job_id = run_failing_job(attempts=3, max_attempts=3)
+    assert FakeRequestsRepo.failures == [(job_id, "boom", False)]
+
+def test_cache_hit_renders_summary_for_target_document(monkeypatch):
+    from types import SimpleNamespace
+    from app.domain.services.model_backends import StubModelBackend
+
+    source = SimpleNamespace(id=uuid.uuid4(), result_json={"risk_score": 1.0}, summary="Análisis simulado de a.pdf")
+    cloned = {}
+
+    class FakeAnalysesRepo:
+        def __init__(self, db):
+            pass
+
+        async def find_cached(self, **kwargs):
+            return source
+
+        async def clone(self, src, **kwargs):
+            cloned.update(kwargs)
+            return SimpleNamespace(id=uuid.uuid4())
+
+    monkeypatch.setattr(jobs_module, "AnalysesRepo", FakeAnalysesRepo)
+    monkeypatch.setattr(jobs_module.settings, "ANALYSIS_CACHE_ENABLED", True)
+    runner = AnalysisJobRunner(concurrency=1, poll_interval_ms=10, lease_timeout_s=60, max_attempts=3)
+    runner._backend = StubModelBackend()
+    job = SimpleNamespace(user_id=uuid.uuid4(), document_id=uuid.uuid4(), model=None)
+    document = SimpleNamespace(sha256="ab" * 32, filename="b.pdf")
+
+    asyncio.run(runner._from_cache(None, job, document, started=0.0))
+    assert cloned["summary"] == "Análisis simulado de b.pdf"
+    assert "a.pdf" not in str(cloned)
+
+# --- contra Postgres real (TEST_DATABASE_URL) ---
+
+async def _enqueue(db, attempts=0, status="pending", claimed_at=None):
+    user = User(email=f"{uuid.uuid4()}@test.local")
+    db.add(user)
+    await db.flush()
+    document = Document(user_id=user.id, filename="a.pdf", mime_type="application/pdf")
+    db.add(document)
+    await db.flush()
+    job = AnalysisRequest(
+        user_id=user.id, document_id=document.id, idempotency_key=str(uuid.uuid4()),
+        status=status, attempts=attempts, claimed_at=claimed_at,
+    )
+    db.add(job)
+    await db.commit()
+    return job.id
+
+async def _expire_lease(db, job_id):
+    await db.execute(
+        update(AnalysisRequest)
+        .where(AnalysisRequest.id == job_id)
+        .values(claimed_at=datetime.now(tz=timezone.utc) - timedelta(hours=1))
+    )
+    await db.commit()
+
+def test_stale_job_out_of_attempts_is_failed_not_reclaimed(pg_sessionmaker):
+    async def main():
+        async with pg_sessionmaker() as db:
+            stale = datetime.now(tz=timezone.utc) - timedelta(hours=1)
+            job_id = await _enqueue(db, attempts=3, status="running", claimed_at=stale)
+            claimed = await AnalysisRequestsRepo(db).claim_next(lease_timeout_s=60, max_attempts=3)
+            await db.commit()
+            row = await AnalysisRequestsRepo(db).get(job_id)
+            return claimed, row.status, row.attempts
+
+    claimed, status, attempts = asyncio.run(main())
+    assert claimed is None
+    assert status == "failed" and attempts == 3
+
+def test_complete_and_fail_are_fenced_by_claimed_at(pg_sessionmaker):
+    async def main():
+        async with pg_sessionmaker() as a, pg_sessionmaker() as b:
+            job_id = await _enqueue(a)
+            first = await AnalysisRequestsRepo(a).claim_next(lease_timeout_s=60, max_attempts=3)
+            await a.commit()
+            first_claim = first.claimed_at
+            # el worker A se cuelga; vence el lease y B retoma el job
+            await _expire_lease(b, job_id)
+            second = await AnalysisRequestsRepo(b).claim_next(lease_timeout_s=60, max_attempts=3)
+            await b.commit()
+
+            stale_renew = await AnalysisRequestsRepo(a).renew(job_id, first_claim)
+            stale_fail = await AnalysisRequestsRepo(a).fail(job_id, first_claim, "late", retry=True)
+            stale_complete = await AnalysisRequestsRepo(a).complete(job_id, first_claim, uuid.uuid4())
+            await a.commit()
+        async with pg_sessionmaker() as db:
+            row = await AnalysisRequestsRepo(db).get(job_id)
+            return second.id, stale_renew, stale_fail, stale_complete, row.status, row.attempts
+
+    second_id, stale_renew, stale_fail, stale_complete, status, attempts = asyncio.run(main())
+    assert second_id is not None
+    assert stale_renew is None and stale_fail is False and stale_complete is False
+    assert status == "running" and attempts == 2
+
+def test_renew_advances_the_fencing_token(pg_sessionmaker):
+    async def main():
+        async with pg_sessionmaker() as db:
+            job_id = await _enqueue(db)
+            repo = AnalysisRequestsRepo(db)
+            job = await repo.claim_next(lease_timeout_s=60, max_attempts=3)
+            await db.commit()
+            first_claim = job.claimed_at
+            renewed = await repo.renew(job_id, first_claim)
+            await db.commit()
+            return first_claim, renewed, await repo.fail(job_id, first_claim, "x", retry=True), await repo.fail(job_id, renewed, "x", retry=True)
+
+    first_claim, renewed, with_old, with_new = asyncio.run(main())
+    assert renewed is not None and renewed > first_claim
+    assert with_old is False and with_new is True
+
+def test_heartbeat_keeps_long_job_from_being_reclaimed(pg_sessionmaker, monkeypatch):
+    from app.domain.services.model_backends import StubModelBackend
+
+    monkeypatch.setattr(jobs_module.settings, "EXTRACTION_ENABLED", False)
+    monkeypatch.setattr(jobs_module.settings, "ANALYSIS_CACHE_ENABLED", False)
+    # lease de 0.3 s y un modelo que tarda 0.8 s: sin renovación el job se retomaría a mitad
+    runner = AnalysisJobRunner(concurrency=1, poll_interval_ms=10, lease_timeout_s=0.3, max_attempts=3)
+    runner._sessionmaker = pg_sessionmaker
+    runner._backend = StubModelBackend(latency_ms=800, annotations=1)
+    other = AnalysisJobRunner(concurrency=1, poll_interval_ms=10, lease_timeout_s=0.3, max_attempts=3)
+    other._sessionmaker = pg_sessionmaker
+
+    async def main():
+        async with pg_sessionmaker() as db:
+            job_id = await _enqueue(db)
+        first = asyncio.create_task(runner.run_once())
+        await asyncio.sleep(0.5)
+        stolen = await other.run_once()
+        await first
+        async with pg_sessionmaker() as db:
+            row = await AnalysisRequestsRepo(db).get(job_id)
+            return stolen, row.status, row.attempts
+
+    stolen, status, attempts = asyncio.run(main())
+    assert stolen is False
+    assert status == "completed" and attempts == 1
+    assert runner.completed == 1 and runner.lease_lost == 0
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from app.domain.services import auth_service, idp_verify
+from app.domain.services.auth_service import AuthService
+from app.schemas.auth import SocialLoginIn
+
+class FakeUsersRepo:
+    def __init__(self, existing):
+        self.existing = existing
+
+    async def get_by_provider(self, provider, provider_user_id):
+        return None
+
+    async def get_by_email(self, email):
+        return self.existing
+
+def _profile(email_verified):
+    async def verify(id_token):
+        return {
+            "provider_user_id": "google|attacker",
+            "email": "victim@example.com",
+            "email_verified": email_verified,
+            "name": None,
+            "avatar_url": None,
+        }
+    return verify
+
+def test_unverified_email_does_not_take_over_existing_user(monkeypatch):
+    monkeypatch.setattr(auth_service, "verify_google_id_token", _profile(False))
+    service = AuthService(db=None)
+    service.users = FakeUsersRepo(existing=object())
+    with pytest.raises(ValueError, match="not verified"):
+        asyncio.run(service.social_login(SocialLoginIn(provider="google", id_token="x" * 40)))
+
+def test_idp_mock_is_rejected_outside_dev(monkeypatch):
+    monkeypatch.setattr(idp_verify.settings, "GOOGLE_CLIENT_IDS", "")
+    monkeypatch.setattr(idp_verify.settings, "ENV", "prod")
+    with pytest.raises(ValueError, match="not configured"):
+        asyncio.run(idp_verify.verify_google_id_token("x" * 40))
@@ -0,0 +1,62 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+from app.domain.services import extraction as extraction_module
+from app.domain.services.extraction import PDF, ExtractionPipeline
+
+class FakePagesRepo:
+    def __init__(self, db):
+        self.db = db
+
+    async def get_pages(self, sha256, extractor):
+        self.db.in_transaction = True
+        return {}
+
+    async def save_pages(self, sha256, extractor, pages):
+        self.db.in_transaction = True
+
+class FakeDocumentsRepo:
+    updates = []
+
+    def __init__(self, db):
+        pass
+
+    async def set_extracted(self, document_id, *, page_count, ocr_done):
+        self.updates.append((page_count, ocr_done))
+
+def _pipeline(monkeypatch, db, pages):
+    FakeDocumentsRepo.updates = []
+    monkeypatch.setattr(extraction_module, "PageTextsRepo", FakePagesRepo)
+    monkeypatch.setattr(extraction_module, "DocumentsRepo", FakeDocumentsRepo)
+    pipeline = ExtractionPipeline(workers=0)
+
+    async def spool(storage, url):
+        assert not db.in_transaction, "transaction held open while spooling/extracting"
+        return "/dev/null"
+
+    async def extract_missing(path, mime_type, cached):
+        assert not db.in_transaction
+        return len(pages), pages
+
+    monkeypatch.setattr(pipeline, "_spool", spool)
+    monkeypatch.setattr(pipeline, "_extract_missing", extract_missing)
+    monkeypatch.setattr(extraction_module.os, "unlink", lambda path: None)
+    return pipeline
+
+def _document():
+    return SimpleNamespace(id=uuid.uuid4(), sha256="ab" * 32, page_count=None, ocr_done=False,
+                           mime_type=PDF, storage_url="local://doc.pdf")
+
+def test_extraction_releases_transaction_and_marks_ocr_done(fake_session, monkeypatch):
+    db = fake_session
+    pipeline = _pipeline(monkeypatch, db, [(1, "texto", False), (2, "escaneada", True)])
+    texts = asyncio.run(pipeline.extract(db, _document(), storage=object()))
+    assert texts == ["texto", "escaneada"]
+    assert FakeDocumentsRepo.updates == [(2, True)]
+    assert not db.in_transaction
+
+def test_scanned_pages_without_ocr_are_not_marked_done(fake_session, monkeypatch):
+    db = fake_session
+    pipeline = _pipeline(monkeypatch, db, [(1, "texto", False), (2, "", False)])
+    asyncio.run(pipeline.extract(db, _document(), storage=object()))
+    assert FakeDocumentsRepo.updates == [(2, False)]
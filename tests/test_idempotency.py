@@ -0,0 +1,73 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+from fastapi import Response
+from app.api.core import idempotency
+from app.api.core.idempotency import REPLAY_HEADER, Idempotency, IdempotencyGuard
+from app.domain.models.models import User
+from app.domain.repositories.analyses_repo import AnalysisRequestsRepo
+
+class FakeRepo:
+    """El request original sigue 'running' durante `polls` consultas y luego se completa."""
+
+    def __init__(self, db, expiring, request_id, polls):
+        self.db = db
+        self.expiring = expiring
+        self.request_id = request_id
+        self.polls = polls
+        self.gets = 0
+
+    async def get_by_key(self, user_id, key):
+        return self.db.track(self.expiring(id=self.request_id, status="running"))
+
+    async def get(self, request_id):
+        assert request_id == self.request_id
+        self.gets += 1
+        status = "running" if self.gets < self.polls else "completed"
+        return self.db.track(self.expiring(id=request_id, status=status))
+
+def test_in_flight_duplicate_waits_then_replays(fake_session, expiring, monkeypatch):
+    db = fake_session
+    request_id = uuid.uuid4()
+    repo = FakeRepo(db, expiring, request_id, polls=3)
+    monkeypatch.setattr(idempotency, "AnalysisRequestsRepo", lambda _db: repo)
+    dep = Idempotency(wait_s=5, poll_interval_s=0.001)
+    response = Response()
+    claims = SimpleNamespace(id=uuid.uuid4())
+
+    guard = asyncio.run(dep(response, idempotency_key="k1", claims=claims, db=db))
+
+    assert guard.replay.status == "completed"
+    assert guard.replay.id == request_id
+    assert repo.gets == 3
+    assert db.rollbacks == 3
+    assert response.headers[REPLAY_HEADER] == "true"
+
+def test_in_flight_duplicate_stops_waiting_at_deadline(fake_session, expiring, monkeypatch):
+    db = fake_session
+    repo = FakeRepo(db, expiring, uuid.uuid4(), polls=10**6)
+    monkeypatch.setattr(idempotency, "AnalysisRequestsRepo", lambda _db: repo)
+    dep = Idempotency(wait_s=0.05, poll_interval_s=0.01)
+
+    guard = asyncio.run(dep(Response(), idempotency_key="k1", claims=SimpleNamespace(id=uuid.uuid4()), db=db))
+
+    assert guard.replay.status == "running"
+
+def test_concurrent_claims_of_one_key_have_a_single_winner(pg_sessionmaker):
+    async def main():
+        async with pg_sessionmaker() as db:
+            user = User(email=f"{uuid.uuid4()}@test.local")
+            db.add(user)
+            await db.commit()
+
+        async def claim():
+            async with pg_sessionmaker() as db:
+                guard = IdempotencyGuard(user.id, "k1", None, AnalysisRequestsRepo(db))
+                request_id = await guard.claim(model="stub-v1")
+                await db.commit()
+                return request_id
+
+        return await asyncio.gather(*(claim() for _ in range(20)))
+
+    winners = [r for r in asyncio.run(main()) if r is not None]
+    assert len(winners) == 1
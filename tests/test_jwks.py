@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from app.domain.services import idp_verify
+from app.domain.services.jwks import JwksKeyRing, cache_ttl
+
+def _rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+def _jwk(private_key, kid: str) -> dict:
+    jwk = RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update(kid=kid, alg="RS256", use="sig")
+    return jwk
+
+class StubJwks:
+    """Servidor JWKS local: llaves, Cache-Control, demora y fallo configurables."""
+
+    def __init__(self):
+        self.keys: list[dict] = []
+        self.cache_control = "public, max-age=3600"
+        self.delay_s = 0.0
+        self.fail = False
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                time.sleep(stub.delay_s)
+                if stub.fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps({"keys": stub.keys}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", stub.cache_control)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/jwks"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+@pytest.fixture
+def stub():
+    s = StubJwks()
+    s.thread.start()
+    yield s
+    s.server.shutdown()
+    s.server.server_close()
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(scope="module")
+def key_a():
+    return _rsa_key()
+
+@pytest.fixture(scope="module")
+def key_b():
+    return _rsa_key()
+
+def test_cache_ttl_parses_max_age_and_age():
+    assert cache_ttl({"cache-control": "public, max-age=600"}) == 600
+    assert cache_ttl({"cache-control": "max-age=600", "age": "100"}) == 500
+    assert cache_ttl({"cache-control": "no-store"}) == 0
+    assert cache_ttl({}) is None
+
+def test_concurrent_misses_share_one_fetch(stub, key_a):
+    stub.keys = [_jwk(key_a, "a")]
+    stub.delay_s = 0.2
+    ring = JwksKeyRing(stub.url)
+
+    async def main():
+        return await asyncio.gather(*(ring.get_key("a") for _ in range(20)))
+
+    keys = asyncio.run(main())
+    assert stub.hits == 1
+    assert ring.fetches == 1
+    assert ring.coalesced == 19
+    assert all(k.key_id == "a" for k in keys)
+
+def test_keys_are_cached_per_cache_control_max_age(stub, key_a):
+    stub.keys = [_jwk(key_a, "a")]
+    stub.cache_control = "public, max-age=600"
+    clock = Clock()
+    ring = JwksKeyRing(stub.url, clock=clock, refresh_ahead=0)
+
+    async def main():
+        await ring.get_key("a")
+        clock.now += 599
+        await ring.get_key("a")
+        assert stub.hits == 1
+        clock.now += 2
+        await ring.get_key("a")
+        assert stub.hits == 2
+
+    asyncio.run(main())
+
+def test_unknown_kid_refetches_and_is_throttled(stub, key_a, key_b):
+    stub.keys = [_jwk(key_a, "a")]
+    clock = Clock()
+    ring = JwksKeyRing(stub.url, clock=clock, unknown_kid_interval_s=30)
+
+    async def main():
+        await ring.get_key("a")
+        # el IdP rota: aparece "b"
+        stub.keys = [_jwk(key_a, "a"), _jwk(key_b, "b")]
+        clock.now += 31
+        assert (await ring.get_key("b")).key_id == "b"
+        assert ring.unknown_kid_refetches == 1
+        # kid basura dentro de la ventana: sin tráfico al IdP
+        hits = stub.hits
+        for _ in range(5):
+            with pytest.raises(ValueError):
+                await ring.get_key("junk")
+        assert stub.hits == hits
+        assert ring.unknown_kid_throttled == 5
+
+    asyncio.run(main())
+
+def test_stale_keys_are_served_when_refresh_fails(stub, key_a):
+    stub.keys = [_jwk(key_a, "a")]
+    stub.cache_control = "max-age=60"
+    clock = Clock()
+    ring = JwksKeyRing(stub.url, clock=clock)
+
+    async def main():
+        await ring.get_key("a")
+        stub.fail = True
+        clock.now += 3600
+        assert (await ring.get_key("a")).key_id == "a"
+        assert ring.fetch_errors == 1
+        # tras el fallo no se reintenta en cada request
+        await ring.get_key("a")
+        assert ring.fetch_errors == 1
+
+    asyncio.run(main())
+
+def test_verify_google_id_token_end_to_end(stub, key_a, monkeypatch):
+    stub.keys = [_jwk(key_a, "g1")]
+    monkeypatch.setattr(idp_verify, "google_keys", JwksKeyRing(stub.url))
+    monkeypatch.setattr(idp_verify.settings, "GOOGLE_CLIENT_IDS", "client-1,client-2")
+    now = int(time.time())
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": "client-2",
+        "sub": "1234567890",
+        "email": "user@example.com",
+        "email_verified": True,
+        "name": "User",
+        "iat": now,
+        "exp": now + 600,
+    }
+    token = jwt.encode(claims, key_a, algorithm="RS256", headers={"kid": "g1"})
+
+    profile = asyncio.run(idp_verify.verify_google_id_token(token))
+    assert profile["provider_user_id"] == "1234567890"
+    assert profile["email_verified"] is True
+
+    for bad in (
+        jwt.encode({**claims, "aud": "someone-else"}, key_a, algorithm="RS256", headers={"kid": "g1"}),
+        jwt.encode({**claims, "iss": "https://evil.example"}, key_a, algorithm="RS256", headers={"kid": "g1"}),
+        jwt.encode({**claims, "exp": now - 3600}, key_a, algorithm="RS256", headers={"kid": "g1"}),
+        jwt.encode(claims, _rsa_key(), algorithm="RS256", headers={"kid": "g1"}),
+    ):
+        with pytest.raises(ValueError):
+            asyncio.run(idp_verify.verify_google_id_token(bad))
@@ -0,0 +1,58 @@
+import json
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from app.api.core import keyring as keyring_module
+
+def _pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+def _public_pem(private_key) -> str:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+def _ring(monkeypatch, alg, private, kid="", verify_keys=None):
+    monkeypatch.setattr(keyring_module, "JWT_ALG", alg)
+    monkeypatch.setattr(keyring_module, "JWT_PRIVATE", private)
+    monkeypatch.setattr(keyring_module, "JWT_KID", kid)
+    monkeypatch.setattr(keyring_module, "JWT_VERIFY_KEYS", json.dumps(verify_keys) if verify_keys else "")
+    return keyring_module.KeyRing.from_env()
+
+def test_signs_with_kid_and_accepts_previous_key(monkeypatch):
+    old = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    current = ed25519.Ed25519PrivateKey.generate()
+    ring = _ring(monkeypatch, "EdDSA", _pem(current).replace("\n", "\\n"),
+                 verify_keys=[{"kid": "old", "alg": "RS256", "key": _public_pem(old)}])
+
+    token = ring.sign({"sub": "u1", "exp": int(time.time()) + 60})
+    assert jwt.get_unverified_header(token)["kid"] == ring.signing.kid
+    assert ring.decode(token)["sub"] == "u1"
+    legacy = jwt.encode({"sub": "u2"}, old, algorithm="RS256", headers={"kid": "old"})
+    assert ring.decode(legacy)["sub"] == "u2"
+    # otro servicio verifica solo con el JWKS publicado
+    published = jwt.PyJWK(ring.jwks()["keys"][0])
+    assert jwt.decode(token, published.key, algorithms=["EdDSA"])["sub"] == "u1"
+
+def test_unknown_kid_is_rejected(monkeypatch):
+    ring = _ring(monkeypatch, "HS256", "secret")
+    forged = jwt.encode({"sub": "x"}, "other", algorithm="HS256", headers={"kid": "nope"})
+    with pytest.raises(jwt.PyJWTError):
+        ring.decode(forged)
+
+def test_hs_rotation_requires_distinct_explicit_kids(monkeypatch):
+    with pytest.raises(ValueError, match="explicit kid"):
+        _ring(monkeypatch, "HS256", "new-secret", verify_keys=[{"alg": "HS256", "key": "old-secret"}])
+    with pytest.raises(ValueError, match="Duplicate"):
+        _ring(monkeypatch, "HS256", "new-secret", verify_keys=[{"kid": "default", "alg": "HS256", "key": "old-secret"}])
+
+    ring = _ring(monkeypatch, "HS256", "new-secret", kid="k2",
+                 verify_keys=[{"kid": "k1", "alg": "HS256", "key": "old-secret"}])
+    assert ring.decode(ring.sign({"sub": "a"}))["sub"] == "a"
+    old_token = jwt.encode({"sub": "b"}, "old-secret", algorithm="HS256", headers={"kid": "k1"})
+    assert ring.decode(old_token)["sub"] == "b"
+    assert ring.jwks() == {"keys": []}
@@ -0,0 +1,52 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from app.api.core.security import hash_refresh, new_refresh_pair
+from app.domain.models.models import User
+from app.domain.repositories.sessions_repo import SessionsRepo
+from app.domain.services.auth_service import AuthService
+from app.utils.query_counter import count_queries
+
+async def _login(db):
+    """Usuario con una sesión refresh vigente; devuelve el refresh crudo."""
+    user = User(email=f"{uuid.uuid4()}@test.local")
+    db.add(user)
+    await db.flush()
+    raw, jti = new_refresh_pair()
+    await SessionsRepo(db).create(
+        user_id=user.id, refresh_hash=hash_refresh(raw), jti=jti, parent_jti=None,
+        expires_at=datetime.now(tz=timezone.utc) + timedelta(days=1), user_agent="pytest", ip="127.0.0.1",
+    )
+    await db.commit()
+    return user, raw, jti
+
+def test_rotate_is_a_single_statement(pg_engine, pg_sessionmaker):
+    async def main():
+        async with pg_sessionmaker() as db:
+            user, _, jti = await _login(db)
+            _, new_jti = new_refresh_pair()
+            with count_queries(pg_engine.sync_engine) as stats:
+                rotated = await SessionsRepo(db).rotate(
+                    jti=jti, refresh_hash="h", new_jti=new_jti,
+                    expires_at=datetime.now(tz=timezone.utc) + timedelta(days=1), user_agent=None, ip=None,
+                )
+            await db.commit()
+            return user.id, rotated, stats
+
+    user_id, rotated, stats = asyncio.run(main())
+    assert rotated is not None and rotated[0] == user_id
+    assert stats.count == 1, stats.statements
+
+def test_rotate_refresh_costs_one_statement(pg_engine, pg_sessionmaker):
+    async def main():
+        async with pg_sessionmaker() as db:
+            _, raw, _ = await _login(db)
+            service = AuthService(db)
+            with count_queries(pg_engine.sync_engine) as stats:
+                pair = await service.rotate_refresh(raw, "pytest", "127.0.0.1")
+            # la cadena sigue: el refresh hijo también rota
+            await service.rotate_refresh(pair.refresh_token, "pytest", "127.0.0.1")
+            return stats
+
+    stats = asyncio.run(main())
+    assert stats.count == 1, stats.statements
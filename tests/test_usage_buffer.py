@@ -0,0 +1,57 @@
+import asyncio
+import uuid
+from datetime import date
+from app.domain.services import usage_buffer as usage_module
+from app.domain.services.usage_buffer import UsageBuffer
+
+class Store:
+    """Contador en BD compartido; cada consulta cede el event loop como un round-trip real."""
+
+    def __init__(self):
+        self.counted = 0
+
+class FakeUsageRepo:
+    store: Store
+
+    def __init__(self, db):
+        pass
+
+    async def get_week_count(self, user_id, window_start):
+        value = self.store.counted  # snapshot de la lectura
+        await asyncio.sleep(0.001)
+        return value
+
+    async def reserve(self, user_id, window_start, idempotency_key, request_values):
+        await asyncio.sleep(0)
+        return uuid.uuid4()
+
+    async def flush_counted(self, request_ids):
+        await asyncio.sleep(0)
+        self.store.counted += len(request_ids)
+        return request_ids
+
+def test_quota_is_exact_with_concurrent_flushes(fake_session, monkeypatch):
+    FakeUsageRepo.store = Store()
+    monkeypatch.setattr(usage_module, "UsageRepo", FakeUsageRepo)
+    buffer = UsageBuffer(flush_interval_ms=1, max_pending=1000, recovery_grace_s=60)
+    buffer._sessionmaker = lambda: fake_session
+    user_id, week, limit = uuid.uuid4(), date(2026, 10, 12), 5
+
+    async def consume(i):
+        # escalonados: las lecturas quedan intercaladas con los flushes
+        await asyncio.sleep(i * 0.0003)
+        return (await buffer.try_consume(None, user_id, limit, week)).consumed
+
+    async def flusher():
+        for _ in range(100):
+            await buffer.flush()
+            await asyncio.sleep(0.0002)
+
+    async def main():
+        results = await asyncio.gather(flusher(), *(consume(i) for i in range(40)))
+        await buffer.flush()
+        return sum(results[1:])
+
+    assert asyncio.run(main()) == limit
+    assert FakeUsageRepo.store.counted == limit
+    assert buffer.pending_delta(user_id, week) == 0
@@ -0,0 +1,51 @@
+import asyncio
+import uuid
+from datetime import date
+from sqlalchemy import func, select
+from app.domain.models.models import AnalysisRequest, User
+from app.domain.repositories.usage_repo import UsageRepo
+
+CONSUMERS = 400
+LIMIT = 25
+# por debajo de max_connections (100 por defecto) con margen
+CONNECTIONS = 60
+
+def _stress(pg_sessionmaker, keyed: bool):
+    week = date(2026, 10, 12)
+
+    async def main():
+        async with pg_sessionmaker() as db:
+            user = User(email=f"{uuid.uuid4()}@test.local")
+            db.add(user)
+            await db.commit()
+        gate = asyncio.Semaphore(CONNECTIONS)
+
+        async def consume(i):
+            async with gate, pg_sessionmaker() as db:
+                key = f"k{i}" if keyed else None
+                res = await UsageRepo(db).try_consume(user.id, LIMIT, week, idempotency_key=key)
+                # mismo contrato que el llamador real: sin cuota se descarta el request
+                await (db.commit() if res.consumed else db.rollback())
+                return res.consumed
+
+        consumed = sum(await asyncio.gather(*(consume(i) for i in range(CONSUMERS))))
+        async with pg_sessionmaker() as db:
+            count = await UsageRepo(db).get_week_count(user.id, week)
+            requests = await db.scalar(
+                select(func.count()).select_from(AnalysisRequest).where(AnalysisRequest.user_id == user.id)
+            )
+        return consumed, count, requests
+
+    return asyncio.run(main())
+
+def test_parallel_consumes_never_exceed_quota(pg_sessionmaker):
+    consumed, count, _ = _stress(pg_sessionmaker, keyed=False)
+    assert consumed == LIMIT
+    assert count == LIMIT
+
+def test_parallel_keyed_consumes_never_exceed_quota(pg_sessionmaker):
+    consumed, count, requests = _stress(pg_sessionmaker, keyed=True)
+    assert consumed == LIMIT
+    assert count == LIMIT
+    # los requests que no alcanzaron cuota se descartaron con el rollback
+    assert requests == LIMIT
@@ -0,0 +1,37 @@
+import asyncio
+import uuid
+from app.domain.models.models import Plan, User
+from app.domain.repositories.billing_repo import BillingRepo
+from app.domain.services.webhook_handlers import handle_stripe
+
+def _event(type_, created, user_id, status):
+    return {
+        "id": f"evt_{uuid.uuid4().hex}",
+        "type": type_,
+        "created": created,
+        "data": {"object": {
+            "id": "sub_1", "customer": "cus_1", "status": status,
+            "metadata": {"user_id": str(user_id), "plan_code": "premium"},
+        }},
+    }
+
+def test_late_subscription_update_does_not_undo_delete(pg_sessionmaker):
+    async def main():
+        async with pg_sessionmaker() as db:
+            user = User(email=f"{uuid.uuid4()}@test.local")
+            db.add_all([user, Plan(code="premium", price_cents=999, period="monthly")])
+            await db.commit()
+            applied = [
+                await handle_stripe(db, _event("customer.subscription.created", 100, user.id, "active")),
+                await handle_stripe(db, _event("customer.subscription.deleted", 300, user.id, "canceled")),
+                # entregado tarde: es anterior al .deleted
+                await handle_stripe(db, _event("customer.subscription.updated", 200, user.id, "active")),
+            ]
+            await db.commit()
+        async with pg_sessionmaker() as db:
+            sub = await BillingRepo(db).get_subscription("stripe", "sub_1")
+            return applied, sub.status, int(sub.last_event_at.timestamp())
+
+    applied, status, last_event = asyncio.run(main())
+    assert applied == [True, True, False]
+    assert status == "canceled" and last_event == 300
@@ -0,0 +1,32 @@
+import asyncio
+import hashlib
+import hmac
+import time
+import pytest
+from app.domain.services import webhook_service
+from app.domain.services.webhook_service import InvalidSignature, WebhookService, verify_stripe_signature
+
+RAW = b'{"id": "evt_1", "type": "customer.subscription.updated"}'
+
+def _sign(raw: bytes, secret: str, ts: int) -> str:
+    sig = hmac.new(secret.encode(), f"{ts}.".encode() + raw, hashlib.sha256).hexdigest()
+    return f"t={ts},v1={sig}"
+
+def test_stripe_signature_roundtrip():
+    ts = int(time.time())
+    verify_stripe_signature(RAW, _sign(RAW, "whsec", ts), "whsec")
+    with pytest.raises(InvalidSignature):
+        verify_stripe_signature(RAW, _sign(RAW, "other", ts), "whsec")
+    with pytest.raises(InvalidSignature):
+        verify_stripe_signature(RAW, _sign(RAW, "whsec", ts - 3600), "whsec")
+
+def test_stripe_without_secret_is_rejected_outside_dev(monkeypatch):
+    monkeypatch.setattr(webhook_service.settings, "STRIPE_WEBHOOK_SECRET", "")
+    monkeypatch.setattr(webhook_service.settings, "ENV", "prod")
+    with pytest.raises(InvalidSignature):
+        asyncio.run(WebhookService(db=None).ingest("stripe", RAW, None))
+
+@pytest.mark.parametrize("provider", ["app_store", "play_store"])
+def test_unverified_providers_are_not_accepted(provider):
+    with pytest.raises(ValueError, match="Unsupported provider"):
+        asyncio.run(WebhookService(db=None).ingest(provider, b'{"signedPayload": "x.e30.y"}', None))